@@ -1,7 +1,14 @@
-import random
-import matplotlib.pyplot as plt
+from concurrent.futures import ThreadPoolExecutor
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from PIL import Image
 import customtkinter as ctk
+from simulator import MIPSPipelineSimulator
+from pipeline_config import PIPELINES, ROLE_STAGES
+from cpi_stack import CAUSES, CAUSE_LABELS
+from timeseries import METRICS, METRIC_LABELS
+from isa import REGISTER_NAMES
 
 ctk.set_appearance_mode("System")
 ctk.set_default_color_theme("blue")
@@ -23,258 +30,25 @@ STAT_COLORS = {
     'registers': "#9b59b6",
 }
 
-class MIPSPipelineSimulator:
-    def __init__(self):
-        self.memory = {i: i // 4 for i in range(0, 40, 4)}
-        self.registers = [0] * 32
-        self.instruction_memory = [
-            "lw   $t2, 0($zero)",
-            "addi $t1, $zero, 4",
-            "loop:",
-            "  slti $t0, $t1, 40",
-            "  beq  $t0, $zero, end",
-            "  lw   $t3, 0($t1)",
-            "  add  $t2, $t2, $t3",
-            "  sw   $t2, 0($t1)",
-            "  addi $t1, $t1, 4",
-            "  j    loop",
-            "end:",
-            "  sw   $t2, 40($zero)",
-            "  nop"
-        ]
-        self.filtered_instructions = []
-        self.label_to_index = {}
-        self.pipeline_log = []
-        self.statistics = {}
-        self._prepare_instructions()
-
-    def _prepare_instructions(self):
-        for line in self.instruction_memory:
-            line = line.strip()
-            if line.endswith(":"):
-                self.label_to_index[line[:-1]] = len(self.filtered_instructions)
-            elif line:
-                self.filtered_instructions.append(line)
-
-    def _get_reg_num(self, name):
-        mapping = {
-            '$zero': 0, '$t0': 8, '$t1': 9, '$t2': 10, '$t3': 11,
-            '$t4': 12, '$t5': 13, '$t6': 14, '$t7': 15,
-            '$s0': 16, '$s1': 17, '$s2': 18, '$s3': 19, '$s4': 20,
-            '$a0': 4, '$a1': 5, '$a2': 6, '$a3': 7, '$v0': 2
-        }
-        return mapping.get(name, 0)
-
-    def _decode(self, instr):
-        parts = instr.split()
-        op = parts[0]
-        if op in ('addi', 'slti'):
-            return {'type':'I','opcode':op,
-                    'rd':self._get_reg_num(parts[1].strip(',')),
-                    'rs':self._get_reg_num(parts[2].strip(',')),
-                    'imm':int(parts[3])}
-        if op == 'beq':
-            return {'type':'I','opcode':'beq',
-                    'rs':self._get_reg_num(parts[1].strip(',')),
-                    'rt':self._get_reg_num(parts[2].strip(',')),
-                    'label':parts[3]}
-        if op == 'j':
-            return {'type':'J','opcode':'j','label':parts[1]}
-        if op in ('lw', 'sw'):
-            rt, ob = parts[1].strip(','), parts[2]
-            off, base = ob.split('(')
-            return {'type':'I','opcode':op,
-                    'rt':self._get_reg_num(rt),
-                    'base':self._get_reg_num(base.strip(')')),
-                    'offset':int(off)}
-        if op == 'add':
-            return {'type':'R','opcode':'add',
-                    'rd':self._get_reg_num(parts[1].strip(',')),
-                    'rs':self._get_reg_num(parts[2].strip(',')),
-                    'rt':self._get_reg_num(parts[3])}
-        if op == 'nop':
-            return {'type':'nop','opcode':'nop'}
-        raise ValueError(f"Unknown instruction: {instr}")
-
-    def simulate(self):
-        PC = 0
-        cycle = 0
-        total_instructions = 0
-        memory_stalls = 0
-        delayed_branches = 0
-        load_stalls = 0
-        wasted_cycles = 0
-        inserted_nops = 0
-        used_delay_slots = 0
-        branch_count = 0
-
-        IF_ID = ID_EX = EX_MEM = MEM_WB = None
-        pending_branch = False
-        target = 0
-        nop_slots = 0
-        in_delay_slot = False
-
-        def forward_value(r):
-            if MEM_WB:
-                ins = MEM_WB['instr']
-                if ('rd' in ins and ins['rd']==r and ins['type']=='R') or \
-                   ('rt' in ins and ins['rt']==r and ins['opcode']=='lw') or \
-                   ('rd' in ins and ins['rd']==r and ins['type']=='I' and ins['opcode'] in ('addi','slti')):
-                    return MEM_WB['result']
-            if EX_MEM:
-                ins = EX_MEM['instr']
-                if ('rd' in ins and ins['rd']==r and ins['type']=='R') or \
-                   ('rd' in ins and ins['rd']==r and ins['type']=='I' and ins['opcode'] in ('addi','slti')):
-                    return EX_MEM['result']
-            return self.registers[r]
-
-        self.pipeline_log.clear()
-
-        while True:
-            cycle += 1
-            stage = {'IF':"--",'ID':"--",'EX':"--",'MEM':"--",'WB':"--"}
-
-            if MEM_WB:
-                ins = MEM_WB['instr']
-                if 'rd' in ins:
-                    self.registers[ins['rd']] = MEM_WB.get('result',0)
-                elif 'rt' in ins and ins['opcode']=='lw':
-                    self.registers[ins['rt']] = MEM_WB.get('result',0)
-                total_instructions += 1
-                stage['WB'] = ins['opcode']
-
-            stall = False
-            if EX_MEM and EX_MEM['cycles_left']>1:
-                EX_MEM['cycles_left'] -= 1
-                memory_stalls += 1
-                wasted_cycles += 1
-                if EX_MEM['instr']['opcode']=='lw':
-                    load_stalls += 1
-                stall = True
-                stage['MEM'] = f"{EX_MEM['instr']['opcode']} ({EX_MEM['cycles_left']})"
-            else:
-                if EX_MEM:
-                    stage['MEM'] = EX_MEM['instr']['opcode']
-
-            if not stall:
-                MEM_WB, EX_MEM = EX_MEM, None
-
-                if ID_EX:
-                    ins = ID_EX['instr']
-                    stage['EX'] = ins['opcode']
-
-                    if in_delay_slot and ins['type']!='nop':
-                        used_delay_slots += 1
-                        in_delay_slot = False
-
-                    if ins['type']=='R' and ins['opcode']=='add':
-                        res = ID_EX['rs_value'] + ID_EX['rt_value']
-                        EX_MEM = {'instr':ins,'cycles_left':1,'result':res}
-                    elif ins['type']=='I':
-                        op = ins['opcode']
-                        if op=='addi':
-                            res = ID_EX['rs_value'] + ins['imm']
-                            EX_MEM = {'instr':ins,'cycles_left':1,'result':res}
-                        elif op=='slti':
-                            res = 1 if ID_EX['rs_value']<ins['imm'] else 0
-                            EX_MEM = {'instr':ins,'cycles_left':1,'result':res}
-                        elif op=='beq':
-                            if ID_EX['rs_value']==ID_EX['rt_value']:
-                                pending_branch = True
-                                target = ID_EX['index']+1+ins['offset']
-                                delayed_branches += 1
-                            branch_count += 1
-                            in_delay_slot = True
-                            EX_MEM = {'instr':ins,'cycles_left':1}
-                        elif op=='lw':
-                            addr = ID_EX['base_value']+ins['offset']
-                            res = self.memory.get(addr,0)
-                            EX_MEM = {'instr':ins,'cycles_left':random.randint(2,3),'result':res}
-                        elif op=='sw':
-                            addr = ID_EX['base_value']+ins['offset']
-                            self.memory[addr] = ID_EX['rt_value']
-                            EX_MEM = {'instr':ins,'cycles_left':random.randint(2,3)}
-                    elif ins['type']=='J' and ins['opcode']=='j':
-                        pending_branch = True
-                        target = ins['target']
-                        delayed_branches += 1
-                        branch_count += 1
-                        in_delay_slot = True
-                        EX_MEM = {'instr':ins,'cycles_left':1}
-                    elif ins['type']=='nop':
-                        EX_MEM = {'instr':ins,'cycles_left':1}
-                        if in_delay_slot:
-                            in_delay_slot = False
-
-                if IF_ID:
-                    ins = self._decode(IF_ID['instruction'])
-                    rs_val = forward_value(ins.get('rs',0))
-                    rt_val = forward_value(ins.get('rt',0))
-                    base_val = forward_value(ins.get('base',0)) if 'base' in ins else 0
-                    if 'label' in ins:
-                        lbl = ins['label']
-                        idx = self.label_to_index[lbl]
-                        if ins['opcode']=='beq':
-                            ins['offset'] = idx - (IF_ID['index']+1)
-                        elif ins['opcode']=='j':
-                            ins['target'] = idx
-                        del ins['label']
-                    ID_EX = {'instr':ins,'rs_value':rs_val,'rt_value':rt_val,'base_value':base_val,'index':IF_ID['index']}
-                    stage['ID'] = ins['opcode']
-                    if ins['opcode'] in ('beq','j'):
-                        nop_slots = 4
-                else:
-                    ID_EX = None
-
-                if PC < len(self.filtered_instructions):
-                    if nop_slots>0:
-                        IF_ID = {'instruction':'nop','index':-1}
-                        stage['IF'] = 'nop'
-                        nop_slots -= 1
-                        inserted_nops += 1
-                    else:
-                        IF_ID = {'instruction':self.filtered_instructions[PC],'index':PC}
-                        stage['IF'] = self.filtered_instructions[PC].split()[0]
-                        if pending_branch:
-                            PC, pending_branch = target, False
-                        else:
-                            PC += 1
-                else:
-                    IF_ID = None
-
-            self.pipeline_log.append([cycle] + [stage[s] for s in ('IF','ID','EX','MEM','WB')])
-            if PC>=len(self.filtered_instructions) and not any((MEM_WB,EX_MEM,ID_EX,IF_ID)):
-                break
-
-        eff = (used_delay_slots/branch_count*100) if branch_count>0 else 0
-        ipc = total_instructions/cycle if cycle>0 else 0
-
-        self.statistics = {
-            'Total Cycles': cycle,
-            'Instructions Executed': total_instructions,
-            'Memory Stalls': memory_stalls,
-            'Load Stalls': load_stalls,
-            'Delayed Branches': delayed_branches,
-            'Used Delay Slots': used_delay_slots,
-            'Branch Instructions': branch_count,
-            'Dynamic NOPs': inserted_nops,
-            'Wasted Memory Cycles': wasted_cycles,
-            'IPC': ipc,
-            'Delay Slot Efficiency': eff
-        }
-
-        return {'registers': self.registers, 'memory': self.memory}
-
 class PipelineSimulatorGUI:
     def __init__(self, root):
         self.root = root
         root.title("MIPS Pipeline Simulator")
         root.geometry("1100x750")
 
-        self.sim = MIPSPipelineSimulator()
+        self.issue_width = 1
+        self.pipeline = 'classic'
+        self.sim = self._new_simulator()
         self.current_cycle = 0
         self.speed = 500
         self.playing = False
+        self.chart_win = None
+        self.chart_figs = {}
+        self.chart_key = None
+        self.chart_images = {}
+        self.chart_pool = ThreadPoolExecutor(max_workers=1)
+        self.header = None
+        self.debugger = None
 
         self._build_layout()
         self._disable_controls()
@@ -303,6 +77,9 @@ class PipelineSimulatorGUI:
         controls.pack(fill="x", pady=5)
         ctk.CTkButton(controls, text="Run Simulation", command=self.run).grid(row=0, column=0, padx=5, pady=5)
         ctk.CTkButton(controls, text="Reset", fg_color="#e74c3c", hover_color="#c0392b", command=self.reset).grid(row=0, column=1, padx=5, pady=5)
+        self.stop_entry = ctk.CTkEntry(controls, placeholder_text="loop, 7@EX, $t2, mem[40], stall>1")
+        self.stop_entry.grid(row=1, column=0, padx=5, pady=5, sticky="ew")
+        ctk.CTkButton(controls, text="Run To", command=self.run_to).grid(row=1, column=1, padx=5, pady=5)
 
         anim = ctk.CTkFrame(self.right)
         anim.pack(fill="x", pady=5)
@@ -316,8 +93,19 @@ class PipelineSimulatorGUI:
         self.next_btn.grid(row=1, column=1, padx=5, pady=5)
         self.cycle_label = ctk.CTkLabel(anim, text="Cycle: 0/0")
         self.cycle_label.grid(row=2, column=0, columnspan=2, pady=5)
-
-        ctk.CTkButton(self.right, text="Show Charts", command=self.show_charts).pack(pady=10, fill="x")
+        ctk.CTkLabel(anim, text="Issue Width:").grid(row=3, column=0, padx=5, pady=5, sticky="w")
+        self.width_btn = ctk.CTkSegmentedButton(anim, values=["1", "2", "4"], command=self._set_width)
+        self.width_btn.grid(row=3, column=1, padx=5, pady=5, sticky="ew")
+        self.width_btn.set(str(self.issue_width))
+        ctk.CTkLabel(anim, text="Pipeline:").grid(row=4, column=0, padx=5, pady=5, sticky="w")
+        self.depth_btn = ctk.CTkSegmentedButton(anim, values=[*PIPELINES, 'ooo'], command=self._set_pipeline)
+        self.depth_btn.grid(row=4, column=1, padx=5, pady=5, sticky="ew")
+        self.depth_btn.set(self.pipeline)
+
+        self.show_btn = ctk.CTkButton(self.right, text="Show Charts", command=self.show_charts)
+        self.show_btn.pack(pady=10, fill="x")
+        ctk.CTkLabel(self.right, text="Windowed Metrics", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(20,10))
+        self._make_live_plot()
         ctk.CTkLabel(self.right, text="Final State", font=ctk.CTkFont(size=16, weight="bold")).pack(pady=(20,10))
 
         tabs = ctk.CTkTabview(self.right)
@@ -329,12 +117,41 @@ class PipelineSimulatorGUI:
         self.mem_frame = ctk.CTkScrollableFrame(self.mem_tab)
         self.mem_frame.pack(fill="both", expand=True)
         
+    def _make_live_plot(self):
+        self.live_fig = Figure(figsize=(4,2.5))
+        ax = self.live_fig.add_subplot()
+        cols = {'ipc':STAT_COLORS['instructions'], 'stall':STAT_COLORS['stalls'], 'nop':STAT_COLORS['branches']}
+        self.live_lines = {m: ax.plot([], [], color=cols[m], label=METRIC_LABELS[m])[0] for m in METRICS}
+        ax.set_xlabel('Cycle')
+        ax.legend(fontsize=7, loc='upper right')
+        self.live_fig.tight_layout()
+        self.live_canvas = FigureCanvasTkAgg(self.live_fig, self.right)
+        self.live_canvas.get_tk_widget().pack(fill="x", pady=5)
+
+    def _update_live_plot(self):
+        # Only the first current_cycle+1 samples of the precomputed series are shown.
+        wm = self.sim.window_metrics
+        end = min(self.current_cycle + 1, len(wm))
+        xs = wm.cycles[:end]
+        for m, line in self.live_lines.items():
+            line.set_data(xs, wm.series[m][:end])
+        self.live_lines['ipc'].axes.set_xlim(wm.cycles[0] if len(wm) else 0, wm.cycles[-1] if len(wm) else 1)
+        self.live_lines['ipc'].axes.set_ylim(0, max(1.05, self.sim.issue_width * 1.05))
+        self.live_canvas.draw_idle()
+
+    def _stage_color(self, name):
+        return STAGE_COLORS[ROLE_STAGES[self.sim.pipeline.role(name)]]
+
     def _make_pipeline_header(self):
-        frame = ctk.CTkFrame(self.left)
-        frame.pack(fill="x", padx=5, pady=(5,0))
-        headers = ["Cycle","IF","ID","EX","MEM","WB"]
+        if self.header is None:
+            self.header = ctk.CTkFrame(self.left)
+            self.header.pack(fill="x", padx=5, pady=(5,0))
+        frame = self.header
+        for w in frame.winfo_children():
+            w.destroy()
+        headers = ["Cycle", *self.sim.pipeline_log.bundles]
         for i, h in enumerate(headers):
-            color = STAGE_COLORS.get(h) if i>0 else "transparent"
+            color = self._stage_color(h) if i>0 else "transparent"
             lbl = ctk.CTkLabel(frame, text=h, width=80, fg_color=color if color else "transparent", corner_radius=6, font=ctk.CTkFont(weight="bold"))
             lbl.grid(row=0, column=i, padx=2, pady=2)
             frame.grid_columnconfigure(i, weight=1)
@@ -342,16 +159,18 @@ class PipelineSimulatorGUI:
     def _update_table(self):
         for w in self.table.winfo_children():
             w.destroy()
-        for idx, entry in enumerate(self.sim.pipeline_log):
+        log = self.sim.pipeline_log
+        for idx in range(len(log)):
+            entry = log.bundle_row(idx)
             row = ctk.CTkFrame(self.table)
             row.pack(fill="x", pady=1)
             bg = "#e0e0e0" if idx==self.current_cycle else None
             ctk.CTkLabel(row, text=str(entry[0]), width=80, fg_color=bg).grid(row=0, column=0, padx=2)
             for j, val in enumerate(entry[1:]):
-                col = ['IF','ID','EX','MEM','WB'][j]
-                color = STAGE_COLORS[col] if val!="--" else "transparent"
+                col = log.bundles[j]
+                color = self._stage_color(col) if val!="--" else "transparent"
                 ctk.CTkLabel(row, text=val, width=80, fg_color=color, corner_radius=6).grid(row=0, column=j+1, padx=2)
-            for k in range(6):
+            for k in range(len(entry)):
                 row.grid_columnconfigure(k, weight=1)
 
     def _update_stats(self):
@@ -367,9 +186,9 @@ class PipelineSimulatorGUI:
             w.destroy()
         for w in self.mem_frame.winfo_children():
             w.destroy()
-        names = {0:"$zero",2:"$v0",4:"$a0",5:"$a1",6:"$a2",7:"$a3",8:"$t0",9:"$t1",10:"$t2",11:"$t3",12:"$t4",13:"$t5",14:"$t6",15:"$t7",16:"$s0",17:"$s1",18:"$s2",19:"$s3",20:"$s4"}
+        names = REGISTER_NAMES
         for i, val in enumerate(state['registers']):
-            if i in names and val!=0:
+            if val!=0:
                 f = ctk.CTkFrame(self.reg_frame); f.pack(fill="x", pady=1)
                 ctk.CTkLabel(f, text=f"{names[i]} (reg {i}):", width=120).grid(row=0, column=0, sticky="w", padx=5)
                 ctk.CTkLabel(f, text=str(val), width=60).grid(row=0, column=1, sticky="e", padx=5)
@@ -380,26 +199,74 @@ class PipelineSimulatorGUI:
                 ctk.CTkLabel(f, text=str(state['memory'][addr]), width=60).grid(row=0, column=1, sticky="e", padx=5)
 
     def run(self):
-        final = self.sim.simulate()
+        if self.debugger is not None:
+            final = self.debugger.resume()
+            self.debugger = None
+        else:
+            final = self.sim.simulate()
         self._update_stats()
         self._update_final(final)
         self.current_cycle = 0
         self._update_table()
+        self._update_live_plot()
         self.cycle_label.configure(text=f"Cycle: 1/{len(self.sim.pipeline_log)}")
         self._enable_controls()
 
+    def run_to(self):
+        # Fast-forwards a fresh run (or the paused one) to the next stop and
+        # shows the pipeline and machine state there.
+        from debugger import Debugger
+        if self.debugger is None:
+            self.reset()
+            self.debugger = Debugger(self.sim)
+            try:
+                for spec in self.stop_entry.get().split(','):
+                    if spec.strip():
+                        self.debugger.add(spec)
+            except (ValueError, KeyError) as e:
+                self.debugger = None
+                self.cycle_label.configure(text=f"Bad stop condition: {e}")
+                return
+        state = self.debugger.run()
+        if state is None:
+            self.run()
+            return
+        self._update_final(state)
+        self.current_cycle = len(self.sim.pipeline_log) - 1
+        self._update_table()
+        self.cycle_label.configure(text=f"Cycle: {state['cycle']} - {'; '.join(state['stops'])}")
+
+    def _new_simulator(self):
+        if self.pipeline == 'ooo':
+            from ooo import TomasuloSimulator
+            return TomasuloSimulator(issue_width=self.issue_width)
+        return MIPSPipelineSimulator(issue_width=self.issue_width, pipeline=self.pipeline)
+
     def reset(self):
-        self.sim = MIPSPipelineSimulator()
+        self.sim = self._new_simulator()
+        self.debugger = None
+        self._make_pipeline_header()
         for frame in (self.table, self.stats_frame, self.reg_frame, self.mem_frame):
             for w in frame.winfo_children():
                 w.destroy()
         self.current_cycle = 0
         self.playing = False
+        self._update_live_plot()
         self.cycle_label.configure(text="Cycle: 0/0")
 
     def _set_speed(self, val):
         self.speed = int(val)
 
+    def _set_width(self, val):
+        self.issue_width = int(val)
+        self._disable_controls()
+        self.reset()
+
+    def _set_pipeline(self, val):
+        self.pipeline = val
+        self._disable_controls()
+        self.reset()
+
     def toggle(self):
         self.playing = not self.playing
         self.play_btn.configure(text="⏸ Pause" if self.playing else "▶ Play")
@@ -412,6 +279,7 @@ class PipelineSimulatorGUI:
         if self.current_cycle < len(self.sim.pipeline_log) - 1:
             self.current_cycle += 1
             self._update_table()
+            self._update_live_plot()
             self.cycle_label.configure(text=f"Cycle: {self.current_cycle+1}/{len(self.sim.pipeline_log)}")
             self.root.after(self.speed, self._animate)
         else:
@@ -422,6 +290,7 @@ class PipelineSimulatorGUI:
         if self.current_cycle < len(self.sim.pipeline_log) - 1:
             self.current_cycle += 1
             self._update_table()
+            self._update_live_plot()
             self.cycle_label.configure(text=f"Cycle: {self.current_cycle+1}/{len(self.sim.pipeline_log)}")
 
     def _enable_controls(self):
@@ -432,78 +301,178 @@ class PipelineSimulatorGUI:
     def _disable_controls(self):
         for w in (self.play_btn, self.next_btn, self.slider):
             w.configure(state="disabled")
-        self.show_btn = None
+        self.show_btn.configure(state="disabled")
 
     def show_charts(self):
-        win = ctk.CTkToplevel(self.root)
+        if not self.sim.statistics:
+            return
+        if self.chart_win is None or not self.chart_win.winfo_exists():
+            self._make_chart_window()
+        else:
+            self.chart_win.deiconify()
+            self.chart_win.lift()
+        self._refresh_charts()
+
+    def _make_chart_window(self):
+        win = self.chart_win = ctk.CTkToplevel(self.root)
         win.title("Pipeline Charts")
         win.geometry("900x600")
+        win.protocol("WM_DELETE_WINDOW", win.withdraw)
         tabs = ctk.CTkTabview(win)
         tabs.pack(fill="both", expand=True, padx=10, pady=10)
-        exec_tab = tabs.add("Execution")
-        eff_tab = tabs.add("Efficiency")
-        stall_tab = tabs.add("Stalls")
-        self._chart_execution(exec_tab)
-        self._chart_efficiency(eff_tab)
-        self._chart_stalls(stall_tab)
-
-    def _chart_execution(self, parent):
-        fig, ax = plt.subplots(figsize=(8,5))
-        stats = self.sim.statistics
-        cats = ['Executed','Branches','Delayed','NOPs']
+        self.chart_labels = {}
+        for name, title in (('execution',"Execution"), ('efficiency',"Efficiency"), ('stalls',"Stalls"), ('stages',"Stages"), ('cpi',"CPI Stack")):
+            tab = tabs.add(title)
+            lbl = ctk.CTkLabel(tab, text="Rendering...")
+            lbl.pack(fill="both", expand=True)
+            self.chart_labels[name] = lbl
+        self.cpi_table = ctk.CTkTextbox(tab, height=160, font=ctk.CTkFont(family="Courier", size=11))
+        self.cpi_table.pack(fill="x", padx=5, pady=5)
+
+    def _refresh_charts(self):
+        # Charts are cached per simulation result: the data snapshot is the
+        # cache key, and only a changed result is sent to the render worker.
+        log = self.sim.pipeline_log
+        data = {'stats': dict(self.sim.statistics),
+                'stages': list(zip(log.bundles, log.occupancy(), (self._stage_color(n) for n in log.bundles))),
+                'cpi': self.sim.cpi_stack.table(self.sim.filtered_instructions),
+                'cpi_text': self.sim.cpi_stack.format_table(self.sim.filtered_instructions)}
+        key = repr((data['stats'], data['stages'], data['cpi']))
+        if key == self.chart_key:
+            if self.chart_images:
+                self._show_chart_images(data)
+            return
+        self.chart_key = key
+        future = self.chart_pool.submit(self._render_charts, data)
+        self._poll_charts(future, key, data)
+
+    def _poll_charts(self, future, key, data):
+        if not future.done():
+            self.root.after(30, self._poll_charts, future, key, data)
+            return
+        if key != self.chart_key:
+            return
+        self.chart_images = {name: ctk.CTkImage(light_image=img, dark_image=img, size=img.size)
+                             for name, img in future.result().items()}
+        self._show_chart_images(data)
+
+    def _show_chart_images(self, data):
+        for name, lbl in self.chart_labels.items():
+            lbl.configure(image=self.chart_images[name], text="")
+        self.cpi_table.configure(state="normal")
+        self.cpi_table.delete("1.0", "end")
+        self.cpi_table.insert("end", data['cpi_text'])
+        self.cpi_table.configure(state="disabled")
+
+    def _render_charts(self, data):
+        # Runs on the worker thread. Each chart owns one Agg figure for the
+        # lifetime of the GUI; its artists are updated in place and the
+        # figure is rasterised to a PIL image for the UI thread to display.
+        images = {}
+        for name, draw, size in (('execution', self._chart_execution, (8,5)), ('efficiency', self._chart_efficiency, (8,5)),
+                                 ('stalls', self._chart_stalls, (8,5)), ('stages', self._chart_stages, (8,5)),
+                                 ('cpi', self._chart_cpi_stack, (8,4))):
+            chart = self.chart_figs.get(name)
+            if chart is None:
+                fig = Figure(figsize=size, dpi=100)
+                chart = self.chart_figs[name] = {'fig': fig, 'canvas': FigureCanvasAgg(fig)}
+            draw(chart, data.get(name, data['stats']))
+            chart['fig'].tight_layout()
+            chart['canvas'].draw()
+            w, h = chart['canvas'].get_width_height()
+            images[name] = Image.frombuffer('RGBA', (w, h), chart['canvas'].buffer_rgba(), 'raw', 'RGBA', 0, 1).copy()
+        return images
+
+    def _set_bars(self, chart, vals, fmt='{:d}'):
+        for b, t, v in zip(chart['bars'], chart['texts'], vals):
+            b.set_height(v)
+            t.set_y(v+0.1)
+            t.set_text(fmt.format(v))
+        chart['bars'][0].axes.set_ylim(0, max(max(vals)*1.15, 1))
+
+    def _chart_execution(self, chart, stats):
         vals = [stats['Instructions Executed'], stats['Branch Instructions'], stats['Delayed Branches'], stats['Dynamic NOPs']]
-        cols = [STAT_COLORS['instructions'], STAT_COLORS['branches'], STAT_COLORS['branches'], STAT_COLORS['stalls']]
-        bars = ax.bar(cats, vals, color=cols)
-        ax.set_ylabel('Count')
-        ax.set_title('Instruction Profile')
-        for b in bars:
-            h = b.get_height()
-            ax.text(b.get_x()+b.get_width()/2, h+0.1, f'{int(h)}', ha='center')
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
-
-    def _chart_efficiency(self, parent):
-        fig, (a1, a2) = plt.subplots(1,2,figsize=(8,5))
-        stats = self.sim.statistics
+        if 'bars' not in chart:
+            ax = chart['fig'].add_subplot()
+            cats = ['Executed','Branches','Delayed','NOPs']
+            cols = [STAT_COLORS['instructions'], STAT_COLORS['branches'], STAT_COLORS['branches'], STAT_COLORS['stalls']]
+            chart['bars'] = ax.bar(cats, vals, color=cols)
+            chart['texts'] = [ax.text(b.get_x()+b.get_width()/2, 0, '', ha='center') for b in chart['bars']]
+            ax.set_ylabel('Count')
+            ax.set_title('Instruction Profile')
+        self._set_bars(chart, vals)
+
+    def _chart_efficiency(self, chart, stats):
         total = stats['Total Cycles']
         used = total - stats['Memory Stalls'] - stats['Dynamic NOPs']
-        labels = ['Exec','Stalls','NOPs']
         sizes = [used, stats['Memory Stalls'], stats['Dynamic NOPs']]
+        ipc = stats['IPC']
+        if 'bars' not in chart:
+            chart['pie'], a2 = chart['fig'].subplots(1,2)
+            chart['bars'] = a2.bar(['IPC'], [ipc], color=STAT_COLORS['instructions'])
+            chart['texts'] = [a2.text(0, 0, '', ha='center')]
+            a2.set_title('IPC')
+        # Wedge geometry depends on every slice, so the pie is redrawn.
+        a1 = chart['pie']
+        a1.clear()
         cols = [STAT_COLORS['cycles'], STAT_COLORS['stalls'], STAT_COLORS['efficiency']]
-        a1.pie(sizes, labels=labels, colors=cols, autopct='%1.1f%%', startangle=90)
+        a1.pie(sizes, labels=['Exec','Stalls','NOPs'], colors=cols, autopct='%1.1f%%', startangle=90)
         a1.axis('equal')
         a1.set_title('Cycle Use')
-        ipc = stats['IPC']
-        a2.bar(['IPC'], [ipc], color=STAT_COLORS['instructions'])
-        a2.set_ylim(0, max(1.0, ipc*1.2))
-        a2.set_title('IPC')
-        a2.text(0, ipc+0.05, f'{ipc:.2f}', ha='center')
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
-
-    def _chart_stalls(self, parent):
-        fig, ax = plt.subplots(figsize=(8,5))
-        stats = self.sim.statistics
-        cats = ['Mem Stalls','Load Stalls','Wasted Cycles']
+        self._set_bars(chart, [ipc], '{:.2f}')
+        chart['texts'][0].set_y(ipc+0.05)
+        chart['bars'][0].axes.set_ylim(0, max(1.0, ipc*1.2))
+
+    def _chart_stalls(self, chart, stats):
         vals = [stats['Memory Stalls'], stats['Load Stalls'], stats['Wasted Memory Cycles']]
-        cols = [STAT_COLORS['stalls'], STAT_COLORS['registers'], STAT_COLORS['efficiency']]
-        bars = ax.bar(cats, vals, color=cols)
-        ax.set_ylabel('Count')
-        ax.set_title('Stalls Analysis')
-        for b in bars:
-            h = b.get_height()
-            ax.text(b.get_x()+b.get_width()/2, h+0.1, f'{int(h)}', ha='center')
-        ax.text(0.5, -0.2,
-                f"Delay Slots: {stats['Used Delay Slots']}/{stats['Branch Instructions']} ({stats['Delay Slot Efficiency']:.1f}%)",
-                transform=ax.transAxes, ha='center')
-        plt.tight_layout()
-        canvas = FigureCanvasTkAgg(fig, parent)
-        canvas.draw()
-        canvas.get_tk_widget().pack(fill="both", expand=True)
+        if 'bars' not in chart:
+            ax = chart['fig'].add_subplot()
+            cats = ['Mem Stalls','Load Stalls','Wasted Cycles']
+            cols = [STAT_COLORS['stalls'], STAT_COLORS['registers'], STAT_COLORS['efficiency']]
+            chart['bars'] = ax.bar(cats, vals, color=cols)
+            chart['texts'] = [ax.text(b.get_x()+b.get_width()/2, 0, '', ha='center') for b in chart['bars']]
+            chart['note'] = ax.text(0.5, -0.2, '', transform=ax.transAxes, ha='center')
+            ax.set_ylabel('Count')
+            ax.set_title('Stalls Analysis')
+        self._set_bars(chart, vals)
+        chart['note'].set_text(f"Delay Slots: {stats['Used Delay Slots']}/{stats['Branch Instructions']} ({stats['Delay Slot Efficiency']:.1f}%)")
+
+    def _chart_stages(self, chart, stages):
+        names = [name for name, _, _ in stages]
+        if chart.get('names') != names:
+            # Another pipeline configuration has different stages.
+            chart['fig'].clear()
+            ax = chart['fig'].add_subplot()
+            chart['bars'] = ax.bar(names, [0]*len(stages), color=[color for _, _, color in stages])
+            chart['texts'] = [ax.text(b.get_x()+b.get_width()/2, 0, '', ha='center') for b in chart['bars']]
+            chart['names'] = names
+            ax.set_ylabel('Occupied Cycles (%)')
+            ax.set_title('Stage Occupancy')
+        self._set_bars(chart, [occ * 100 for _, occ, _ in stages], '{:.1f}')
+        chart['bars'][0].axes.set_ylim(0, 110)
+
+    def _chart_cpi_stack(self, chart, rows):
+        labels = [f"{r['index']}: {r['instruction'].split()[0]}" if r['instruction'] else str(r['index']) for r in rows]
+        if chart.get('labels') != labels:
+            # A different program has different bars; start the axes over.
+            chart['fig'].clear()
+            ax = chart['fig'].add_subplot()
+            cols = {'base':STAT_COLORS['instructions'], 'memory':STAT_COLORS['stalls'], 'data':STAT_COLORS['registers'],
+                    'structural':STAT_COLORS['cycles'], 'branch':STAT_COLORS['branches'], 'fill':STAT_COLORS['efficiency']}
+            chart['stacks'] = {cause: ax.bar(labels, [0]*len(rows), color=cols[cause], label=CAUSE_LABELS[cause]) for cause in CAUSES}
+            chart['labels'] = labels
+            ax.set_ylabel('Cycles')
+            ax.set_title('CPI Stack by Instruction')
+            ax.legend()
+            ax.tick_params(axis='x', labelrotation=45)
+        bottom = [0]*len(rows)
+        for cause in CAUSES:
+            for bar, r, b in zip(chart['stacks'][cause], rows, bottom):
+                bar.set_y(b)
+                bar.set_height(r[cause])
+            bottom = [b+r[cause] for b, r in zip(bottom, rows)]
+        if rows:
+            chart['stacks']['base'][0].axes.set_ylim(0, max(bottom)*1.05 + 1)
 
 if __name__ == "__main__":
     app = ctk.CTk()
@@ -0,0 +1,158 @@
+import random
+import time
+
+import numpy as np
+
+from batch import BatchSimulator
+from functional import FunctionalModel
+from memory_models import RandomLatency
+from pipeline_config import FUNCTIONAL_UNITS
+import workloads
+
+# An analytic model of the default pipeline (classic five stages, one
+# instruction per cycle, blocking memory). It uses the same accounting as
+# simulate():
+#   Total Cycles = fill/drain + instructions + branch_penalty NOPs per branch
+#                  + (mean latency - 1) MEM stall cycles per lw/sw
+#                  + one interlock cycle per lw whose result the next
+#                    instruction reads
+#                  + cycles spent waiting for mul/div results and for busy
+#                    functional units, from replaying the instructions one
+#                    per cycle (branch NOPs and memory stalls left out)
+# The counts come from one functional run (profile()), so a prediction for
+# any latency is a handful of multiplications. calibrate() refits the
+# coefficients to simulator runs and validate() reports the error.
+
+FEATURES = ('Fill/Drain', 'Instructions', 'Branches', 'Memory Wait', 'Load-Use', 'Execute Wait')
+
+
+def profile(instructions=None, memory=None):
+    model = FunctionalModel(instructions, memory)
+    counts = {'Instructions': 0, 'Branches': 0, 'Loads': 0, 'Stores': 0, 'Load-Use': 0, 'Execute Wait': 0}
+    load_dest = None
+    # now: the cycle the next instruction would start executing; ready: when
+    # a unit result can be used; free: when each unit instance can start.
+    now = 0
+    ready = {}
+    free = {cls: [0] * (u['count'] or 1) for cls, u in FUNCTIONAL_UNITS.items()}
+    for record in model.stream():
+        unit = record['instr']['unit']
+        counts['Instructions'] += 1
+        if load_dest is not None and load_dest in record['reads']:
+            counts['Load-Use'] += 1
+        load_dest = record['dest'] if unit == 'load' else None
+        start = max([now] + [ready.get(r, 0) for r in record['reads']])
+        if unit in free:
+            i = free[unit].index(min(free[unit]))
+            start = max(start, free[unit][i])
+            free[unit][i] = start + FUNCTIONAL_UNITS[unit]['interval']
+        counts['Execute Wait'] += start - now
+        now = start + 1
+        if record['dest'] is not None:
+            ready[record['dest']] = start + FUNCTIONAL_UNITS[unit]['latency'] if unit in free else 0
+        if unit in ('branch', 'jump'):
+            counts['Branches'] += 1
+        elif unit == 'load':
+            counts['Loads'] += 1
+        elif unit == 'store':
+            counts['Stores'] += 1
+    # A result still being computed once the last instruction has drained.
+    counts['Execute Wait'] += max([0] + [t - now - 2 for t in ready.values()])
+    return counts
+
+
+class AnalyticModel:
+    def __init__(self, branch_penalty=4, fill=4, coefficients=None):
+        self.branch_penalty = branch_penalty
+        if coefficients is None:
+            coefficients = (fill, 1.0, branch_penalty, 1.0, 1.0, 1.0)
+        self.coefficients = np.asarray(coefficients, dtype=float)
+
+    def features(self, counts, latency):
+        memory_ops = counts['Loads'] + counts['Stores']
+        return np.array([1.0, counts['Instructions'], counts['Branches'], memory_ops * (latency - 1),
+                         counts['Load-Use'], counts['Execute Wait']])
+
+    def predict(self, counts, latency=2.5):
+        # latency is the mean lw/sw latency, (low + high) / 2 for RandomLatency.
+        cycles = float(self.features(counts, latency) @ self.coefficients)
+        executed = counts['Instructions'] + self.branch_penalty * counts['Branches']
+        return {'Total Cycles': cycles, 'IPC': executed / cycles if cycles else 0.0}
+
+    def _simulate(self, wl, low, high, seeds):
+        models = [RandomLatency(low, high, rng=random.Random(s)) for s in seeds]
+        sim = BatchSimulator(wl['instructions'], [wl['memory']] * len(models), memory_models=models)
+        sim.simulate()
+        return {name: float(np.mean([s[name] for s in sim.statistics])) for name in ('Total Cycles', 'IPC')}
+
+    def calibrate(self, cases=None, seeds=range(16)):
+        # Least-squares fit of the coefficients to the mean simulated cycles;
+        # a feature no case exercises keeps its coefficient.
+        cases = CALIBRATION if cases is None else cases
+        rows, cycles = [], []
+        for wl, low, high in _expand(cases):
+            rows.append(self.features(profile(wl['instructions'], wl['memory']), (low + high) / 2))
+            cycles.append(self._simulate(wl, low, high, seeds)['Total Cycles'])
+        rows = np.array(rows)
+        used = rows.any(axis=0)
+        self.coefficients[used] = np.linalg.lstsq(rows[:, used], np.array(cycles), rcond=None)[0]
+        return dict(zip(FEATURES, self.coefficients))
+
+    def validate(self, cases=None, seeds=range(16)):
+        cases = VALIDATION if cases is None else cases
+        rows = []
+        for wl, low, high in _expand(cases):
+            counts = profile(wl['instructions'], wl['memory'])
+            start = time.perf_counter()
+            predicted = self.predict(counts, (low + high) / 2)
+            elapsed = time.perf_counter() - start
+            simulated = self._simulate(wl, low, high, seeds)
+            rows.append({'workload': wl['name'], 'params': wl['params'], 'latency': (low, high),
+                         'Simulated Cycles': simulated['Total Cycles'], 'Predicted Cycles': predicted['Total Cycles'],
+                         'Cycle Error': _error(predicted['Total Cycles'], simulated['Total Cycles']),
+                         'Simulated IPC': simulated['IPC'], 'Predicted IPC': predicted['IPC'],
+                         'IPC Error': _error(predicted['IPC'], simulated['IPC']),
+                         'Predict Microseconds': elapsed * 1e6})
+        return rows
+
+
+def _error(predicted, simulated):
+    return abs(predicted - simulated) / simulated * 100 if simulated else 0.0
+
+
+def _expand(cases):
+    for name, params, latencies in cases:
+        wl = workloads.build(name, **params)
+        for low, high in latencies:
+            yield wl, low, high
+
+
+# (workload, parameters, lw/sw latency ranges); validation uses other sizes.
+CALIBRATION = [
+    ('prefix_sum', {'n': 20}, [(2, 3), (1, 1), (3, 6)]),
+    ('pointer_chase', {'n': 16}, [(2, 3), (4, 4)]),
+    ('strided_access', {'n': 12, 'stride': 8}, [(2, 3), (1, 4)]),
+    ('loop', {'trips': 3}, [(2, 3)]),
+    ('dependency_chain', {'length': 6, 'trips': 3}, [(2, 3)]),
+    ('dot_product', {'n': 16}, [(2, 3)]),
+]
+VALIDATION = [
+    ('prefix_sum', {'n': 50}, [(2, 3), (2, 8)]),
+    ('pointer_chase', {'n': 40}, [(2, 3), (1, 2)]),
+    ('strided_access', {'n': 30, 'stride': 16, 'trips': 2}, [(2, 3)]),
+    ('loop', {'trips': 6}, [(3, 5)]),
+    ('dependency_chain', {'length': 10, 'trips': 5, 'chains': 2}, [(2, 3)]),
+    ('dot_product', {'n': 32, 'unroll': 2}, [(2, 3), (1, 4)]),
+]
+
+
+if __name__ == "__main__":
+    model = AnalyticModel()
+    for name, value in model.calibrate().items():
+        print(f"{name:>12}: {value:7.3f}")
+    print(f"\n| {'Workload':16} | {'Latency':>7} | {'Simulated':>9} | {'Predicted':>9} | {'Error':>6} "
+          f"| {'IPC Error':>9} | {'Predict':>8} |")
+    for r in model.validate():
+        print(f"| {r['workload']:16} | {r['latency'][0]:>3}-{r['latency'][1]:<3} | {r['Simulated Cycles']:9.1f} "
+              f"| {r['Predicted Cycles']:9.1f} | {r['Cycle Error']:5.2f}% | {r['IPC Error']:8.2f}% "
+              f"| {r['Predict Microseconds']:6.1f}us |")
@@ -0,0 +1,339 @@
+import random
+
+import numpy as np
+
+from simulator import MIPSPipelineSimulator
+from memory_models import RandomLatency
+from isa import ISA, UNIT_LATENCY
+from pipeline_config import FUNCTIONAL_UNITS
+
+# Runs K copies of one program in lockstep, one cycle per vectorised step.
+# Every machine has its own registers, data memory and memory model, and the
+# pipeline latches are arrays indexed by machine, so machines that branch or
+# stall differently simply take different masks through the same step. The
+# results and statistics are exactly those of K separate
+# MIPSPipelineSimulator runs with the same memory models.
+#
+# Only the default configuration is covered: the classic five-stage
+# pipeline, one instruction per cycle, the default functional units,
+# blocking loads and stores, no trace.
+#
+# Opcodes and units are numbered from the isa table; EX applies each
+# opcode's fn to the operand arrays of the machines executing it.
+
+OPS = {name: code for code, name in enumerate(ISA)}
+UNITS = {name: code for code, name in enumerate(UNIT_LATENCY)}
+NOP = OPS['nop']
+BRANCH, JUMP, LOAD, STORE = (UNITS[unit] for unit in ('branch', 'jump', 'load', 'store'))
+IF, ID, EX, MEM, WB = range(5)
+FIELDS = ('idx', 'v0', 'v1', 'result', 'ready', 'busy', 'completes', 'structural')
+
+
+class BatchSimulator:
+    def __init__(self, instructions=None, memories=None, seeds=None, memory_models=None):
+        scalar = MIPSPipelineSimulator(instructions)
+        self.instruction_memory = scalar.instruction_memory
+        if memories is None:
+            count = len(memory_models) if memory_models is not None else len(seeds)
+            memories = [scalar.memory] * count
+        self.count = len(memories)
+        if memory_models is None:
+            seeds = range(self.count) if seeds is None else seeds
+            memory_models = [RandomLatency(rng=random.Random(seed)) for seed in seeds]
+        if len(memory_models) != self.count:
+            raise ValueError("Need one memory model per machine")
+        self.memory_models = list(memory_models)
+        self.branch_penalty = scalar.pipeline.branch_penalty
+        self._decode_program(scalar)
+        self.columns = {}
+        self.memory = np.zeros((self.count, 0), dtype=np.int64)
+        self.present = np.zeros((self.count, 0), dtype=bool)
+        for i, image in enumerate(memories):
+            for address, value in image.items():
+                col = self._column(address)
+                self.memory[i, col] = value
+                self.present[i, col] = True
+        self.registers = np.zeros((self.count, 32), dtype=np.int64)
+        self.statistics = []
+
+    def _decode_program(self, scalar):
+        # One row per static instruction, plus a last row for injected NOPs.
+        # reads[p] is the register of operand p (-1 for none), imm the
+        # immediate or offset, and target -1 where it comes from a register.
+        n = self.n = len(scalar.filtered_instructions)
+        self.op = np.full(n + 1, NOP)
+        self.unit = np.full(n + 1, UNITS['nop'])
+        self.reads = np.full((2, n + 1), -1)
+        self.dest, self.target = np.full(n + 1, -1), np.full(n + 1, -1)
+        self.imm = np.zeros(n + 1, dtype=np.int64)
+        self.uses_imm = np.zeros(n + 1, dtype=bool)
+        for i in range(n):
+            ins = scalar._decoded(i)
+            self.op[i] = OPS[ins['opcode']]
+            self.unit[i] = UNITS[ins['unit']]
+            for p, reg in enumerate(ins['reads']):
+                self.reads[p, i] = reg
+            if ins['dest'] is not None:
+                self.dest[i] = ins['dest']
+            self.imm[i] = ins.get('imm', ins.get('offset', 0))
+            self.uses_imm[i] = 'imm' in ins
+            self.target[i] = ins.get('target', -1)
+        # fn of every opcode in the program that computes a result or a
+        # branch condition.
+        self.results = {OPS[op]: spec['fn'] for op, spec in ISA.items()
+                        if spec['unit'] in ('alu', 'mul', 'div') and OPS[op] in self.op}
+        self.conditions = {OPS[op]: spec['fn'] for op, spec in ISA.items()
+                           if spec['unit'] == 'branch' and OPS[op] in self.op}
+
+    def _column(self, address):
+        col = self.columns.get(address)
+        if col is None:
+            col = self.columns[address] = len(self.columns)
+            if col >= self.memory.shape[1]:
+                grow = max(16, self.memory.shape[1])
+                self.memory = np.hstack([self.memory, np.zeros((self.count, grow), dtype=np.int64)])
+                self.present = np.hstack([self.present, np.zeros((self.count, grow), dtype=bool)])
+        return col
+
+    def _columns(self, addresses):
+        unique, inverse = np.unique(addresses, return_inverse=True)
+        return np.array([self._column(int(a)) for a in unique], dtype=np.int64)[inverse]
+
+    @staticmethod
+    def _unit_statistics(units, busy, stalls, i, cycles):
+        # The same figures as UnitPool.statistics() for machine i.
+        stats = {}
+        for cls, u in units.items():
+            slots = cycles * u['count']
+            stats[f"{u['name']} Utilization"] = min(int(busy[cls][i]), slots) / slots * 100 if slots else 0.0
+            stats[f"{u['name']} Structural Stalls"] = int(stalls[cls][i])
+        stats['Structural Stalls'] = sum(int(stalls[cls][i]) for cls in units)
+        return stats
+
+    def simulate(self):
+        K, n = self.count, self.n
+        rows = np.arange(K)
+        regs = self.registers
+        zeros = lambda dtype=np.int64: np.zeros(K, dtype=dtype)
+        # latch[k][field] holds the instruction working in stage k of every
+        # machine; IF never holds one past its own cycle.
+        valid = [zeros(bool) for _ in range(5)]
+        latch = [{f: zeros(bool) if f in ('ready', 'structural') else zeros() for f in FIELDS} for _ in range(5)]
+        active = np.ones(K, dtype=bool)
+        PC, cycle, target, nop_slots, unresolved = zeros(), zeros(), zeros(), zeros(), zeros()
+        pending, in_delay = zeros(bool), zeros(bool)
+        count = {name: zeros() for name in ('instructions', 'memory', 'load', 'delayed', 'used', 'branches',
+                                            'nops', 'load_use', 'forwarding', 'waits', 'stage')}
+        # Functional units: when each instance can start next, and the
+        # cycle every register's pending mul/div result completes.
+        units = {cls: dict(u, count=u['count'] or 1) for cls, u in FUNCTIONAL_UNITS.items()}
+        free = {cls: np.zeros((K, u['count']), dtype=np.int64) for cls, u in units.items()}
+        unit_busy = {cls: zeros() for cls in units}
+        unit_stalls = {cls: zeros() for cls in units}
+        ready_at = np.zeros((K, 32), dtype=np.int64)
+        latency = np.array([units[cls]['latency'] if cls in units else 1 for cls in UNITS])
+
+        def move(mask, k):
+            for f in FIELDS:
+                latch[k + 1][f][mask] = latch[k][f][mask]
+            valid[k + 1] |= mask
+            valid[k] &= ~mask
+
+        def forward(mask, reg):
+            # Operand values for the machines in mask, and whether they wait
+            # on a load still in MEM or a unit still working. Only MEM and WB
+            # can hold a producer here.
+            value = regs[rows, np.maximum(reg, 0)]
+            ready = np.ones(K, dtype=bool)
+            blocker = np.full(K, -1)
+            for k in (WB, MEM):
+                hit = mask & (reg >= 0) & valid[k] & (self.dest[latch[k]['idx']] == reg)
+                value = np.where(hit, latch[k]['result'], value)
+                ready = np.where(hit, latch[k]['ready'], ready)
+                blocker = np.where(hit, latch[k]['idx'], blocker)
+            ready &= (reg < 0) | (ready_at[rows, np.maximum(reg, 0)] <= cycle)
+            return value, ready, blocker
+
+        while active.any():
+            run = active.copy()
+            cycle[run] += 1
+
+            # WB
+            m = run & valid[WB]
+            dest = self.dest[latch[WB]['idx']]
+            w = m & (dest >= 0)
+            regs[rows[w], dest[w]] = latch[WB]['result'][w]
+            count['instructions'] += m
+            valid[WB] &= ~m
+
+            # MEM: a lw/sw with cycles left holds every stage behind it
+            m = run & valid[MEM]
+            busy = latch[MEM]['busy']
+            frozen = m & (busy > 1)
+            busy[frozen] -= 1
+            count['memory'] += frozen
+            count['load'] += frozen & (self.unit[latch[MEM]['idx']] == LOAD)
+            go = m & ~frozen
+            latch[MEM]['ready'][go] = True
+            move(go, MEM)
+            latch[WB]['busy'][go] = 1
+
+            # EX: an operation waiting for a free unit holds every stage behind it
+            m = run & ~frozen & valid[EX]
+            e = latch[EX]
+            idx = e['idx']
+            op, unit = self.op[idx], self.unit[idx]
+            hold = m & (e['busy'] > 1)
+            e['busy'][hold] -= 1
+            for cls in units:
+                unit_stalls[cls] += hold & e['structural'] & (unit == UNITS[cls])
+            count['stage'] += hold & ~e['structural']
+            frozen |= hold
+            m &= ~hold
+            count['used'] += m & in_delay & (op != NOP)
+            in_delay &= ~m
+            result = e['result']
+            second = np.where(self.uses_imm[idx], self.imm[idx], e['v1'])
+            for code, fn in self.results.items():
+                s = m & (op == code)
+                if s.any():
+                    result[s] = fn(e['v0'][s], second[s])
+            condition = np.zeros(K, dtype=bool)
+            for code, fn in self.conditions.items():
+                s = m & (op == code)
+                if s.any():
+                    condition[s] = fn(e['v0'][s], e['v1'][s])
+            branch = m & ((unit == BRANCH) | (unit == JUMP))
+            taken = branch & ((unit == JUMP) | condition)
+            pending |= taken
+            target[taken] = np.where(self.target[idx] >= 0, self.target[idx], e['v0'])[taken]
+            link = branch & (self.dest[idx] >= 0)
+            result[link] = idx[link] + 2
+            count['delayed'] += taken
+            count['branches'] += branch
+            unresolved -= branch
+            in_delay |= branch
+            memop = m & ((unit == LOAD) | (unit == STORE))
+            busy = np.ones(K, dtype=np.int64)
+            if memop.any():
+                which = rows[memop]
+                loads = unit[memop] == LOAD
+                addresses = np.where(loads, e['v0'][memop], e['v1'][memop]) + self.imm[idx][memop]
+                cols = self._columns(addresses)
+                result[which[loads]] = np.where(self.present[which, cols], self.memory[which, cols], 0)[loads]
+                stores = ~loads
+                self.memory[which[stores], cols[stores]] = e['v0'][which[stores]]
+                self.present[which[stores], cols[stores]] = True
+                for i, address, load in zip(which, addresses, loads):
+                    lat = self.memory_models[i].latency('lw' if load else 'sw', int(address), int(cycle[i]), int(idx[i]))
+                    busy[i] = max(1, lat)
+            e['ready'][m] = ((unit != LOAD) & (e['completes'] <= cycle))[m]
+            slow = m & (e['completes'] > cycle) & (self.dest[idx] >= 0)
+            ready_at[rows[slow], self.dest[idx][slow]] = e['completes'][slow]
+            move(m, EX)
+            latch[MEM]['busy'][m] = busy[m]
+
+            # ID: operands are read, forwarded, or waited for
+            m = run & ~frozen & valid[ID]
+            idx = latch[ID]['idx']
+            blocked = np.zeros(K, dtype=bool)
+            blocker = np.full(K, -1)
+            values = []
+            for reg in self.reads[:, idx]:
+                value, ready, producer = forward(m, reg)
+                first = m & ~ready & ~blocked
+                blocker[first] = producer[first]
+                blocked |= first
+                values.append(np.where(reg >= 0, value, 0))
+            # A younger result must not be overwritten by a pending one.
+            dest = self.dest[idx]
+            first = m & (dest >= 0) & (ready_at[rows, np.maximum(dest, 0)] > cycle) & ~blocked
+            blocker[first] = -1
+            blocked |= first
+            load_use = blocked & (self.unit[blocker] == LOAD)
+            count['load_use'] += load_use
+            count['forwarding'] += blocked & ~load_use
+            issue = m & ~blocked
+            latch[ID]['v0'][issue] = values[0][issue]
+            latch[ID]['v1'][issue] = values[1][issue]
+            move(issue, ID)
+            # Reserve a unit: an operation starts the cycle after it enters EX
+            # or when an instance frees up.
+            start = cycle + 1
+            for cls, u in units.items():
+                s = issue & (self.unit[idx] == UNITS[cls])
+                if s.any():
+                    which = rows[s]
+                    i = free[cls][which].argmin(axis=1)
+                    start[which] = np.maximum(cycle[which] + 1, free[cls][which, i])
+                    free[cls][which, i] = start[which] + u['interval']
+                    unit_busy[cls][which] += u['interval']
+            latch[EX]['busy'][issue] = (start - cycle)[issue]
+            latch[EX]['structural'][issue] = (start > cycle + 1)[issue]
+            latch[EX]['completes'][issue] = (start + latency[self.unit[idx]] - 1)[issue]
+
+            # IF: NOPs behind a branch, then the delay slot once it has resolved
+            f = run & ~frozen & ~valid[ID] & (PC < n)
+            nop = f & (nop_slots > 0)
+            wait = f & ~nop & (unresolved > 0)
+            real = f & ~nop & ~wait
+            latch[ID]['idx'][nop] = n
+            nop_slots -= nop
+            count['nops'] += nop
+            count['waits'] += wait
+            pc = np.minimum(PC, n)
+            latch[ID]['idx'][real] = pc[real]
+            is_branch = real & ((self.unit[pc] == BRANCH) | (self.unit[pc] == JUMP))
+            redirect = real & pending
+            PC[real] += 1
+            PC[redirect] = target[redirect]
+            pending &= ~redirect
+            nop_slots[is_branch] = self.branch_penalty
+            unresolved += is_branch
+            valid[ID] |= nop | real
+            latch[ID]['busy'][nop | real] = 1
+
+            active &= ~((PC >= n) & ~np.any(valid, axis=0) & (ready_at.max(axis=1) <= cycle))
+
+        self.statistics = []
+        results = []
+        for i in range(K):
+            get = lambda name: int(count[name][i])
+            cycles = int(cycle[i])
+            branches = get('branches')
+            self.statistics.append({
+                'Total Cycles': cycles,
+                'Instructions Executed': get('instructions'),
+                'Memory Stalls': get('memory'),
+                'Load Stalls': get('load'),
+                'Delayed Branches': get('delayed'),
+                'Used Delay Slots': get('used'),
+                'Branch Instructions': branches,
+                'Dynamic NOPs': get('nops'),
+                'Wasted Memory Cycles': get('memory'),
+                'Issue Width': 1,
+                'Dependency Splits': 0,
+                'Memory Port Splits': 0,
+                'Load-Use Stalls': get('load_use'),
+                'Forwarding Stalls': get('forwarding'),
+                'Pipeline Depth': 5,
+                'Stage Stalls': get('stage'),
+                'Branch Wait Cycles': get('waits'),
+                'MSHRs': 0,
+                'MSHR Full Stalls': 0,
+                'Scoreboard Stalls': 0,
+                'Average MSHR Occupancy': 0,
+                'Peak MSHR Occupancy': 0,
+                'Overlapped Miss Cycles': 0,
+                'Store Buffer Depth': 0,
+                'Store Buffer Full Stalls': 0,
+                'Average Store Buffer Occupancy': 0,
+                'Store Forwards': 0,
+                **self._unit_statistics(units, unit_busy, unit_stalls, i, cycles),
+                'IPC': get('instructions') / cycles if cycles else 0,
+                'Delay Slot Efficiency': get('used') / branches * 100 if branches else 0,
+                **self.memory_models[i].statistics()
+            })
+            memory = {address: int(self.memory[i, col]) for address, col in self.columns.items() if self.present[i, col]}
+            results.append({'registers': [int(v) for v in regs[i]], 'memory': memory})
+        return results
@@ -0,0 +1,88 @@
+from simulator import MIPSPipelineSimulator
+from functional import FunctionalModel
+from isa import REGISTER_NAMES
+
+# Differential checking of the pipeline against the functional model. With a
+# checker attached (sim.checker), every instruction that writes back (commits,
+# for the out-of-order backend) is stepped on the functional model in
+# lockstep and compared: its index, the register it writes and the value,
+# or the address and value of a store. The first difference raises
+# Divergence; the run stops there, with the reference still at that point.
+
+
+class Divergence(Exception):
+    def __init__(self, report):
+        self.report = report
+        super().__init__(", ".join(f"{k}={v}" for k, v in report.items()))
+
+
+class LockstepChecker:
+    def __init__(self, instructions=None, memory=None):
+        self.model = FunctionalModel(instructions, memory)
+        self.checked = 0
+
+    def retire(self, cycle, index, dest=None, value=None, address=None):
+        record = self.model.step()
+        if record is None:
+            self._fail(cycle, index, 'instruction', "end of program", index)
+        if record['index'] != index:
+            self._fail(cycle, index, 'instruction', record['index'], index)
+        if record['instr']['unit'] == 'store':
+            if address != record['address']:
+                self._fail(cycle, index, 'store address', record['address'], address)
+            expected = self.model.memory[record['address']]
+            if value != expected:
+                self._fail(cycle, index, f"mem[{address}]", expected, value)
+        elif dest != record['dest']:
+            self._fail(cycle, index, 'destination', self._name(record['dest']), self._name(dest))
+        elif dest is not None and value != record['value']:
+            self._fail(cycle, index, self._name(dest), record['value'], value)
+        self.checked += 1
+
+    def finish(self):
+        # The pipeline has stopped; the reference must have nothing left either.
+        if not self.model.done():
+            self._fail(None, self.model.pc, 'instruction', self.model.pc, "end of run")
+
+    def _name(self, reg):
+        return None if reg is None else REGISTER_NAMES[reg]
+
+    def _fail(self, cycle, index, field, expected, actual):
+        program = self.model.program
+        raise Divergence({'cycle': cycle, 'index': index,
+                          'instruction': program[index] if 0 <= index < len(program) else None,
+                          'field': field, 'expected': expected, 'actual': actual})
+
+
+def check(sim):
+    # Runs sim with a checker attached; returns the number of instructions
+    # checked, or raises Divergence. sim must not have run yet.
+    sim.checker = LockstepChecker(sim.instruction_memory, sim.memory)
+    try:
+        sim.simulate()
+        sim.checker.finish()
+        return sim.checker.checked
+    finally:
+        sim.checker = None
+
+
+if __name__ == "__main__":
+    import random
+    import time
+    from ooo import TomasuloSimulator
+    import workloads
+    configs = [('classic', {}), ('deep', {}), ('classic', {'issue_width': 4}), ('classic', {'mshrs': 4}),
+               ('classic', {'store_buffer': 4}), ('ooo', {'issue_width': 2})]
+    for name in ('prefix_sum', 'loop', 'pointer_chase', 'strided_access', 'dependency_chain', 'dot_product'):
+        wl = workloads.build(name)
+        for pipeline, options in configs:
+            random.seed(0)
+            if pipeline == 'ooo':
+                sim = TomasuloSimulator(wl['instructions'], wl['memory'], **options)
+            else:
+                sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'], pipeline=pipeline, **options)
+            sim.keep_log = False
+            start = time.perf_counter()
+            count = check(sim)
+            print(f"{name:16} {pipeline:8} {str(options):22} {count:5d} instructions checked "
+                  f"in {time.perf_counter() - start:.3f}s")
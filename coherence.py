@@ -0,0 +1,145 @@
+from collections import OrderedDict
+
+from memory_models import SharedBus
+
+# Snooping MSI/MESI coherence for per-core caches in front of the shared data
+# memory. The data itself stays in the simulator's memory dict, so results do
+# not depend on the caches; this model only decides how long each lw/sw spends
+# in MEM and counts the coherence traffic.
+#
+# Every miss or upgrade is a bus transaction: it arbitrates for the shared
+# bus, is snooped by every other cache, and is served either by a peer cache
+# holding the line (cache-to-cache transfer) or by memory.
+
+MODIFIED, EXCLUSIVE, SHARED, INVALID = 'M', 'E', 'S', 'I'
+
+COUNTERS = ('Cache Hits', 'Cache Misses', 'Upgrades', 'Invalidations Sent', 'Invalidations Received',
+            'Cache-to-Cache Transfers', 'Writebacks', 'Coherence Misses', 'True Sharing Misses',
+            'False Sharing Misses')
+
+
+class SnoopBus:
+    def __init__(self, protocol='MESI', bus=None, line_size=16, lines=64, hit_latency=1,
+                 memory_latency=3, transfer_latency=2, upgrade_latency=1):
+        if protocol not in ('MSI', 'MESI'):
+            raise ValueError(f"Unknown coherence protocol: {protocol}")
+        self.protocol = protocol
+        self.bus = bus if bus is not None else SharedBus()
+        self.line_size = line_size
+        self.lines = lines
+        self.hit_latency = hit_latency
+        self.memory_latency = memory_latency
+        self.transfer_latency = transfer_latency
+        self.upgrade_latency = upgrade_latency
+        self.caches = []
+
+    def attach(self):
+        cache = CoherentCache(self, len(self.caches))
+        self.caches.append(cache)
+        return cache
+
+    def peers(self, cache):
+        return [c for c in self.caches if c is not cache]
+
+    def note_write(self, writer, line, word):
+        # Remember which words other cores write to lines a cache lost to an
+        # invalidation, to tell true from false sharing on its next miss.
+        for c in self.peers(writer):
+            written = c.lost.get(line)
+            if written is not None:
+                written.add(word)
+
+    def statistics(self):
+        return {name: sum(c.counters[name] for c in self.caches) for name in COUNTERS}
+
+
+class CoherentCache:
+    def __init__(self, snoop, core):
+        self.snoop = snoop
+        self.core = core
+        self.state = OrderedDict()
+        self.lost = {}
+        self.counters = dict.fromkeys(COUNTERS, 0)
+
+    def _split(self, address):
+        return address // self.snoop.line_size, address % self.snoop.line_size
+
+    def latency(self, op, address, cycle, pc=None):
+        s = self.snoop
+        line, word = self._split(address)
+        state = self.state.get(line, INVALID)
+        if state != INVALID:
+            self.state.move_to_end(line)
+
+        if op == 'lw' and state != INVALID:
+            self.counters['Cache Hits'] += 1
+            return s.hit_latency
+        if op == 'sw' and state in (MODIFIED, EXCLUSIVE):
+            self.counters['Cache Hits'] += 1
+            self.state[line] = MODIFIED
+            s.note_write(self, line, word)
+            return s.hit_latency
+
+        wait = s.bus.acquire(cycle)
+        if op == 'sw' and state == SHARED:
+            # Upgrade: the data is here, only the other copies must go.
+            self.counters['Cache Hits'] += 1
+            self.counters['Upgrades'] += 1
+            self._invalidate_peers(line, word)
+            self.state[line] = MODIFIED
+            s.note_write(self, line, word)
+            return wait + s.hit_latency + s.upgrade_latency
+
+        self.counters['Cache Misses'] += 1
+        self._classify_miss(line, word)
+        latency = wait + self._evict()
+        holders = [c for c in s.peers(self) if c.state.get(line, INVALID) != INVALID]
+        if holders:
+            self.counters['Cache-to-Cache Transfers'] += 1
+            latency += s.transfer_latency
+        else:
+            latency += s.memory_latency
+        if op == 'lw':
+            for c in holders:
+                if c.state[line] == MODIFIED:
+                    c.counters['Writebacks'] += 1
+                c.state[line] = SHARED
+            exclusive = not holders and s.protocol == 'MESI'
+            self.state[line] = EXCLUSIVE if exclusive else SHARED
+        else:
+            self._invalidate_peers(line, word)
+            self.state[line] = MODIFIED
+            s.note_write(self, line, word)
+        return latency + s.hit_latency
+
+    def _invalidate_peers(self, line, word):
+        for c in self.snoop.peers(self):
+            if c.state.get(line, INVALID) != INVALID:
+                if c.state[line] == MODIFIED:
+                    c.counters['Writebacks'] += 1
+                del c.state[line]
+                c.lost[line] = set()
+                c.counters['Invalidations Received'] += 1
+                self.counters['Invalidations Sent'] += 1
+
+    def _classify_miss(self, line, word):
+        written = self.lost.pop(line, None)
+        if written is None:
+            return
+        self.counters['Coherence Misses'] += 1
+        if word in written:
+            self.counters['True Sharing Misses'] += 1
+        else:
+            self.counters['False Sharing Misses'] += 1
+
+    def _evict(self):
+        if len(self.state) < self.snoop.lines:
+            return 0
+        line, state = self.state.popitem(last=False)
+        if state == MODIFIED:
+            self.counters['Writebacks'] += 1
+            return self.snoop.memory_latency
+        return 0
+
+    def statistics(self):
+        return dict(self.counters)
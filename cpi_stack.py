@@ -0,0 +1,122 @@
+from collections import deque
+
+from pipeline_trace import OPCODES
+from isa import BRANCH_OPS
+
+# Every simulated cycle is charged to exactly one cause and one static
+# instruction, so the per-PC stacks add up to the total cycle count:
+#   base       - an instruction reached WB for the first time this cycle
+#   memory     - a lw/sw held a memory stage; charged to that lw/sw
+#   data       - decode issued nothing because an operand was not ready
+#                (load-use and the like); charged to the waiting instruction
+#   structural - any other stage held an instruction for more than one
+#                cycle: a busy functional unit or a stage latency above
+#                one; charged to that instruction
+#   branch     - WB retired a NOP injected behind a branch, or fetch waited
+#                for a branch to resolve; charged to the branch
+#   fill       - nothing in WB and no bubble to account for (pipeline
+#                fill/drain); charged to the oldest instruction still in
+#                flight, or the last one retired
+#
+# The simulator reports each bubble it creates with stall(cause, index).
+# Bubbles move on one stage a cycle and never merge, so each one empties WB
+# exactly once, a few cycles later; an empty (or held) WB takes the oldest
+# bubble not yet charged. memory therefore equals the Memory Stalls
+# statistic and branch the Dynamic NOPs.
+CAUSES = ('base', 'memory', 'data', 'structural', 'branch', 'fill')
+CAUSE_LABELS = {'base': 'Base', 'memory': 'Memory Wait', 'data': 'Data Hazards', 'structural': 'Structural',
+                'branch': 'Branch NOPs', 'fill': 'Fill/Drain'}
+
+
+class CPIStack:
+    # With a superscalar pipeline every stage has `lanes` slots. A cycle that
+    # retires several instructions is charged once, as base, to the oldest of
+    # them; the others still count as executions.
+    def __init__(self, lanes=1):
+        self.lanes = lanes
+        self.clear()
+
+    def clear(self):
+        self.rows = {}
+        self.executions = {}
+        self.cycles = 0
+        self._last_wb = ()
+        self._last_retired = 0
+        self._last_branch = -1
+        self._nop_origin = {}
+        self._bubbles = deque()
+
+    def _charge(self, index, cause):
+        row = self.rows.get(index)
+        if row is None:
+            row = self.rows[index] = dict.fromkeys(CAUSES, 0)
+        row[cause] += 1
+
+    def stall(self, cause, index):
+        self._bubbles.append((index, cause))
+
+    def record(self, cycle, cells):
+        self.cycles += 1
+        lanes = self.lanes
+        for k in range(len(cells) - 1, -1, -1):
+            cell = cells[k]
+            if cell is None:
+                continue
+            if cell[1] >= 0 and OPCODES[cell[0]] in BRANCH_OPS and k >= lanes:
+                self._last_branch = cell[1]
+            elif k < lanes and cell[1] < 0:
+                self._nop_origin[cell[3]] = self._last_branch
+
+        wb = [c for c in cells[-lanes:] if c is not None]
+        new = [c for c in wb if c[3] not in self._last_wb]
+        self._last_wb = {c[3] for c in wb}
+        if not new:
+            if self._bubbles:
+                self._charge(*self._bubbles.popleft())
+            else:
+                oldest = next((c for c in reversed(cells) if c is not None and c[1] >= 0), None)
+                self._charge(oldest[1] if oldest else self._last_retired, 'fill')
+            return
+        real = [c for c in new if c[1] >= 0]
+        origins = [self._nop_origin.pop(c[3], -1) for c in new if c[1] < 0]
+        if not real:
+            self._charge(origins[0], 'branch')
+        else:
+            self._charge(real[0][1], 'base')
+            for c in real:
+                self.executions[c[1]] = self.executions.get(c[1], 0) + 1
+            self._last_retired = real[-1][1]
+
+    def finish(self, cycle):
+        self._nop_origin.clear()
+        self._bubbles.clear()
+
+    def totals(self):
+        return {cause: sum(row[cause] for row in self.rows.values()) for cause in CAUSES}
+
+    def table(self, program=None):
+        rows = []
+        for index in sorted(self.rows):
+            row = self.rows[index]
+            count = self.executions.get(index, 0)
+            total = sum(row.values())
+            rows.append({
+                'index': index,
+                'instruction': program[index].strip() if program and 0 <= index < len(program) else "",
+                'executions': count,
+                'cycles': total,
+                'cpi': total / count if count else 0.0,
+                'share': total / self.cycles * 100 if self.cycles else 0.0,
+                **row,
+            })
+        return rows
+
+    def format_table(self, program=None):
+        header = f"| {'PC':>4} | {'Instruction':24} | {'Execs':>6} | {'Base':>6} | {'Memory':>6} | {'Data':>6} | {'Structural':>10} " \
+                 f"| {'Branch':>6} | {'Fill':>6} | {'Cycles':>7} | {'CPI':>5} | {'Share':>6} |"
+        lines = [header, "|" + "|".join("-" * len(col) for col in header.split("|")[1:-1]) + "|"]
+        for r in sorted(self.table(program), key=lambda r: -r['cycles']):
+            lines.append(f"| {r['index']:4d} | {r['instruction']:24} | {r['executions']:6d} | {r['base']:6d} "
+                         f"| {r['memory']:6d} | {r['data']:6d} | {r['structural']:10d} | {r['branch']:6d} "
+                         f"| {r['fill']:6d} | {r['cycles']:7d} | {r['cpi']:5.2f} | {r['share']:5.1f}% |")
+        return "\n".join(lines)
@@ -0,0 +1,113 @@
+from functional import FunctionalModel
+from isa import UNIT_LATENCY
+
+# How far a run is from the program's dataflow limit. CriticalPath is a trace
+# sink: every instruction that leaves the last stage is replayed on a
+# functional model (which supplies its operands and memory address) and
+# scheduled as early as its register and memory RAW dependencies allow, with
+# perfect branch prediction and unlimited resources. Only the last-writer
+# tables are kept (one entry per register, one per stored-to address), never
+# the dependency graph itself.
+#
+# report() compares the result with the simulator's statistics and splits
+# the cycles the pipeline spent beyond the limit (Total Cycles - Critical
+# Path) into hazard classes, by the cause the CPI stack gave each cycle.
+# Cycles that retired something but were not needed by the dataflow limit
+# are lost to issue. When the limit is longer than the retiring cycles, some
+# stall cycles overlapped it, and every class is scaled down in proportion.
+
+HAZARDS = {'Memory': 'memory', 'Data': 'data', 'Structural': 'structural', 'Control': 'branch', 'Fill/Drain': 'fill'}
+
+
+class CriticalPath:
+    def __init__(self, instructions=None, memory=None, lanes=1, latencies=None):
+        self.model = FunctionalModel(instructions, memory)
+        self.lanes = lanes
+        # Cycles per latency class (the isa unit of an instruction).
+        self.latencies = {**UNIT_LATENCY, **(latencies or {})}
+        self.reg_ready = [0] * 32
+        self.mem_ready = {}
+        self.length = 0
+        self.instructions = 0
+        self._last = set()
+
+    def record(self, cycle, cells):
+        retired = [c for c in cells[-self.lanes:] if c is not None]
+        seen = self._last
+        self._last = {c[3] for c in retired}
+        for cell in sorted(retired, key=lambda c: c[3]):
+            if cell[1] >= 0 and cell[3] not in seen:
+                self._schedule(self.model.step())
+
+    def _schedule(self, record):
+        unit = record['instr']['unit']
+        start = max((self.reg_ready[r] for r in record['reads']), default=0)
+        if unit == 'load':
+            start = max(start, self.mem_ready.get(record['address'], 0))
+        finish = start + self.latencies[unit]
+        if record['dest'] is not None:
+            self.reg_ready[record['dest']] = finish
+        if unit == 'store':
+            self.mem_ready[record['address']] = finish
+        self.length = max(self.length, finish)
+        self.instructions += 1
+
+    def finish(self, cycle):
+        pass
+
+    def report(self, statistics, causes):
+        # causes: the CPI stack's cycles per cause (CPIStack.totals()).
+        cycles = statistics['Total Cycles']
+        ilp = self.instructions / self.length if self.length else 0.0
+        lost = max(cycles - self.length, 0)
+        stalls = {name: causes[cause] for name, cause in HAZARDS.items()}
+        stalls['Issue'] = max(causes['base'] - self.length, 0)
+        hazards = _apportion(stalls, lost)
+        return {
+            'Instructions': self.instructions,
+            'Critical Path': self.length,
+            'ILP': ilp,
+            'Total Cycles': cycles,
+            'IPC': self.instructions / cycles if cycles else 0.0,
+            'Lost Cycles': lost,
+            'Hazard Cycles': hazards,
+            'Hazard Shares': {name: n / cycles * 100 if cycles else 0.0 for name, n in hazards.items()},
+        }
+
+
+def _apportion(parts, total):
+    # Scales parts to add up to total, rounding by largest remainder.
+    whole = sum(parts.values())
+    if not whole:
+        return dict.fromkeys(parts, 0)
+    exact = {name: n * total / whole for name, n in parts.items()}
+    result = {name: int(x) for name, x in exact.items()}
+    for name in sorted(exact, key=lambda name: result[name] - exact[name])[:total - sum(result.values())]:
+        result[name] += 1
+    return result
+
+
+def analyze(sim, latencies=None):
+    # Runs the simulator with the analysis attached; sim must not have run yet.
+    cp = CriticalPath(sim.instruction_memory, sim.memory, sim.issue_width, latencies)
+    sim.trace_sinks.append(cp)
+    try:
+        sim.simulate()
+    finally:
+        sim.trace_sinks.remove(cp)
+    return cp.report(sim.statistics, sim.cpi_stack.totals())
+
+
+if __name__ == "__main__":
+    from simulator import MIPSPipelineSimulator
+    import workloads
+    print(f"| {'Workload':16} | {'Width':>5} | {'Instrs':>6} | {'Path':>5} | {'ILP':>5} | {'IPC':>5} | {'Memory':>6} "
+          f"| {'Data':>5} | {'Struct':>6} | {'Control':>7} | {'Fill':>5} | {'Issue':>5} |")
+    for name in ('prefix_sum', 'pointer_chase', 'strided_access', 'dependency_chain'):
+        wl = workloads.build(name)
+        for width in (1, 4):
+            r = analyze(MIPSPipelineSimulator(wl['instructions'], wl['memory'], issue_width=width))
+            s = r['Hazard Shares']
+            print(f"| {name:16} | {width:5d} | {r['Instructions']:6d} | {r['Critical Path']:5d} | {r['ILP']:5.2f} "
+                  f"| {r['IPC']:5.2f} | {s['Memory']:5.1f}% | {s['Data']:4.1f}% | {s['Structural']:5.1f}% "
+                  f"| {s['Control']:6.1f}% | {s['Fill/Drain']:4.1f}% | {s['Issue']:4.1f}% |")
@@ -0,0 +1,169 @@
+import sys
+
+from functional import FunctionalModel
+from pipeline_trace import base_stage, format_cell
+
+# Runs a simulator cycle by cycle, without rendering anything, until a stop
+# condition hits, and then hands over its state (the simulator itself is
+# left paused mid-run, so the GUI or the CLI can show it and continue):
+#   break_at(index or label, stage)  - the instruction shows up in a stage
+#                                      (the first stage by default)
+#   watch_register(name or number)   - an instruction that writes the
+#                                      register retires
+#   watch_memory(address)            - a store to the word retires
+#   when(condition)                  - any test of the debugger's state, e.g.
+#                                      stall_over(1): a lw/sw with more than
+#                                      one memory stall cycle left
+# add() understands the same as text: "loop", "7@EX", "$t2", "mem[40]",
+# "stall>1".
+#
+# Watchpoints stop on every write, also one that stores the value already
+# there. Like critical_path, the debugger replays each instruction that
+# leaves the last stage on a functional model to see what it writes.
+
+
+class Debugger:
+    def __init__(self, sim):
+        self.sim = sim
+        self.stages = sim.pipeline_log.stages
+        self.breakpoints = []
+        self.registers = {}
+        self.addresses = {}
+        self.conditions = []
+        self.cells = [None] * len(self.stages)
+        self.model = FunctionalModel(sim.instruction_memory, sim.memory)
+        self.writes = []
+        self.cycle = 0
+        self.done = False
+        self._cycles = None
+        self._hit = set()
+        self._retired = set()
+
+    def _cells_of(self, stage):
+        return [k for k, name in enumerate(self.stages) if base_stage(name) == stage]
+
+    def break_at(self, where, stage=None):
+        index = self.sim.label_to_index[where] if isinstance(where, str) else where
+        stage = self.sim.pipeline.names[0] if stage is None else stage
+        if not self._cells_of(stage):
+            raise ValueError(f"Unknown stage: {stage}")
+        self.breakpoints.append((index, stage, self._cells_of(stage), f"breakpoint {where} in {stage}"))
+
+    def watch_register(self, reg):
+        num = self.sim._get_reg_num(reg) if isinstance(reg, str) else reg
+        self.registers[num] = (reg if isinstance(reg, str) else f"${reg}", self.sim.registers[num])
+
+    def watch_memory(self, address):
+        self.addresses[address] = self.sim.memory.get(address)
+
+    def when(self, condition, name=None):
+        self.conditions.append((condition, name or getattr(condition, '__name__', 'condition')))
+
+    def stall_over(self, n):
+        cells = [k for k, name in enumerate(self.stages) if self.sim.pipeline.role(base_stage(name)) == 'memory']
+        self.when(lambda d: any(d.cells[k] is not None and d.cells[k][2] > n for k in cells), f"MEM stall > {n}")
+
+    def add(self, spec):
+        spec = spec.strip()
+        if spec.startswith('$'):
+            self.watch_register(spec)
+        elif spec.startswith('mem[') and spec.endswith(']'):
+            self.watch_memory(int(spec[4:-1]))
+        elif spec.startswith('stall>'):
+            self.stall_over(int(spec[6:]))
+        else:
+            where, _, stage = spec.partition('@')
+            self.break_at(int(where) if where.lstrip('-').isdigit() else where, stage or None)
+
+    def record(self, cycle, cells):
+        self.cells = cells
+        retired = [c for c in cells[-self.sim.issue_width:] if c is not None]
+        seen = self._retired
+        self._retired = {c[3] for c in retired}
+        self.writes = []
+        for cell in sorted(retired, key=lambda c: c[3]):
+            if cell[1] >= 0 and cell[3] not in seen:
+                record = self.model.step()
+                if record['instr']['unit'] == 'store':
+                    self.writes.append(('mem', record['address'], self.model.memory[record['address']]))
+                elif record['dest'] is not None:
+                    self.writes.append(('reg', record['dest'], record['value']))
+
+    def finish(self, cycle):
+        pass
+
+    def step(self):
+        # Advances one cycle; returns the stops it triggered (empty at the end).
+        if self.done:
+            return []
+        if self._cycles is None:
+            self.sim.trace_sinks.append(self)
+            self._cycles = self.sim.cycles()
+        try:
+            self.cycle = next(self._cycles)
+        except StopIteration:
+            self.done = True
+            self.sim.trace_sinks.remove(self)
+            return []
+
+        stops = []
+        for index, stage, cells, reason in self.breakpoints:
+            for k in cells:
+                cell = self.cells[k]
+                if cell is not None and cell[1] == index and (cell[3], stage) not in self._hit:
+                    self._hit.add((cell[3], stage))
+                    stops.append(reason)
+        for kind, where, new in self.writes:
+            if kind == 'reg' and where in self.registers:
+                name, old = self.registers[where]
+                self.registers[where] = (name, new)
+                stops.append(f"{name} written {old} -> {new}")
+            elif kind == 'mem' and where in self.addresses:
+                old = self.addresses[where]
+                self.addresses[where] = new
+                stops.append(f"mem[{where}] written {old} -> {new}")
+        for condition, name in self.conditions:
+            if condition(self):
+                stops.append(name)
+        return stops
+
+    def run(self, max_cycles=None):
+        # Fast-forwards to the next stop; returns the state there, or None
+        # once the program has finished.
+        limit = None if max_cycles is None else self.cycle + max_cycles
+        while not self.done:
+            stops = self.step()
+            if stops:
+                return self.state(stops)
+            if limit is not None and self.cycle >= limit:
+                return self.state(["cycle limit"])
+        return None
+
+    def resume(self):
+        # Runs to the end without stopping and returns the final state.
+        while not self.done:
+            self.step()
+        return {'registers': self.sim.registers, 'memory': self.sim.memory}
+
+    def state(self, stops=()):
+        return {'cycle': self.cycle, 'stops': list(stops),
+                'stages': dict(zip(self.stages, (format_cell(c[0], c[2]) if c else "--" for c in self.cells))),
+                'registers': list(self.sim.registers), 'memory': dict(self.sim.memory)}
+
+
+if __name__ == "__main__":
+    # python debugger.py <spec> [<spec> ...] on the default program, e.g.
+    #   python debugger.py loop@EX '$t2' 'mem[40]' 'stall>1'
+    from simulator import MIPSPipelineSimulator
+    sim = MIPSPipelineSimulator()
+    sim.keep_log = False
+    dbg = Debugger(sim)
+    for spec in sys.argv[1:] or ['loop@EX']:
+        dbg.add(spec)
+    while True:
+        state = dbg.run()
+        if state is None:
+            break
+        busy = " ".join(f"{name}:{op}" for name, op in state['stages'].items() if op != "--")
+        print(f"cycle {state['cycle']:4d}: {'; '.join(state['stops'])}  [{busy}]")
+    print(f"finished after {sim.statistics['Total Cycles']} cycles")
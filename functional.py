@@ -0,0 +1,69 @@
+from simulator import MIPSPipelineSimulator
+from isa import ALU_UNITS
+
+# The architectural behaviour of the pipelined simulator without any timing:
+# one instruction per step, in program order. Every branch and jump has one
+# delay slot (the next instruction always executes) and a branch in a delay
+# slot takes effect after the first instruction at the earlier target, as in
+# the pipeline. Registers and memory end up exactly as after simulate().
+
+
+class FunctionalModel:
+    def __init__(self, instructions=None, memory=None):
+        sim = MIPSPipelineSimulator(instructions, memory)
+        self.instruction_memory = sim.instruction_memory
+        self.program = sim.filtered_instructions
+        self.label_to_index = sim.label_to_index
+        self.registers = sim.registers
+        self.memory = sim.memory
+        self.decoded = sim._decoded
+        self.pc = 0
+        self.pending = None
+        self.executed = 0
+
+    def done(self):
+        return self.pc >= len(self.program)
+
+    def step(self):
+        # Executes the next instruction and returns what it did: its index,
+        # decoded form, the registers it read, the register it wrote (dest,
+        # value) and the memory address it accessed, or None at the end.
+        if self.done():
+            return None
+        index = self.pc
+        ins = self.decoded(index)
+        regs = self.registers
+        unit = ins['unit']
+        values = [regs[r] for r in ins['reads']]
+        record = {'index': index, 'instr': ins, 'reads': ins['reads'], 'dest': ins['dest'], 'value': None,
+                  'address': None}
+        taken = unit == 'jump' or (unit == 'branch' and ins['fn'](*values))
+        if unit in ALU_UNITS:
+            record['value'] = ins['fn'](*values, *ins['const'])
+        elif unit == 'jump' and ins['dest'] is not None:
+            record['value'] = index + 2
+        elif unit == 'load':
+            address = record['address'] = values[0] + ins['offset']
+            record['value'] = self.memory.get(address, 0)
+        elif unit == 'store':
+            address = record['address'] = values[1] + ins['offset']
+            self.memory[address] = values[0]
+
+        if record['dest'] is not None:
+            regs[record['dest']] = record['value']
+        self.pc = index + 1 if self.pending is None else self.pending
+        self.pending = (ins['target'] if 'target' in ins else values[0]) if taken else None
+        self.executed += 1
+        return record
+
+    def stream(self):
+        while True:
+            record = self.step()
+            if record is None:
+                return
+            yield record
+
+    def run(self):
+        for _ in self.stream():
+            pass
+        return {'registers': self.registers, 'memory': self.memory}
@@ -0,0 +1,122 @@
+# The instruction set as data. Decoding, hazard checks and execution in the
+# simulators are all driven by this table, so a new opcode is one entry here.
+#
+# Every opcode has
+#   format - operand syntax, one of FORMATS
+#   type   - 'R', 'I', 'J' or 'nop', as in the original decoder
+#   unit   - latency class: what executes it (alu, mul, div), or its kind
+#            (branch, jump, load, store, nop)
+#   fn     - alu/mul/div: the result from the values of the registers read
+#            (in `reads` order) followed by the immediate, if any, wrapped
+#            to 32-bit two's complement; branch: whether it is taken. Only
+#            operators are used, so the same function also works
+#            element-wise on NumPy arrays.
+#   reads  - register fields read, in operand order
+#   writes - register field written, if any
+#   fixed  - fields implied by the opcode (jal links through $ra)
+#
+# Branch and jump targets are instruction indices: jal leaves the index after
+# its delay slot in $ra, and jr jumps to the index held in a register.
+
+REGISTERS = {
+    '$zero': 0, '$at': 1, '$v0': 2, '$v1': 3, '$a0': 4, '$a1': 5, '$a2': 6, '$a3': 7,
+    '$t0': 8, '$t1': 9, '$t2': 10, '$t3': 11, '$t4': 12, '$t5': 13, '$t6': 14, '$t7': 15,
+    '$s0': 16, '$s1': 17, '$s2': 18, '$s3': 19, '$s4': 20, '$s5': 21, '$s6': 22, '$s7': 23,
+    '$t8': 24, '$t9': 25, '$k0': 26, '$k1': 27, '$gp': 28, '$sp': 29, '$fp': 30, '$ra': 31,
+}
+REGISTER_NAMES = {num: name for name, num in REGISTERS.items()}
+REGISTERS.update({f"${num}": num for num in range(32)})
+RA = REGISTERS['$ra']
+
+FORMATS = {
+    'rrr': ('rd', 'rs', 'rt'),
+    'rri': ('rd', 'rs', 'imm'),
+    'shift': ('rd', 'rt', 'imm'),
+    'branch': ('rs', 'rt', 'label'),
+    'mem': ('rt', 'mem'),
+    'jump': ('label',),
+    'reg': ('rs',),
+    'none': (),
+}
+
+# Cycles an instruction of each class spends executing.
+UNIT_LATENCY = {'alu': 1, 'mul': 4, 'div': 12, 'branch': 1, 'jump': 1, 'load': 1, 'store': 1, 'nop': 1}
+ALU_UNITS = ('alu', 'mul', 'div')
+
+
+def _op(fmt, type, unit, fn=None, reads=(), writes=None, fixed=None):
+    return {'format': fmt, 'type': type, 'unit': unit, 'fn': fn, 'reads': reads, 'writes': writes,
+            'fixed': fixed or {}}
+
+
+def _wrap(x):
+    # Two's complement overflow of a 32-bit register.
+    return (x + 2 ** 31) % 2 ** 32 - 2 ** 31
+
+
+def _div(a, b):
+    # Truncates towards zero, as MIPS does; division by zero gives 0.
+    return _wrap(abs(a) // (abs(b) + (b == 0)) * (1 - 2 * ((a < 0) != (b < 0))) * (b != 0))
+
+
+ISA = {
+    'add': _op('rrr', 'R', 'alu', lambda a, b: _wrap(a + b), ('rs', 'rt'), 'rd'),
+    'sub': _op('rrr', 'R', 'alu', lambda a, b: _wrap(a - b), ('rs', 'rt'), 'rd'),
+    'and': _op('rrr', 'R', 'alu', lambda a, b: a & b, ('rs', 'rt'), 'rd'),
+    'or': _op('rrr', 'R', 'alu', lambda a, b: a | b, ('rs', 'rt'), 'rd'),
+    'mul': _op('rrr', 'R', 'mul', lambda a, b: _wrap(a * b), ('rs', 'rt'), 'rd'),
+    'div': _op('rrr', 'R', 'div', _div, ('rs', 'rt'), 'rd'),
+    'sll': _op('shift', 'R', 'alu', lambda a, b: _wrap(a << b), ('rt',), 'rd'),
+    'addi': _op('rri', 'I', 'alu', lambda a, b: _wrap(a + b), ('rs',), 'rd'),
+    'slti': _op('rri', 'I', 'alu', lambda a, b: (a < b) * 1, ('rs',), 'rd'),
+    'beq': _op('branch', 'I', 'branch', lambda a, b: a == b, ('rs', 'rt')),
+    'bne': _op('branch', 'I', 'branch', lambda a, b: a != b, ('rs', 'rt')),
+    'j': _op('jump', 'J', 'jump'),
+    'jal': _op('jump', 'J', 'jump', writes='rd', fixed={'rd': RA}),
+    'jr': _op('reg', 'R', 'jump', reads=('rs',)),
+    'lw': _op('mem', 'I', 'load', reads=('base',), writes='rt'),
+    'sw': _op('mem', 'I', 'store', reads=('rt', 'base')),
+    'nop': _op('none', 'nop', 'nop'),
+}
+
+BRANCH_OPS = {op for op, spec in ISA.items() if spec['unit'] in ('branch', 'jump')}
+
+
+def register_number(name):
+    num = REGISTERS.get(name)
+    if num is None:
+        raise ValueError(f"Unknown register: {name}")
+    return num
+
+
+def decode(instr):
+    # Besides the operand fields, a decoded instruction carries what the
+    # pipeline needs without looking at the opcode again: unit, fn, the
+    # register numbers it reads, its destination (or None) and the
+    # immediate operands passed to fn.
+    parts = instr.replace(',', ' ').split()
+    spec = ISA.get(parts[0]) if parts else None
+    fields = FORMATS[spec['format']] if spec else ()
+    if spec is None or len(parts) - 1 != len(fields):
+        raise ValueError(f"Unknown instruction: {instr}")
+    ins = {'type': spec['type'], 'opcode': parts[0]}
+    for field, text in zip(fields, parts[1:]):
+        if field == 'mem':
+            offset, base = text.split('(')
+            ins['offset'] = int(offset)
+            ins['base'] = register_number(base.strip(')'))
+        elif field == 'imm':
+            ins['imm'] = int(text)
+            if spec['format'] == 'shift' and not 0 <= ins['imm'] < 32:
+                raise ValueError(f"Shift amount out of range: {instr}")
+        elif field == 'label':
+            ins['label'] = text
+        else:
+            ins[field] = register_number(text)
+    ins.update(spec['fixed'])
+    ins['unit'] = spec['unit']
+    ins['fn'] = spec['fn']
+    ins['reads'] = tuple(ins[f] for f in spec['reads'])
+    ins['dest'] = ins[spec['writes']] if spec['writes'] else None
+    ins['const'] = (ins['imm'],) if 'imm' in ins else ()
+    return ins
@@ -0,0 +1,313 @@
+import random
+from collections import OrderedDict
+
+# A memory model decides how many MEM cycles a lw/sw occupies. The simulator
+# calls latency(op, address, cycle, pc) from the EX stage, where the address
+# is computed; pc is the index of the lw/sw in the program. The data itself
+# still lives in the simulator's memory dict.
+
+
+class RandomLatency:
+    # The original model: every access takes 2 or 3 cycles at random.
+    def __init__(self, low=2, high=3, rng=random):
+        self.low = low
+        self.high = high
+        self.rng = rng
+
+    def latency(self, op, address, cycle, pc=None):
+        return self.rng.randint(self.low, self.high)
+
+    def statistics(self):
+        return {}
+
+
+class SharedBus:
+    # A single bus shared by several cores. Each access holds it for
+    # `occupancy` cycles; a request arriving while it is busy waits its turn.
+    def __init__(self, occupancy=1):
+        self.occupancy = occupancy
+        self.busy_until = 0
+        self.requests = 0
+        self.wait_cycles = 0
+
+    def acquire(self, cycle):
+        start = max(cycle, self.busy_until)
+        self.busy_until = start + self.occupancy
+        wait = start - cycle
+        self.requests += 1
+        self.wait_cycles += wait
+        return wait
+
+
+class BusMemoryModel:
+    # Wraps a core's memory model: every access first arbitrates for the bus,
+    # and the time spent waiting is added to the access latency.
+    def __init__(self, bus, base=None):
+        self.bus = bus
+        self.base = base if base is not None else RandomLatency()
+        self.requests = 0
+        self.wait_cycles = 0
+
+    def latency(self, op, address, cycle, pc=None):
+        wait = self.bus.acquire(cycle)
+        self.requests += 1
+        self.wait_cycles += wait
+        return self.base.latency(op, address, cycle, pc) + wait
+
+    def statistics(self):
+        return {'Bus Requests': self.requests, 'Bus Wait Cycles': self.wait_cycles, **self.base.statistics()}
+
+
+class StridePrefetcher:
+    # A PC-indexed stride prefetcher. Each lw remembers its last address and
+    # stride; once the same non-zero stride is seen twice in a row it
+    # predicts `degree` addresses, starting `distance` strides ahead.
+    def __init__(self, degree=1, distance=1, table_size=64):
+        self.degree = degree
+        self.distance = distance
+        self.table_size = table_size
+        self.table = OrderedDict()
+
+    def predict(self, pc, address):
+        last, stride, confirmed = self.table.pop(pc, (None, 0, False))
+        if last is not None:
+            new = address - last
+            confirmed = new == stride and new != 0
+            stride = new
+        self.table[pc] = (address, stride, confirmed)
+        if len(self.table) > self.table_size:
+            self.table.popitem(last=False)
+        if not confirmed:
+            return []
+        return [address + stride * (self.distance + i) for i in range(self.degree)]
+
+
+class PrefetchMemoryModel:
+    # Puts a prefetcher in front of another memory model. Every lw trains the
+    # prefetcher; each predicted address is fetched into a small prefetch
+    # buffer, ready once the fill model's latency has passed. A lw that finds
+    # its address there takes hit_latency cycles (useful), or waits for the
+    # data still on its way (late). Prefetches evicted from the buffer or
+    # never used are useless.
+    #
+    # Fills go through the base model, so a DRAM backend sees the prefetches
+    # and a lw that hits does not access it again. A RandomLatency base is
+    # the exception: fills draw from a copy with its own generator and every
+    # lw is still timed by the base, hit or not, so the base draws the same
+    # latencies as it would with no prefetcher and runs with and without one
+    # differ only by the prefetches. fill overrides the model used for fills.
+    def __init__(self, base=None, prefetcher=None, buffer_size=16, hit_latency=1, fill=None, seed=0):
+        self.base = base if base is not None else RandomLatency()
+        if fill is None and isinstance(self.base, RandomLatency):
+            fill = RandomLatency(self.base.low, self.base.high, random.Random(seed))
+        self.fill = fill if fill is not None else self.base
+        self.prefetcher = prefetcher if prefetcher is not None else StridePrefetcher()
+        self.buffer_size = buffer_size
+        self.hit_latency = hit_latency
+        self.buffer = OrderedDict()
+        self.issued = 0
+        self.useful = 0
+        self.late = 0
+        self.evicted = 0
+        self.demand_misses = 0
+
+    def latency(self, op, address, cycle, pc=None):
+        if op != 'lw':
+            return self.base.latency(op, address, cycle, pc)
+        ready = self.buffer.pop(address, None)
+        if ready is None or self.fill is not self.base:
+            latency = self.base.latency(op, address, cycle, pc)
+        if ready is None:
+            self.demand_misses += 1
+        elif ready <= cycle:
+            self.useful += 1
+            latency = self.hit_latency
+        else:
+            self.late += 1
+            latency = max(self.hit_latency, ready - cycle)
+        for target in self.prefetcher.predict(pc, address):
+            if target in self.buffer or target == address:
+                continue
+            self.issued += 1
+            self.buffer[target] = cycle + self.fill.latency('lw', target, cycle, pc)
+            if len(self.buffer) > self.buffer_size:
+                self.buffer.popitem(last=False)
+                self.evicted += 1
+        return latency
+
+    def statistics(self):
+        return {'Prefetches Issued': self.issued, 'Useful Prefetches': self.useful, 'Late Prefetches': self.late,
+                'Useless Prefetches': self.evicted + len(self.buffer), 'Demand Misses': self.demand_misses,
+                **self.base.statistics()}
+
+
+class DRAMMemoryModel:
+    # A DRAM backend. Byte addresses map to channel, bank and row with
+    # consecutive rows of row_size bytes spread over the channels, then the
+    # banks, so a sequential stream stays in one open row for a while.
+    #
+    # Each bank keeps one row open in its row buffer. An access to the open
+    # row is a hit (t_cas), to a closed bank a miss (t_rcd + t_cas), and to
+    # another row a conflict (t_rp + t_rcd + t_cas). With the closed-page
+    # policy the row is closed after every access, so there are no hits and
+    # no conflicts. Banks work in parallel; an access waits only for its own
+    # bank, and then for its channel's data bus for `burst` cycles.
+    #
+    # Every refresh_interval cycles, starting at cycle refresh_interval, a
+    # channel refreshes for refresh_time cycles: accesses wait for the
+    # refresh to end and every row is closed.
+    def __init__(self, channels=1, banks=8, row_size=256, t_cas=2, t_rcd=2, t_rp=2, burst=1,
+                 refresh_interval=400, refresh_time=8, policy='open'):
+        if policy not in ('open', 'closed'):
+            raise ValueError(f"Unknown page policy: {policy}")
+        self.channels = channels
+        self.banks = banks
+        self.row_size = row_size
+        self.t_cas = t_cas
+        self.t_rcd = t_rcd
+        self.t_rp = t_rp
+        self.burst = burst
+        self.refresh_interval = refresh_interval
+        self.refresh_time = refresh_time
+        self.policy = policy
+        self.open_rows = {}
+        self.bank_free = {}
+        self.bank_refresh = {}
+        self.bus_free = [0] * channels
+        self.counters = {}
+        self.refresh_wait = 0
+        self.bank_wait = 0
+
+    def map(self, address):
+        chunk = address // self.row_size
+        return chunk % self.channels, chunk // self.channels % self.banks, chunk // (self.channels * self.banks)
+
+    def _refresh(self, start):
+        # Pushes start past a refresh blackout and returns it with the number
+        # of the last refresh that began at or before it.
+        if not self.refresh_interval:
+            return start, 0
+        period, phase = divmod(start, self.refresh_interval)
+        if period and phase < self.refresh_time:
+            self.refresh_wait += self.refresh_time - phase
+            start += self.refresh_time - phase
+        return start, period
+
+    def latency(self, op, address, cycle, pc=None):
+        channel, bank, row = self.map(address)
+        key = (channel, bank)
+        counters = self.counters.get(key)
+        if counters is None:
+            counters = self.counters[key] = {'Accesses': 0, 'Row Hits': 0, 'Row Misses': 0, 'Row Conflicts': 0}
+        start = max(cycle, self.bank_free.get(key, 0))
+        self.bank_wait += start - cycle
+        start, period = self._refresh(start)
+        if self.bank_refresh.get(key) != period:
+            self.bank_refresh[key] = period
+            self.open_rows.pop(key, None)
+
+        open_row = self.open_rows.get(key)
+        if open_row == row:
+            counters['Row Hits'] += 1
+            core = self.t_cas
+        elif open_row is None:
+            counters['Row Misses'] += 1
+            core = self.t_rcd + self.t_cas
+        else:
+            counters['Row Conflicts'] += 1
+            core = self.t_rp + self.t_rcd + self.t_cas
+        counters['Accesses'] += 1
+        if self.policy == 'open':
+            self.open_rows[key] = row
+        else:
+            self.open_rows.pop(key, None)
+
+        self.bank_free[key] = start + core
+        data = max(start + core, self.bus_free[channel])
+        self.bus_free[channel] = data + self.burst
+        return data + self.burst - cycle
+
+    def bank_statistics(self):
+        rows = []
+        for (channel, bank), counters in sorted(self.counters.items()):
+            hits = counters['Row Hits']
+            rows.append({'channel': channel, 'bank': bank, **counters,
+                         'Row Hit Rate': hits / counters['Accesses'] * 100 if counters['Accesses'] else 0.0})
+        return rows
+
+    def format_banks(self):
+        lines = [f"| {'Bank':>5} | {'Accesses':>8} | {'Hits':>6} | {'Misses':>6} | {'Conflicts':>9} | {'Hit Rate':>8} |",
+                 f"|{'-' * 7}|{'-' * 10}|{'-' * 8}|{'-' * 8}|{'-' * 11}|{'-' * 10}|"]
+        for r in self.bank_statistics():
+            lines.append(f"| {r['channel']:>2}.{r['bank']:<2} | {r['Accesses']:8d} | {r['Row Hits']:6d} "
+                         f"| {r['Row Misses']:6d} | {r['Row Conflicts']:9d} | {r['Row Hit Rate']:7.1f}% |")
+        return "\n".join(lines)
+
+    def statistics(self):
+        total = {name: sum(c[name] for c in self.counters.values())
+                 for name in ('Accesses', 'Row Hits', 'Row Misses', 'Row Conflicts')}
+        return {'DRAM Accesses': total['Accesses'], 'Row Hits': total['Row Hits'], 'Row Misses': total['Row Misses'],
+                'Row Conflicts': total['Row Conflicts'],
+                'Row Hit Rate': total['Row Hits'] / total['Accesses'] * 100 if total['Accesses'] else 0.0,
+                'Bank Wait Cycles': self.bank_wait, 'Refresh Wait Cycles': self.refresh_wait}
+
+
+def prefetch_study(degrees=(1, 2, 4), distance=1, names=('prefix_sum', 'strided_access', 'pointer_chase'),
+                   simulator=None, seed=0):
+    # Memory stalls with and without a stride prefetcher in front of the
+    # default memory model, and the share of them the prefetcher recovers.
+    import workloads
+    if simulator is None:
+        from simulator import MIPSPipelineSimulator as simulator
+    rows = []
+    for name in names:
+        wl = workloads.build(name)
+        baseline = None
+        for degree in (0,) + tuple(degrees):
+            random.seed(seed)
+            sim = simulator(wl['instructions'], wl['memory'])
+            if degree:
+                sim.memory_model = PrefetchMemoryModel(prefetcher=StridePrefetcher(degree, distance))
+            sim.simulate()
+            stats = sim.statistics
+            if baseline is None:
+                baseline = stats['Memory Stalls']
+            rows.append({'workload': name, 'degree': degree, 'Total Cycles': stats['Total Cycles'],
+                         'Memory Stalls': stats['Memory Stalls'],
+                         'Recovered': (baseline - stats['Memory Stalls']) / baseline * 100 if baseline else 0.0,
+                         **{k: stats.get(k, 0) for k in ('Useful Prefetches', 'Late Prefetches', 'Useless Prefetches')}})
+    return rows
+
+
+def dram_study(name='prefix_sum', params=None, policies=('open', 'closed'), simulator=None, seed=0, **dram_options):
+    # Runs one workload on the DRAM backend under each page policy and keeps
+    # the model, so its per-bank row-buffer statistics can be inspected.
+    import workloads
+    if simulator is None:
+        from simulator import MIPSPipelineSimulator as simulator
+    wl = workloads.build(name, **(params or {}))
+    runs = []
+    for policy in policies:
+        random.seed(seed)
+        sim = simulator(wl['instructions'], wl['memory'])
+        sim.memory_model = DRAMMemoryModel(policy=policy, **dram_options)
+        sim.simulate()
+        runs.append({'policy': policy, 'statistics': sim.statistics, 'model': sim.memory_model})
+    return runs
+
+
+if __name__ == "__main__":
+    print("stride prefetcher:")
+    print(f"| {'Workload':16} | {'Degree':>6} | {'Cycles':>7} | {'Stalls':>6} | {'Recovered':>9} | {'Useful':>6} "
+          f"| {'Late':>5} | {'Useless':>7} |")
+    for row in prefetch_study():
+        print(f"| {row['workload']:16} | {row['degree']:6d} | {row['Total Cycles']:7d} | {row['Memory Stalls']:6d} "
+              f"| {row['Recovered']:8.1f}% | {row['Useful Prefetches']:6d} | {row['Late Prefetches']:5d} "
+              f"| {row['Useless Prefetches']:7d} |")
+
+    for run in dram_study(params={'n': 256}):
+        stats = run['statistics']
+        print(f"\nDRAM, {run['policy']} page: {stats['Total Cycles']} cycles, row hit rate {stats['Row Hit Rate']:.1f}%, "
+              f"{stats['Refresh Wait Cycles']} refresh wait cycles")
+        print(run['model'].format_banks())
+
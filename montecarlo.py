@@ -0,0 +1,80 @@
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+
+from batch import BatchSimulator
+from memory_models import RandomLatency
+
+# Adaptive Monte Carlo over the random memory latencies. Seeded batches are
+# run (one BatchSimulator per batch, `workers` batches at a time in separate
+# processes) until the confidence interval of the mean Total Cycles and of
+# the mean IPC is within rel_error of the mean, or max_samples is reached.
+# Seeds are consecutive from `seed`, so a run is reproducible.
+
+METRICS = ('Total Cycles', 'IPC')
+
+
+def _run_batch(instructions, memory, seeds, low, high):
+    models = [RandomLatency(low, high, rng=random.Random(s)) for s in seeds]
+    sim = BatchSimulator(instructions, [memory] * len(seeds) if memory is not None else None, memory_models=models)
+    sim.simulate()
+    return [[stats[name] for name in METRICS] for stats in sim.statistics]
+
+
+def interval(values, confidence=0.95):
+    # Mean and half-width of the normal-approximation confidence interval.
+    values = np.asarray(values, dtype=float)
+    if len(values) < 2:
+        return float(values.mean()) if len(values) else 0.0, float('inf')
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return float(values.mean()), float(z * values.std(ddof=1) / np.sqrt(len(values)))
+
+
+def monte_carlo(instructions=None, memory=None, rel_error=0.01, confidence=0.95, batch=32, min_samples=32,
+                max_samples=100000, workers=None, seed=0, low=2, high=3):
+    workers = workers or os.cpu_count() or 1
+    samples = []
+    next_seed = seed
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    try:
+        while True:
+            rounds = []
+            for _ in range(workers):
+                size = min(batch, max_samples - len(samples) - sum(len(s) for _, s in rounds))
+                if size <= 0:
+                    break
+                seeds = range(next_seed, next_seed + size)
+                next_seed += size
+                args = (instructions, memory, seeds, low, high)
+                rounds.append((pool.submit(_run_batch, *args) if pool else _run_batch(*args), seeds))
+            for result, _ in rounds:
+                samples.extend(result.result() if pool else result)
+
+            report = {'Samples': len(samples), 'Seeds': (seed, next_seed - 1)}
+            converged = len(samples) >= min_samples
+            for k, name in enumerate(METRICS):
+                mean, half = interval([s[k] for s in samples], confidence)
+                report[name] = mean
+                report[f'{name} CI'] = half
+                report[f'{name} Relative Error'] = half / mean if mean else 0.0
+                converged = converged and half <= rel_error * abs(mean)
+            report['Converged'] = converged
+            if converged or len(samples) >= max_samples:
+                return report
+    finally:
+        if pool:
+            pool.shutdown()
+
+
+if __name__ == "__main__":
+    import workloads
+    print(f"| {'Workload':16} | {'Target':>6} | {'Samples':>7} | {'Cycles':>16} | {'IPC':>15} |")
+    for name in ('prefix_sum', 'pointer_chase', 'strided_access'):
+        wl = workloads.build(name)
+        for target in (0.005, 0.001):
+            r = monte_carlo(wl['instructions'], wl['memory'], rel_error=target)
+            print(f"| {name:16} | {target:6.3f} | {r['Samples']:7d} | {r['Total Cycles']:8.2f} ± {r['Total Cycles CI']:5.2f} "
+                  f"| {r['IPC']:6.4f} ± {r['IPC CI']:6.4f} |")
@@ -0,0 +1,125 @@
+import random
+import sys
+
+from memory_models import RandomLatency, SharedBus, BusMemoryModel
+from coherence import SnoopBus, COUNTERS
+
+# N pipeline cores, each with its own program and register file, over one
+# shared data memory. All cores advance one cycle at a time in lockstep; the
+# order in which they reach the bus rotates every cycle (round-robin
+# arbitration) and each lw/sw pays for the time it waits on the bus.
+# With coherence='MSI' or 'MESI' each core gets a private cache kept coherent
+# by snooping the same bus, and only misses and upgrades go over it.
+
+
+class MulticoreSimulator:
+    def __init__(self, programs, memory=None, simulator=None, bus_occupancy=1, memory_model=None,
+                 coherence=None, **cache_options):
+        if simulator is None:
+            from simulator import MIPSPipelineSimulator as simulator
+        self.memory = dict(memory or {})
+        self.bus = SharedBus(bus_occupancy)
+        self.snoop = SnoopBus(coherence, self.bus, **cache_options) if coherence else None
+        self.cores = []
+        for program in programs:
+            core = simulator(program, {})
+            core.memory = self.memory
+            if self.snoop is not None:
+                core.memory_model = self.snoop.attach()
+            else:
+                base = memory_model() if memory_model is not None else RandomLatency()
+                core.memory_model = BusMemoryModel(self.bus, base)
+            self.cores.append(core)
+        self.statistics = {}
+
+    def simulate(self):
+        running = {k: core.cycles() for k, core in enumerate(self.cores)}
+        cycle = 0
+        while running:
+            cycle += 1
+            order = list(running)
+            shift = cycle % len(order)
+            for k in order[shift:] + order[:shift]:
+                try:
+                    next(running[k])
+                except StopIteration:
+                    del running[k]
+
+        per_core = [core.statistics for core in self.cores]
+        # The loop notices the last core has stopped one round after its
+        # final cycle; the run is as long as that core's.
+        cycle = max(s['Total Cycles'] for s in per_core)
+        instructions = sum(s['Instructions Executed'] for s in per_core)
+        self.statistics = {
+            'Cores': len(self.cores),
+            'Total Cycles': cycle,
+            'Instructions Executed': instructions,
+            'Memory Stalls': sum(s['Memory Stalls'] for s in per_core),
+            'Dynamic NOPs': sum(s['Dynamic NOPs'] for s in per_core),
+            'Bus Requests': self.bus.requests,
+            'Bus Wait Cycles': self.bus.wait_cycles,
+            'Bus Utilization': self.bus.requests * self.bus.occupancy / cycle if cycle else 0,
+            'Aggregate IPC': instructions / cycle if cycle else 0,
+            'Per Core': per_core,
+        }
+        if self.snoop is not None:
+            self.statistics['Coherence'] = self.snoop.protocol
+            self.statistics.update(self.snoop.statistics())
+        return {'registers': [core.registers for core in self.cores], 'memory': self.memory}
+
+
+def scaling(n=64, core_counts=(1, 2, 4), bus_occupancy=1, seed=0):
+    # Runs the parallel prefix sum on each core count and checks the result.
+    import workloads
+    rows = []
+    for cores in core_counts:
+        wl = workloads.parallel_prefix_sum(n, cores)
+        random.seed(seed)
+        mc = MulticoreSimulator(wl['programs'], wl['memory'], bus_occupancy=bus_occupancy)
+        final = mc.simulate()
+        expected = 0
+        correct = True
+        for i in range(n):
+            expected += i
+            correct = correct and final['memory'][i * 4] == expected
+        stats = mc.statistics
+        rows.append({'cores': cores, 'cycles': stats['Total Cycles'], 'ipc': stats['Aggregate IPC'],
+                     'bus_wait': stats['Bus Wait Cycles'], 'correct': correct})
+    base = rows[0]['cycles']
+    for row in rows:
+        row['speedup'] = base / row['cycles']
+    return rows
+
+
+def sharing(n=64, cores=4, protocols=('MSI', 'MESI'), line_size=16, seed=0):
+    # Runs the partitioned prefix sum with blocked and interleaved layouts under
+    # each protocol; interleaving puts every core's words on the same lines.
+    import workloads
+    rows = []
+    for protocol in protocols:
+        for layout in ('blocked', 'interleaved'):
+            wl = workloads.partitioned_prefix_sum(n, cores, layout)
+            random.seed(seed)
+            mc = MulticoreSimulator(wl['programs'], wl['memory'], coherence=protocol, line_size=line_size)
+            final = mc.simulate()
+            correct = all(final['memory'][a] == v for a, v in wl['expected'].items())
+            rows.append({'protocol': protocol, 'layout': layout, 'cycles': mc.statistics['Total Cycles'],
+                         'correct': correct, **{name: mc.statistics[name] for name in COUNTERS}})
+    return rows
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    print(f"Parallel prefix sum, n={n}")
+    print(f"| {'Cores':>5} | {'Cycles':>7} | {'Speedup':>7} | {'Agg IPC':>7} | {'Bus Wait':>8} | Correct |")
+    for row in scaling(n, (1, 2, 4, 8)):
+        print(f"| {row['cores']:5d} | {row['cycles']:7d} | {row['speedup']:7.2f} | {row['ipc']:7.2f} "
+              f"| {row['bus_wait']:8d} | {str(row['correct']):7} |")
+
+    print(f"\nPartitioned prefix sum on 4 cores, n={n}")
+    print(f"| {'Protocol':>8} | {'Layout':>11} | {'Cycles':>7} | {'Misses':>6} | {'Upgr':>5} | {'Inval':>5} "
+          f"| {'C2C':>5} | {'True Sh':>7} | {'False Sh':>8} | Correct |")
+    for row in sharing(n):
+        print(f"| {row['protocol']:>8} | {row['layout']:>11} | {row['cycles']:7d} | {row['Cache Misses']:6d} "
+              f"| {row['Upgrades']:5d} | {row['Invalidations Sent']:5d} | {row['Cache-to-Cache Transfers']:5d} "
+              f"| {row['True Sharing Misses']:7d} | {row['False Sharing Misses']:8d} | {str(row['correct']):7} |")
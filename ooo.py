@@ -0,0 +1,302 @@
+from collections import deque
+
+from simulator import MIPSPipelineSimulator
+from pipeline_config import stage, UnitPool
+from pipeline_trace import opcode_id
+
+# An out-of-order backend in the style of Tomasulo's algorithm with a
+# reorder buffer. It reuses the in-order simulator's program, decoder, data
+# memory, memory model and trace sinks; only the timing model differs, and
+# the architectural results are the same.
+#
+#   IF  - fetch up to issue_width instructions in program order
+#   DI  - rename and dispatch: allocate a ROB entry, a reservation station
+#         (everything but nop, j and jal) and a load/store queue entry (lw/sw)
+#   EX  - up to issue_width instructions whose operands are ready start,
+#         oldest first: ALU ops, branch outcomes, lw/sw addresses. ALU, mul
+#         and div operations need a free functional unit (pipeline_config.
+#         UnitPool) and reach WB once it completes
+#   MEM - the single memory port: loads once every older store has its
+#         address (or forwarded from the youngest older store to the same
+#         address), stores when they reach the head of the ROB
+#   WB  - results are broadcast on the common data bus, issue_width a cycle
+#   CM  - commit in program order, up to issue_width a cycle
+#
+# There is no speculation. Fetch stops after the delay slot of a conditional
+# branch or jr until it executes; the target of j and jal is known at fetch.
+# A branch in a delay slot redirects after its own delay slot, which is the
+# first instruction at the outer branch's destination.
+OOO_STAGES = [stage('IF', 'fetch'), stage('DI', 'decode'), stage('EX', 'execute'),
+              stage('MEM', 'memory'), stage('WB', 'writeback'), stage('CM', 'writeback')]
+
+
+class TomasuloSimulator(MIPSPipelineSimulator):
+    def __init__(self, instructions=None, memory=None, issue_width=2, rob_size=16, rs_size=8, lsq_size=8, units=None):
+        super().__init__(instructions, memory, issue_width=issue_width, pipeline=OOO_STAGES, units=units)
+        self.rob_size = rob_size
+        self.rs_size = rs_size
+        self.lsq_size = lsq_size
+
+    def cycles(self):
+        W = self.issue_width
+        IF, DI, EX, MEM, WB, CM = (k * W for k in range(6))
+        n = len(self.filtered_instructions)
+        PC = 0
+        cycle = 0
+        committed = 0
+        memory_stalls = 0
+        load_stalls = 0
+        delayed_branches = 0
+        used_delay_slots = 0
+        branch_count = 0
+        rob_stalls = 0
+        rs_stalls = 0
+        lsq_stalls = 0
+        store_forwards = 0
+        branch_waits = 0
+        pool = UnitPool(self.units, W)
+
+        rob = deque()
+        rs = []
+        lsq = []
+        rat = {}
+        fetched = []
+        finished = []
+        executing = []
+        port = None
+        branch = None
+        fetch_wait = None
+        after_branch = False
+        seq = 0
+
+        def cell(e, left=0):
+            return (opcode_id(e['instr']['opcode']), e['index'], left, e['seq'])
+
+        self.pipeline_log.clear()
+        self.cpi_stack.clear()
+        self.window_metrics.clear()
+        sinks = ([self.pipeline_log] if self.keep_log else []) + [self.cpi_stack, self.window_metrics] + list(self.trace_sinks)
+
+        while True:
+            cycle += 1
+            cells = [None]*(6*W)
+
+            # Commit
+            for lane in range(W):
+                if not rob or not rob[0]['done'] or (rob[0]['instr']['unit']=='store' and not rob[0].get('written')):
+                    break
+                e = rob.popleft()
+                dest = e['instr']['dest']
+                if dest is not None:
+                    self.registers[dest] = e['result']
+                    if rat.get(dest) is e:
+                        del rat[dest]
+                if self.checker is not None:
+                    if e['instr']['unit']=='store':
+                        self.checker.retire(cycle, e['index'], None, e['vals'][0], e['addr'])
+                    else:
+                        self.checker.retire(cycle, e['index'], dest, None if dest is None else e['result'])
+                if e['instr']['unit'] in ('load','store'):
+                    lsq.remove(e)
+                committed += 1
+                cells[CM+lane] = cell(e)
+
+            # Write back on the common data bus, oldest first
+            finished.sort(key=lambda e: e['seq'])
+            for lane, e in enumerate(finished[:W]):
+                e['done'] = True
+                for waiting in rs:
+                    for f, producer in list(waiting['wait'].items()):
+                        if producer is e:
+                            waiting['vals'][f] = e['result']
+                            del waiting['wait'][f]
+                cells[WB+lane] = cell(e)
+            del finished[:W]
+
+            # Memory port
+            if port is None:
+                for e in lsq:
+                    if e['instr']['unit']=='store' or 'addr' not in e or e.get('loaded'):
+                        continue
+                    older = [s for s in lsq if s['seq']<e['seq'] and s['instr']['unit']=='store']
+                    if not all('addr' in s for s in older):
+                        continue
+                    match = [s for s in older if s['addr']==e['addr']]
+                    e['loaded'] = True
+                    if match:
+                        e['result'] = match[-1]['vals'][0]
+                        store_forwards += 1
+                        finished.append(e)
+                        continue
+                    e['result'] = self.memory.get(e['addr'],0)
+                    e['left'] = self.memory_model.latency('lw',e['addr'],cycle,e['index'])
+                    port = e
+                    break
+                if port is None and rob and rob[0]['instr']['unit']=='store' and rob[0]['done'] \
+                        and 'left' not in rob[0]:
+                    port = rob[0]
+                    self.memory[port['addr']] = port['vals'][0]
+                    port['left'] = self.memory_model.latency('sw',port['addr'],cycle,port['index'])
+            if port is not None:
+                if port['left']>1:
+                    port['left'] -= 1
+                    memory_stalls += 1
+                    if cells[CM] is None:
+                        # Nothing committed while the port is busy.
+                        self.cpi_stack.stall('memory', port['index'])
+                    if port['instr']['unit']=='load':
+                        load_stalls += 1
+                    cells[MEM] = cell(port, port['left'])
+                else:
+                    cells[MEM] = cell(port)
+                    if port['instr']['unit']=='load':
+                        finished.append(port)
+                    else:
+                        port['written'] = True
+                    port = None
+
+            # Execute
+            for e in [e for e in executing if e['completes']<=cycle]:
+                executing.remove(e)
+                finished.append(e)
+            lane = 0
+            for e in [e for e in rs if not e['wait']]:
+                if lane==W:
+                    break
+                ins = e['instr']
+                unit = ins['unit']
+                if unit in pool and pool.available(unit, cycle)>cycle:
+                    pool.stalls[unit] += 1
+                    continue
+                rs.remove(e)
+                cells[EX+lane] = cell(e)
+                lane += 1
+                vals = [e['vals'][f] for f in range(len(ins['reads']))]
+                if unit in pool:
+                    e['result'] = ins['fn'](*vals, *ins['const'])
+                    e['completes'] = pool.start(unit, cycle) + pool.latency(unit) - 1
+                    (executing if e['completes']>cycle else finished).append(e)
+                    continue
+                if unit in ('branch','jump'):
+                    # Fetch follows the outcome once it has the delay slot.
+                    branch_count += 1
+                    e['redirect'] = None
+                    if unit=='jump' or ins['fn'](*vals):
+                        delayed_branches += 1
+                        e['redirect'] = vals[0] if unit=='jump' else ins['target']
+                    e['done'] = True
+                else:
+                    e['addr'] = vals[0 if unit=='load' else 1] + ins['offset']
+                    e['done'] = unit=='store'
+                    for sink in self.access_sinks:
+                        sink.access(e['addr'], cycle)
+
+            # Rename and dispatch
+            dispatched = 0
+            for slot in fetched:
+                ins = self._decoded(slot['index'])
+                unit = ins['unit']
+                # nop, j and jal need nothing from the backend; jal's link is known now.
+                done = unit=='nop' or 'target' in ins and unit=='jump'
+                if len(rob)>=self.rob_size:
+                    rob_stalls += 1
+                    break
+                if unit in ('load','store') and len(lsq)>=self.lsq_size:
+                    lsq_stalls += 1
+                    break
+                if not done and len(rs)>=self.rs_size:
+                    rs_stalls += 1
+                    break
+                e = {'instr':ins,'index':slot['index'],'seq':slot['seq'],'vals':{},'wait':{},'done':done}
+                for f, r in enumerate(ins['reads']):
+                    producer = rat.get(r)
+                    if producer is None:
+                        e['vals'][f] = self.registers[r]
+                    elif producer['done']:
+                        e['vals'][f] = producer['result']
+                    else:
+                        e['wait'][f] = producer
+                dest = ins['dest']
+                if dest is not None:
+                    rat[dest] = e
+                if after_branch and unit!='nop':
+                    used_delay_slots += 1
+                after_branch = unit in ('branch','jump')
+                if done and unit=='jump':
+                    branch_count += 1
+                    delayed_branches += 1
+                    if dest is not None:
+                        e['result'] = slot['index'] + 2
+                slot['entry'] = e
+                rob.append(e)
+                if unit in ('load','store'):
+                    lsq.append(e)
+                if not e['done']:
+                    rs.append(e)
+                cells[DI+dispatched] = cell(e)
+                dispatched += 1
+            fetched = fetched[dispatched:]
+
+            # Fetch
+            if fetch_wait is not None and 'redirect' in fetch_wait.get('entry', {}):
+                if fetch_wait['entry']['redirect'] is not None:
+                    PC = fetch_wait['entry']['redirect']
+                fetch_wait = None
+            if fetch_wait is not None:
+                branch_waits += 1
+            elif not fetched:
+                for lane in range(W):
+                    if PC>=n:
+                        break
+                    slot = {'instruction':self.filtered_instructions[PC],'index':PC,'seq':seq}
+                    fetched.append(slot)
+                    cells[IF+lane] = (self._fetch_ops[PC], PC, 0, seq)
+                    seq += 1
+                    PC += 1
+                    delay_slot = branch is not None
+                    if delay_slot:
+                        # j and jal redirect now, the rest once they have executed.
+                        ins = self._decoded(branch['index'])
+                        if 'target' in ins and ins['unit']=='jump':
+                            PC = ins['target']
+                        else:
+                            fetch_wait = branch
+                        branch = None
+                    if self._decoded(slot['index'])['unit'] in ('branch','jump'):
+                        # A branch in a delay slot gets its own delay slot from
+                        # wherever the first branch sends fetch, as in order.
+                        branch = slot
+                    if delay_slot:
+                        break
+
+            for sink in sinks:
+                sink.record(cycle, cells)
+            yield cycle
+            if PC>=n and fetch_wait is None and not fetched and not rob:
+                break
+
+        for sink in sinks:
+            sink.finish(cycle)
+
+        self.statistics = {
+            'Total Cycles': cycle,
+            'Instructions Executed': committed,
+            'Memory Stalls': memory_stalls,
+            'Load Stalls': load_stalls,
+            'Delayed Branches': delayed_branches,
+            'Used Delay Slots': used_delay_slots,
+            'Branch Instructions': branch_count,
+            'Dynamic NOPs': 0,
+            'Wasted Memory Cycles': memory_stalls,
+            'Issue Width': W,
+            'ROB Size': self.rob_size,
+            'ROB Full Stalls': rob_stalls,
+            'RS Full Stalls': rs_stalls,
+            'LSQ Full Stalls': lsq_stalls,
+            'Store Forwards': store_forwards,
+            'Branch Wait Cycles': branch_waits,
+            **pool.statistics(cycle),
+            'IPC': committed / cycle if cycle else 0,
+            'Delay Slot Efficiency': used_delay_slots / branch_count * 100 if branch_count else 0,
+            **self.memory_model.statistics()
+        }
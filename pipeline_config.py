@@ -0,0 +1,191 @@
+import random
+
+from isa import UNIT_LATENCY
+
+# A pipeline is described by its stages, in order. Each stage has a name, a
+# role and a latency (cycles an instruction spends in it, holding the stages
+# behind it). Roles must appear in this order, each at least once:
+#   fetch     - the first stage reads the next bundle from instruction memory
+#   decode    - operands are read (and forwarded) in the last decode stage,
+#               which is also where instructions wait for hazards
+#   execute   - ALU results, addresses and branch outcomes are produced in
+#               the last execute stage, which is where branches resolve and
+#               ALU results can be forwarded from
+#   memory    - a lw/sw spends its access latency in the first memory stage,
+#               less one cycle for every further memory stage; loaded values
+#               can be forwarded once the last memory stage is done
+#   writeback - registers are written in the first writeback stage
+ROLES = ('fetch', 'decode', 'execute', 'memory', 'writeback')
+ROLE_STAGES = {'fetch': 'IF', 'decode': 'ID', 'execute': 'EX', 'memory': 'MEM', 'writeback': 'WB'}
+
+
+def stage(name, role, latency=1):
+    return {'name': name, 'role': role, 'latency': latency}
+
+
+PIPELINES = {
+    'classic': [stage('IF', 'fetch'), stage('ID', 'decode'), stage('EX', 'execute'),
+                stage('MEM', 'memory'), stage('WB', 'writeback')],
+    'deep': [stage('IF1', 'fetch'), stage('IF2', 'fetch'), stage('ID', 'decode'), stage('EX1', 'execute'),
+             stage('EX2', 'execute'), stage('MEM1', 'memory'), stage('MEM2', 'memory'), stage('WB', 'writeback')],
+}
+
+
+class PipelineConfig:
+    def __init__(self, stages='classic', branch_penalty=None):
+        if isinstance(stages, str):
+            if stages not in PIPELINES:
+                raise ValueError(f"Unknown pipeline: {stages}")
+            stages = PIPELINES[stages]
+        self.stages = tuple(dict(s) for s in stages)
+        roles = [s['role'] for s in self.stages]
+        if sorted(roles, key=ROLES.index) != roles or set(roles) != set(ROLES):
+            raise ValueError(f"Stage roles must run {' -> '.join(ROLES)}, each at least once: {roles}")
+        if any(s['latency'] < 1 for s in self.stages):
+            raise ValueError("Stage latencies must be at least 1")
+        self.names = tuple(s['name'] for s in self.stages)
+        self.latency = tuple(s['latency'] for s in self.stages)
+        self.decode = len(roles) - 1 - roles[::-1].index('decode')
+        self.execute = len(roles) - 1 - roles[::-1].index('execute')
+        self.memory = roles.index('memory')
+        self.memory_stages = roles.count('memory')
+        self.last_memory = self.memory + self.memory_stages - 1
+        self.writeback = roles.index('writeback')
+        # Fetch sends a NOP down the pipeline for each cycle behind a branch
+        # and then holds the delay slot until the branch has resolved in the
+        # last execute stage. By default the NOPs cover the stages up to that
+        # one, plus two more: four in the original five-stage pipeline, and
+        # stages after the last execute stage add none.
+        self.branch_penalty = self.execute + 2 if branch_penalty is None else branch_penalty
+
+    def role(self, name):
+        return self.stages[self.names.index(name)]['role']
+
+    def __len__(self):
+        return len(self.stages)
+
+
+# Functional units, by the isa latency class they execute. An instance
+# accepts a new operation every `interval` cycles (1 is fully pipelined,
+# interval == latency unpipelined) and its result can be forwarded `latency`
+# cycles after it starts. count None means one instance per issue lane.
+def unit(name, latency=1, interval=1, count=None):
+    return {'name': name, 'latency': latency, 'interval': interval, 'count': count}
+
+
+FUNCTIONAL_UNITS = {
+    'alu': unit('ALU', UNIT_LATENCY['alu']),
+    'mul': unit('Multiplier', UNIT_LATENCY['mul'], 1, 1),
+    'div': unit('Divider', UNIT_LATENCY['div'], UNIT_LATENCY['div'], 1),
+}
+
+
+class UnitPool:
+    # The instances of every unit and the cycle each can start its next
+    # operation; an operation takes the instance that frees up first.
+    def __init__(self, units=None, lanes=1):
+        self.units = {**FUNCTIONAL_UNITS, **(units or {})}
+        for cls, u in self.units.items():
+            if u['latency'] < 1 or u['interval'] < 1 or (u['count'] is not None and u['count'] < 1):
+                raise ValueError(f"Bad functional unit for {cls}: {u}")
+        self.free = {cls: [0] * (u['count'] or lanes) for cls, u in self.units.items()}
+        self.busy = dict.fromkeys(self.units, 0)
+        self.stalls = dict.fromkeys(self.units, 0)
+
+    def __contains__(self, cls):
+        return cls in self.units
+
+    def latency(self, cls):
+        return self.units[cls]['latency']
+
+    def available(self, cls, cycle):
+        # The first cycle, from `cycle` on, an instance can start an operation.
+        return max(cycle, min(self.free[cls]))
+
+    def start(self, cls, cycle):
+        # Reserves an instance for an operation ready at `cycle`; returns the
+        # cycle it starts.
+        free = self.free[cls]
+        i = free.index(min(free))
+        start = max(cycle, free[i])
+        free[i] = start + self.units[cls]['interval']
+        self.busy[cls] += self.units[cls]['interval']
+        return start
+
+    def statistics(self, cycles):
+        stats = {}
+        for cls, u in self.units.items():
+            slots = cycles * len(self.free[cls])
+            stats[f"{u['name']} Utilization"] = min(self.busy[cls], slots) / slots * 100 if slots else 0.0
+            stats[f"{u['name']} Structural Stalls"] = self.stalls[cls]
+        stats['Structural Stalls'] = sum(self.stalls.values())
+        return stats
+
+
+def cycle_time(config, logic=5.0, latch=0.25):
+    # A simple frequency model: the total logic delay (in units of one
+    # classic stage) is split evenly over the stages, and every stage adds a
+    # fixed latch overhead.
+    return logic / len(config) + latch
+
+
+def pipeline_tradeoff(pipelines=('classic', 'deep'), names=('prefix_sum', 'loop', 'pointer_chase', 'dependency_chain'),
+                      simulator=None, seed=0):
+    # CPI alone favours short pipelines and clock frequency favours deep
+    # ones; time per instruction (CPI x relative cycle time) weighs both.
+    import workloads
+    if simulator is None:
+        from simulator import MIPSPipelineSimulator as simulator
+    base = cycle_time(PipelineConfig('classic'))
+    rows = []
+    for name in names:
+        wl = workloads.build(name)
+        for pipeline in pipelines:
+            config = pipeline if isinstance(pipeline, PipelineConfig) else PipelineConfig(pipeline)
+            random.seed(seed)
+            sim = simulator(wl['instructions'], wl['memory'], pipeline=config.stages)
+            sim.simulate()
+            stats = sim.statistics
+            # Injected NOPs are not useful work, so they do not count as instructions.
+            cpi = stats['Total Cycles'] / (stats['Instructions Executed'] - stats['Dynamic NOPs'])
+            period = cycle_time(config) / base
+            rows.append({'workload': name, 'pipeline': '/'.join(config.names), 'CPI': cpi,
+                         'Cycle Time': period, 'Time/Instr': cpi * period})
+    return rows
+
+
+def unit_study(name='dot_product', params=None, configs=None, widths=(1, 2), simulator=None, seed=0):
+    # Runs a workload under several functional-unit configurations (name ->
+    # units overrides, see unit) and issue widths.
+    import workloads
+    if simulator is None:
+        from simulator import MIPSPipelineSimulator as simulator
+    if configs is None:
+        configs = {'pipelined': {}, 'unpipelined': {'mul': unit('Multiplier', 4, 4, 1)},
+                   'two unpipelined': {'mul': unit('Multiplier', 4, 4, 2)}}
+    wl = workloads.build(name, **(params or {}))
+    rows = []
+    for label, units in configs.items():
+        for width in widths:
+            random.seed(seed)
+            sim = simulator(wl['instructions'], wl['memory'], issue_width=width, units=units)
+            sim.simulate()
+            stats = sim.statistics
+            rows.append({'config': label, 'width': width, 'Total Cycles': stats['Total Cycles'], 'IPC': stats['IPC'],
+                         'Multiplier Utilization': stats['Multiplier Utilization'],
+                         'Structural Stalls': stats['Structural Stalls'], 'Forwarding Stalls': stats['Forwarding Stalls']})
+    return rows
+
+
+if __name__ == "__main__":
+    print("pipeline depth:")
+    print(f"| {'Workload':16} | {'Pipeline':28} | {'CPI':>5} | {'Cycle':>5} | {'Time/Instr':>10} |")
+    for row in pipeline_tradeoff():
+        print(f"| {row['workload']:16} | {row['pipeline']:28} | {row['CPI']:5.2f} | {row['Cycle Time']:5.2f} "
+              f"| {row['Time/Instr']:10.2f} |")
+
+    print("\nfunctional units, dot_product:")
+    print(f"| {'Multiplier':16} | {'Width':>5} | {'Cycles':>6} | {'IPC':>5} | {'Mul Util':>8} | {'Struct':>6} | {'Fwd':>5} |")
+    for row in unit_study(params={'n': 32, 'unroll': 4}):
+        print(f"| {row['config']:16} | {row['width']:5d} | {row['Total Cycles']:6d} | {row['IPC']:5.2f} "
+              f"| {row['Multiplier Utilization']:7.1f}% | {row['Structural Stalls']:6d} | {row['Forwarding Stalls']:5d} |")
@@ -0,0 +1,161 @@
+from array import array
+
+STAGES = ('IF', 'ID', 'EX', 'MEM', 'WB')
+
+# Opcode names are interned into small integer ids; 0 is an empty stage.
+OPCODES = ['--', 'nop', 'add', 'addi', 'slti', 'beq', 'j', 'lw', 'sw']
+_OPCODE_IDS = {op: i for i, op in enumerate(OPCODES)}
+EMPTY = 0
+
+
+def opcode_id(name):
+    op = _OPCODE_IDS.get(name)
+    if op is None:
+        op = _OPCODE_IDS[name] = len(OPCODES)
+        OPCODES.append(name)
+    return op
+
+
+def lane_stages(stages=STAGES, width=1):
+    # A superscalar pipeline has `width` slots per stage. Slot 0 keeps the
+    # stage name and slot k is named "<stage>.<k>", so the trace stays one
+    # flat list of cells with the slots of a stage next to each other.
+    return tuple(name if k == 0 else f"{name}.{k}" for name in stages for k in range(width))
+
+
+def base_stage(name):
+    return name.split('.')[0]
+
+
+def base_stages(stages):
+    names = []
+    for name in stages:
+        if base_stage(name) not in names:
+            names.append(base_stage(name))
+    return tuple(names)
+
+
+def format_cell(op, left=0):
+    if op == EMPTY:
+        return "--"
+    if left:
+        return f"{OPCODES[op]} ({left})"
+    return OPCODES[op]
+
+
+class PipelineTrace:
+    """Per-cycle pipeline occupancy stored as typed columns.
+
+    Cycles are consecutive from first_cycle, so the cycle counter is implicit.
+    Every stage keeps four small columns: opcode id, static instruction index
+    (-1 for injected NOPs and empty stages), remaining stall cycles and the
+    age of the occupant relative to the newest fetch sequence number of that
+    cycle. That is about 30 bytes per cycle. Display strings are only built
+    when a row is read.
+    """
+
+    def __init__(self, stages=STAGES):
+        self.stages = tuple(stages)
+        self.bundles = base_stages(self.stages)
+        self.lanes = len(self.stages) // len(self.bundles)
+        self.clear()
+
+    def clear(self):
+        self.first_cycle = 1
+        self.ops = [array('B') for _ in self.stages]
+        self.index = [array('h') for _ in self.stages]
+        self.left = [array('B') for _ in self.stages]
+        self.age = [array('B') for _ in self.stages]
+        self.newest = array('I')
+        self._newest = 0
+
+    def record(self, cycle, cells):
+        # cells holds one (opcode id, index, stall left, seq) tuple or None per stage.
+        if not self.newest:
+            self.first_cycle = cycle
+        for cell in cells:
+            if cell is not None and cell[3] > self._newest:
+                self._newest = cell[3]
+        self.newest.append(self._newest)
+        for k, cell in enumerate(cells):
+            if cell is None:
+                self.ops[k].append(EMPTY)
+                self.index[k].append(-1)
+                self.left[k].append(0)
+                self.age[k].append(0)
+            else:
+                self.ops[k].append(cell[0])
+                self._append_wide(self.index, k, cell[1], 'i')
+                self.left[k].append(min(cell[2], 255))
+                self._append_wide(self.age, k, self._newest - cell[3], 'I')
+
+    def _append_wide(self, cols, k, value, wider):
+        try:
+            cols[k].append(value)
+        except OverflowError:
+            # Past 32K instructions (or 255 in flight) the columns are widened.
+            cols[:] = [array(wider, col) for col in cols]
+            cols[k].append(value)
+
+    def finish(self, cycle):
+        pass
+
+    def __len__(self):
+        return len(self.newest)
+
+    def cycle(self, row):
+        return self.first_cycle + row
+
+    def cell(self, row, stage):
+        k = self.stages.index(stage) if isinstance(stage, str) else stage
+        if self.ops[k][row] == EMPTY:
+            return None
+        return self.ops[k][row], self.index[k][row], self.left[k][row], self.newest[row] - self.age[k][row]
+
+    def records(self):
+        for r in range(len(self)):
+            yield self.first_cycle + r, [self.cell(r, k) for k in range(len(self.stages))]
+
+    def row(self, row):
+        return [self.first_cycle + row] + [format_cell(self.ops[k][row], self.left[k][row]) for k in range(len(self.stages))]
+
+    def bundle_row(self, row):
+        # One entry per stage, listing every occupied slot on its own line.
+        out = [self.first_cycle + row]
+        for b in range(len(self.bundles)):
+            lanes = [format_cell(self.ops[k][row], self.left[k][row])
+                     for k in range(b * self.lanes, (b + 1) * self.lanes) if self.ops[k][row] != EMPTY]
+            out.append("\n".join(lanes) if lanes else "--")
+        return out
+
+    def occupancy(self):
+        # Fraction of cycles in which each stage held at least one instruction.
+        rows = len(self) or 1
+        out = []
+        for b in range(len(self.bundles)):
+            cols = self.ops[b * self.lanes:(b + 1) * self.lanes]
+            out.append(sum(1 for ops in zip(*cols) if any(ops)) / rows)
+        return out
+
+    def __getitem__(self, item):
+        if isinstance(item, slice):
+            return [self.row(r) for r in range(*item.indices(len(self)))]
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("trace row out of range")
+        return self.row(item)
+
+    def __iter__(self):
+        for r in range(len(self)):
+            yield self.row(r)
+
+    def __eq__(self, other):
+        if isinstance(other, PipelineTrace):
+            return (self.stages, self.first_cycle, self.ops, self.index, self.left, self.age, self.newest) == \
+                   (other.stages, other.first_cycle, other.ops, other.index, other.left, other.age, other.newest)
+        return NotImplemented
+
+    def nbytes(self):
+        cols = [self.newest] + [col for group in (self.ops, self.index, self.left, self.age) for col in group]
+        return sum(col.itemsize * len(col) for col in cols)
@@ -0,0 +1,132 @@
+# Locality profile of the data address stream. ReuseProfiler is an access
+# sink (sim.access_sinks): the simulator hands it every lw/sw address where
+# the EX stage computes it, including loads that are then served by store
+# forwarding and never reach the memory model.
+#
+# The reuse (LRU stack) distance of an access is the number of distinct
+# lines touched since the previous access to its line. A Fenwick tree over
+# access times, with a 1 at the latest access of every line, gives it in
+# O(log n): it is the count of marks after that previous access. An access
+# hits in a fully associative LRU cache of C lines exactly when its distance
+# is below C, so one pass yields the miss ratio of every cache size. When
+# the tree is full it is rebuilt with only the latest access of each line,
+# renumbered in order, so it stays within twice the number of distinct lines.
+
+
+class Fenwick:
+    def __init__(self, size=1024):
+        self.tree = [0] * (size + 1)
+
+    def __len__(self):
+        return len(self.tree) - 1
+
+    def add(self, i, delta):
+        i += 1
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def prefix(self, i):
+        # Sum of positions 0..i-1.
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class ReuseProfiler:
+    def __init__(self, line_size=4, window=64):
+        self.line_size = line_size
+        self.window = window
+        self.clear()
+
+    def clear(self):
+        self.tree = Fenwick()
+        self.time = 0
+        self.last = {}
+        self.histogram = {}
+        self.cold = 0
+        self.accesses = 0
+        self.working_sets = []
+        self._window = None
+        self._lines = set()
+
+    def access(self, address, cycle=0):
+        line = address // self.line_size
+        if self.time >= len(self.tree):
+            self._compact()
+        t = self.time
+        prev = self.last.get(line)
+        if prev is None:
+            self.cold += 1
+        else:
+            distance = self.tree.prefix(t) - self.tree.prefix(prev + 1)
+            self.histogram[distance] = self.histogram.get(distance, 0) + 1
+            self.tree.add(prev, -1)
+        self.tree.add(t, 1)
+        self.last[line] = t
+        self.time += 1
+        self.accesses += 1
+
+        window = cycle // self.window
+        if window != self._window:
+            if self._window is not None:
+                self.working_sets.append((self._window * self.window, len(self._lines)))
+            self._window = window
+            self._lines = set()
+        self._lines.add(line)
+
+    def _compact(self):
+        # Only the order of the latest accesses matters to later distances.
+        lines = sorted(self.last, key=self.last.get)
+        self.tree = Fenwick(max(len(self.tree), 2 * len(lines)))
+        for t, line in enumerate(lines):
+            self.last[line] = t
+            self.tree.add(t, 1)
+        self.time = len(lines)
+
+    def miss_ratio_curve(self, sizes=None):
+        # [(cache lines, miss ratio)] for a fully associative LRU cache; by
+        # default every size up to the one where only cold misses remain.
+        top = max(self.histogram, default=-1) + 1
+        if sizes is None:
+            sizes = range(1, top + 1)
+        # at_least[d]: reuses at distance d or more, which miss in d lines.
+        at_least = [0] * (top + 1)
+        for d, n in self.histogram.items():
+            at_least[d] = n
+        for d in range(top - 1, -1, -1):
+            at_least[d] += at_least[d + 1]
+        return [(size, (self.cold + at_least[min(size, top)]) / self.accesses if self.accesses else 0.0)
+                for size in sizes]
+
+    def working_set(self):
+        # [(window start cycle, distinct lines touched in that window)]
+        current = [(self._window * self.window, len(self._lines))] if self._window is not None else []
+        return self.working_sets + current
+
+    def statistics(self):
+        reuses = sum(self.histogram.values())
+        sizes = [n for _, n in self.working_set()]
+        return {'Profiled Accesses': self.accesses, 'Cold Misses': self.cold, 'Distinct Lines': len(self.last),
+                'Mean Reuse Distance': sum(d * n for d, n in self.histogram.items()) / reuses if reuses else 0.0,
+                'Peak Working Set': max(sizes, default=0)}
+
+
+if __name__ == "__main__":
+    from simulator import MIPSPipelineSimulator
+    import workloads
+    for name, params in (('prefix_sum', {'n': 64}), ('strided_access', {'n': 32, 'stride': 16, 'trips': 3}),
+                         ('pointer_chase', {'n': 32, 'hops': 96})):
+        wl = workloads.build(name, **params)
+        sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'])
+        profiler = ReuseProfiler(line_size=16)
+        sim.access_sinks.append(profiler)
+        sim.simulate()
+        stats = profiler.statistics()
+        print(f"\n{name}: {stats['Profiled Accesses']} accesses, {stats['Distinct Lines']} lines, "
+              f"mean reuse distance {stats['Mean Reuse Distance']:.1f}, peak working set {stats['Peak Working Set']} lines")
+        curve = profiler.miss_ratio_curve([1, 2, 4, 8, 16, 32, 64])
+        print("  lines:      " + " ".join(f"{size:5d}" for size, _ in curve))
+        print("  miss ratio: " + " ".join(f"{ratio:5.2f}" for _, ratio in curve))
@@ -0,0 +1,496 @@
+from pipeline_trace import PipelineTrace, opcode_id, lane_stages
+from pipeline_config import PipelineConfig, UnitPool
+from cpi_stack import CPIStack
+from timeseries import WindowedMetrics
+from memory_models import RandomLatency
+from isa import BRANCH_OPS, ALU_UNITS, decode, register_number
+
+# The cycle-level pipeline engine. The GUIs, the terminal front ends and the
+# analysis modules all run programs on this class; with no program given it
+# runs the prefix-sum kernel over memory words 0..9.
+
+
+class MIPSPipelineSimulator:
+    def __init__(self, instructions=None, memory=None, issue_width=1, pipeline='classic', mshrs=0, store_buffer=0,
+                 units=None):
+        self.memory = {i: i // 4 for i in range(0, 40, 4)} if memory is None else dict(memory)
+        self.registers = [0] * 32
+        self.instruction_memory = [
+            "lw   $t2, 0($zero)",
+            "addi $t1, $zero, 4",
+            "loop:",
+            "  slti $t0, $t1, 40",
+            "  beq  $t0, $zero, end",
+            "  lw   $t3, 0($t1)",
+            "  add  $t2, $t2, $t3",
+            "  sw   $t2, 0($t1)",
+            "  addi $t1, $t1, 4",
+            "  j    loop",
+            "end:",
+            "  sw   $t2, 40($zero)",
+            "  nop"
+        ] if instructions is None else list(instructions)
+        self.filtered_instructions = []
+        self.label_to_index = {}
+        self.issue_width = issue_width
+        self.mshrs = mshrs
+        self.store_buffer = store_buffer
+        self.units = units
+        self.pipeline = pipeline if isinstance(pipeline, PipelineConfig) else PipelineConfig(pipeline)
+        self.pipeline_log = PipelineTrace(lane_stages(self.pipeline.names, issue_width))
+        self.keep_log = True
+        self.trace_sinks = []
+        self.access_sinks = []
+        self.checker = None
+        self.cpi_stack = CPIStack(issue_width)
+        self.window_metrics = WindowedMetrics(lanes=issue_width)
+        self.memory_model = RandomLatency()
+        self.statistics = {}
+        self._prepare_instructions()
+
+    def _prepare_instructions(self):
+        for line in self.instruction_memory:
+            line = line.strip()
+            if line.endswith(":"):
+                self.label_to_index[line[:-1]] = len(self.filtered_instructions)
+            elif line:
+                self.filtered_instructions.append(line)
+        self._fetch_ops = [opcode_id(line.split()[0]) for line in self.filtered_instructions]
+        self._program = {-1: decode('nop')}
+
+    def _get_reg_num(self, name):
+        return register_number(name)
+
+    def _decode(self, instr):
+        return decode(instr)
+
+    def _decoded(self, index):
+        # Every static instruction is decoded once, with its branch target
+        # resolved; index -1 is a NOP inserted by fetch.
+        ins = self._program.get(index)
+        if ins is None:
+            ins = self._program[index] = self._decode(self.filtered_instructions[index])
+            if 'label' in ins:
+                ins['target'] = self.label_to_index[ins['label']]
+        return ins
+
+    def simulate(self):
+        for _ in self.cycles():
+            pass
+        return {'registers': self.registers, 'memory': self.memory}
+
+    def cycles(self):
+        # Runs the pipeline one cycle per step, yielding the cycle number, so
+        # several simulators can be advanced in lockstep.
+        #
+        # The stages come from self.pipeline (see pipeline_config). latch[k]
+        # holds the bundle, of up to issue_width instructions, working in
+        # stage k this cycle. Stages are visited from the last to the first,
+        # so a bundle moves on into a latch its occupant has just left. A
+        # bundle with cycles left in its stage stays put and freezes every
+        # stage behind it; frozen instructions are not shown in the trace.
+        #
+        # Fetch reads a bundle in program order, ending it at a branch or at
+        # a redirect; the NOPs behind a branch come one a cycle. The last
+        # decode stage issues the longest prefix of its bundle whose operands
+        # are ready: a value from an instruction still in flight is forwarded
+        # once it has been computed (ALU results after the last execute
+        # stage, loads after the last memory stage). An instruction reading
+        # a register written earlier in its own bundle, or a second lw/sw
+        # (there is one memory port), waits for the next cycle, as does the
+        # consumer of a load that has not finished.
+        #
+        # With mshrs > 0 loads are non-blocking: a lw that would hold the
+        # first memory stage takes a miss-status holding register instead and
+        # moves on, so younger instructions keep flowing. Its register is on
+        # the scoreboard until the data arrives; only instructions reading or
+        # writing it wait. When every MSHR is busy the lw blocks as before.
+        #
+        # With store_buffer > 0 a sw retires into a write buffer of that
+        # depth instead of holding the memory stage. The buffer drains to
+        # memory in the background, one store at a time, and a lw to an
+        # address still in the buffer takes its data from there. A sw that
+        # finds the buffer full waits in the memory stage for a free entry.
+        #
+        # Decode, hazard checks and execution are driven by the isa table:
+        # an instruction reads ins['reads'], writes ins['dest'] and computes
+        # ins['fn'].
+        #
+        # ALU, mul and div operations start on a functional unit (see
+        # pipeline_config.UnitPool; self.units overrides the defaults) when
+        # they enter the last execute stage, waiting there while every
+        # instance is busy. They move on at once; the result can be
+        # forwarded when the unit completes (earlier execute stages count
+        # towards its latency), and is written to the register then if the
+        # instruction has already passed writeback. Like a load in an MSHR,
+        # it holds the register on the scoreboard until then, and a younger
+        # instruction writing the same register waits for it.
+        #
+        # Every bubble (a stage left empty behind a hold, a decode that
+        # issues nothing, fetch waiting on a branch) is reported to the CPI
+        # stack with its cause.
+        cfg = self.pipeline
+        S = len(cfg)
+        W = self.issue_width
+        D, E, M, LM, WBK = cfg.decode, cfg.execute, cfg.memory, cfg.last_memory, cfg.writeback
+        E0 = [s['role'] for s in cfg.stages].index('execute')
+        pool = UnitPool(self.units, W)
+        slow = {cls for cls in pool.units if pool.latency(cls) - (E - E0) > 1}
+        PC = 0
+        cycle = 0
+        total_instructions = 0
+        memory_stalls = 0
+        delayed_branches = 0
+        load_stalls = 0
+        wasted_cycles = 0
+        inserted_nops = 0
+        used_delay_slots = 0
+        branch_count = 0
+        dependency_splits = 0
+        port_splits = 0
+        load_use_stalls = 0
+        forwarding_stalls = 0
+        stage_stalls = 0
+        branch_waits = 0
+        mshr_full_stalls = 0
+        scoreboard_stalls = 0
+        mshr_occupancy = 0
+        mshr_peak = 0
+        overlapped_cycles = 0
+        buffer_full_stalls = 0
+        buffer_occupancy = 0
+        store_forwards = 0
+
+        latch = [[] for _ in range(S)]
+        outstanding = []
+        executing = []
+        scoreboard = {}
+        write_buffer = []
+        pending_branch = False
+        target = 0
+        nop_slots = 0
+        unresolved = 0
+        in_delay_slot = False
+        fetched = 0
+        last_branch = -1
+        branch_ops = {opcode_id(op) for op in BRANCH_OPS}
+
+        def producer(r, issued):
+            # The youngest instruction in flight that writes r, if any.
+            for slot in reversed(issued):
+                if slot['instr']['dest']==r:
+                    return slot
+            for k in range(D+1, S):
+                for slot in reversed(latch[k]):
+                    if slot['instr']['dest']==r:
+                        return slot
+            return scoreboard.get(r)
+
+        def forward_value(r, issued):
+            slot = producer(r, issued)
+            return self.registers[r] if slot is None else slot['result']
+
+        def enter(slot, k):
+            # Cycles the slot will spend in stage k.
+            busy = cfg.latency[k]
+            if k==E and slot['instr']['unit'] in pool:
+                cls = slot['instr']['unit']
+                start = pool.start(cls, cycle+1)
+                slot['completes'] = start + max(pool.latency(cls) - (E - E0), 1) - 1
+                if start>cycle+1:
+                    slot['structural'] = cls
+                busy = max(busy, start - cycle)
+            if k==M and 'mem_latency' in slot:
+                held = slot['mem_latency'] - (LM - M)
+                if held>busy and self.mshrs and slot['instr']['unit']=='load':
+                    if len(outstanding)<self.mshrs:
+                        # The data arrives when a blocking load would have left the last memory stage.
+                        slot['arrives'] = cycle + slot['mem_latency']
+                        outstanding.append(slot)
+                        scoreboard[slot['instr']['dest']] = slot
+                        held = busy
+                    else:
+                        slot['mshr_full'] = True
+                elif self.store_buffer and slot['instr']['unit']=='store':
+                    full = len(write_buffer) - self.store_buffer + 1
+                    held = sum(e['left'] for e in write_buffer[:full]) if full>0 else busy
+                    if full>0:
+                        slot['buffer_full'] = True
+                    write_buffer.append({'addr':slot['addr'],'left':slot['mem_latency']})
+                busy = max(busy, held)
+            slot['busy'] = busy
+
+        self.pipeline_log.clear()
+        self.cpi_stack.clear()
+        self.window_metrics.clear()
+        sinks = ([self.pipeline_log] if self.keep_log else []) + [self.cpi_stack, self.window_metrics] + list(self.trace_sinks)
+
+        while True:
+            cycle += 1
+            cells = [None]*(S*W)
+            frozen = False
+            retired = 0
+
+            for slot in [s for s in outstanding if s['arrives']<=cycle] + [s for s in executing if s['completes']<=cycle]:
+                (outstanding if 'arrives' in slot else executing).remove(slot)
+                slot['ready'] = True
+                r = slot['instr']['dest']
+                if scoreboard.get(r) is slot:
+                    del scoreboard[r]
+                if slot.get('written_back'):
+                    self.registers[r] = slot['result']
+            mshr_occupancy += len(outstanding)
+            mshr_peak = max(mshr_peak, len(outstanding))
+            if write_buffer:
+                write_buffer[0]['left'] -= 1
+                if not write_buffer[0]['left']:
+                    write_buffer.pop(0)
+            buffer_occupancy += len(write_buffer)
+
+            for k in range(S-1, -1, -1):
+                if frozen:
+                    break
+                if k==0 and not latch[0] and not (S>1 and latch[1]) and PC<len(self.filtered_instructions):
+                    bundle = latch[0]
+                    for lane in range(W):
+                        if PC >= len(self.filtered_instructions):
+                            break
+                        if nop_slots>0:
+                            # Each NOP is a cycle of fetch bubble, whatever the width.
+                            bundle.append({'instruction':'nop','index':-1,'seq':fetched})
+                            nop_slots -= 1
+                            inserted_nops += 1
+                            fetched += 1
+                            break
+                        if unresolved:
+                            # The delay slot waits until the branch has resolved.
+                            branch_waits += 1
+                            if not bundle:
+                                self.cpi_stack.stall('branch', last_branch)
+                            break
+                        bundle.append({'instruction':self.filtered_instructions[PC],'index':PC,'seq':fetched})
+                        fetched += 1
+                        op = self._fetch_ops[PC]
+                        if op in branch_ops:
+                            last_branch = PC
+                        if pending_branch:
+                            PC, pending_branch = target, False
+                            if op in branch_ops:
+                                nop_slots = cfg.branch_penalty
+                                unresolved += 1
+                            break
+                        PC += 1
+                        if op in branch_ops:
+                            nop_slots = cfg.branch_penalty
+                            unresolved += 1
+                            break
+                    for slot in bundle:
+                        enter(slot, 0)
+                bundle = latch[k]
+                if not bundle or (k<S-1 and latch[k+1]):
+                    continue
+
+                waiting = False
+                bubble = None
+                for lane, slot in enumerate(bundle):
+                    left = 0
+                    if slot['busy']>1:
+                        slot['busy'] -= 1
+                        left = slot['busy']
+                        waiting = True
+                        unit = slot['instr']['unit'] if 'instr' in slot else None
+                        if M<=k<=LM and unit in ('load','store'):
+                            memory_stalls += 1
+                            wasted_cycles += 1
+                            if unit=='load':
+                                load_stalls += 1
+                            if slot.get('mshr_full'):
+                                mshr_full_stalls += 1
+                            if slot.get('buffer_full'):
+                                buffer_full_stalls += 1
+                            bubble = ('memory', slot['index'])
+                        elif k==E and 'structural' in slot:
+                            pool.stalls[slot['structural']] += 1
+                            bubble = bubble or ('structural', slot['index'])
+                        else:
+                            stage_stalls += 1
+                            bubble = bubble or ('structural', slot['index'])
+                    if k!=D or waiting:
+                        op = slot['instr']['opcode'] if 'instr' in slot else slot['instruction'].split()[0]
+                        cells[k*W+lane] = (opcode_id(op), slot['index'], left, slot['seq'])
+                if waiting:
+                    # The stage ahead gets a bubble (or, for the last stage, WB retires nothing new).
+                    if bubble is not None:
+                        self.cpi_stack.stall(*bubble)
+                    frozen = True
+                    continue
+
+                if k==D:
+                    issued = []
+                    memory_op = False
+                    for lane, slot in enumerate(bundle):
+                        ins = slot.get('instr')
+                        if ins is None:
+                            ins = slot['instr'] = self._decoded(slot['index'])
+                        blocker = None
+                        regs = ins['reads']
+                        if ins['dest'] is not None:
+                            # A pending load or unit must not overwrite a younger result.
+                            p = producer(ins['dest'], issued)
+                            if p is not None and (self.mshrs or p['slow']):
+                                regs += (ins['dest'],)
+                        for r in regs:
+                            p = producer(r, issued)
+                            if p is not None and not p['ready']:
+                                blocker = p
+                                break
+                        if blocker is not None:
+                            if blocker in issued:
+                                dependency_splits += 1
+                            elif 'arrives' in blocker:
+                                scoreboard_stalls += 1
+                            elif blocker['instr']['unit']=='load':
+                                load_use_stalls += 1
+                            else:
+                                forwarding_stalls += 1
+                            break
+                        if ins['unit'] in ('load','store'):
+                            if memory_op:
+                                port_splits += 1
+                                break
+                            memory_op = True
+                        issued.append({'instr':ins,'values':[forward_value(r, issued) for r in ins['reads']],
+                                       'index':slot['index'],'seq':slot['seq'],'ready':False,
+                                       'slow':ins['unit'] in slow})
+                        cells[k*W+lane] = (opcode_id(ins['opcode']), slot['index'], 0, slot['seq'])
+                    latch[k] = bundle[len(issued):]
+                    bundle = issued
+                    if not bundle:
+                        # Nothing issued: the bubble sent on to EX is the waiting instruction's.
+                        self.cpi_stack.stall('data', latch[k][0]['index'])
+                        continue
+
+                elif k==E:
+                    for slot in bundle:
+                        ins = slot['instr']
+                        unit = ins['unit']
+                        values = slot['values']
+                        if in_delay_slot:
+                            used_delay_slots += unit!='nop'
+                            in_delay_slot = False
+
+                        if unit in ALU_UNITS:
+                            slot['result'] = ins['fn'](*values, *ins['const'])
+                        elif unit in ('branch','jump'):
+                            if unit=='jump' or ins['fn'](*values):
+                                pending_branch = True
+                                target = ins['target'] if 'target' in ins else values[0]
+                                delayed_branches += 1
+                            if ins['dest'] is not None:
+                                # jal links past its delay slot.
+                                slot['result'] = slot['index'] + 2
+                            branch_count += 1
+                            unresolved -= 1
+                            in_delay_slot = True
+                        elif unit=='load':
+                            addr = values[0]+ins['offset']
+                            for sink in self.access_sinks:
+                                sink.access(addr, cycle)
+                            slot['result'] = self.memory.get(addr,0)
+                            if any(e['addr']==addr for e in write_buffer):
+                                store_forwards += 1
+                                slot['mem_latency'] = 1
+                            else:
+                                slot['mem_latency'] = self.memory_model.latency('lw',addr,cycle,slot['index'])
+                        elif unit=='store':
+                            addr = slot['addr'] = values[1]+ins['offset']
+                            for sink in self.access_sinks:
+                                sink.access(addr, cycle)
+                            self.memory[addr] = values[0]
+                            slot['mem_latency'] = self.memory_model.latency('sw',addr,cycle,slot['index'])
+                        slot['ready'] = unit!='load' and slot.get('completes', cycle)<=cycle
+                        if unit in slow and not slot['ready']:
+                            executing.append(slot)
+                            if ins['dest'] is not None:
+                                scoreboard[ins['dest']] = slot
+
+                elif k==LM:
+                    for slot in bundle:
+                        slot['ready'] = slot['ready'] or (slot['instr']['unit']=='load' and 'arrives' not in slot)
+
+                if k==WBK:
+                    for slot in bundle:
+                        ins = slot['instr']
+                        dest = ins['dest']
+                        if dest is not None:
+                            if slot['ready']:
+                                self.registers[dest] = slot.get('result',0)
+                            else:
+                                # Written when the MSHR completes.
+                                slot['written_back'] = True
+                        if self.checker is not None and slot['index']>=0:
+                            if ins['unit']=='store':
+                                self.checker.retire(cycle, slot['index'], None, slot['values'][0], slot['addr'])
+                            else:
+                                self.checker.retire(cycle, slot['index'], dest, None if dest is None else slot.get('result',0))
+
+                if k==S-1:
+                    total_instructions += len(bundle)
+                    retired += len(bundle)
+                    latch[k] = []
+                else:
+                    for slot in bundle:
+                        enter(slot, k+1)
+                    latch[k+1] = bundle
+                    if k!=D:
+                        latch[k] = []
+
+            if outstanding and retired:
+                overlapped_cycles += 1
+
+            for sink in sinks:
+                sink.record(cycle, cells)
+            yield cycle
+            if PC>=len(self.filtered_instructions) and not any(latch) and not outstanding and not executing \
+                    and not write_buffer:
+                break
+
+        for sink in sinks:
+            sink.finish(cycle)
+
+        eff = (used_delay_slots/branch_count*100) if branch_count>0 else 0
+        ipc = total_instructions/cycle if cycle>0 else 0
+
+        self.statistics = {
+            'Total Cycles': cycle,
+            'Instructions Executed': total_instructions,
+            'Memory Stalls': memory_stalls,
+            'Load Stalls': load_stalls,
+            'Delayed Branches': delayed_branches,
+            'Used Delay Slots': used_delay_slots,
+            'Branch Instructions': branch_count,
+            'Dynamic NOPs': inserted_nops,
+            'Wasted Memory Cycles': wasted_cycles,
+            'Issue Width': W,
+            'Dependency Splits': dependency_splits,
+            'Memory Port Splits': port_splits,
+            'Load-Use Stalls': load_use_stalls,
+            'Forwarding Stalls': forwarding_stalls,
+            'Pipeline Depth': S,
+            'Stage Stalls': stage_stalls,
+            'Branch Wait Cycles': branch_waits,
+            'MSHRs': self.mshrs,
+            'MSHR Full Stalls': mshr_full_stalls,
+            'Scoreboard Stalls': scoreboard_stalls,
+            'Average MSHR Occupancy': mshr_occupancy / cycle if cycle else 0,
+            'Peak MSHR Occupancy': mshr_peak,
+            'Overlapped Miss Cycles': overlapped_cycles,
+            'Store Buffer Depth': self.store_buffer,
+            'Store Buffer Full Stalls': buffer_full_stalls,
+            'Average Store Buffer Occupancy': buffer_occupancy / cycle if cycle else 0,
+            'Store Forwards': store_forwards,
+            **pool.statistics(cycle),
+            'IPC': ipc,
+            'Delay Slot Efficiency': eff,
+            **self.memory_model.statistics()
+        }
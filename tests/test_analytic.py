@@ -0,0 +1,26 @@
+import pytest
+
+from analytic import AnalyticModel, VALIDATION
+
+CASES = [(name, params) for name, params, _ in VALIDATION]
+
+
+@pytest.mark.parametrize('name, params', CASES, ids=[name for name, _ in CASES])
+def test_prediction_is_exact_for_fixed_latency(name, params):
+    rows = AnalyticModel().validate([(name, params, [(1, 1), (4, 4)])], seeds=range(1))
+    for row in rows:
+        assert row['Predicted Cycles'] == row['Simulated Cycles']
+        assert row['Predicted IPC'] == pytest.approx(row['Simulated IPC'])
+
+
+def test_prediction_is_close_for_random_latency():
+    for row in AnalyticModel().validate():
+        assert row['Cycle Error'] < 1.0
+        assert row['IPC Error'] < 1.0
+
+
+def test_calibration_keeps_the_error_small():
+    model = AnalyticModel()
+    model.calibrate(seeds=range(8))
+    for row in model.validate(seeds=range(8)):
+        assert row['Cycle Error'] < 2.0
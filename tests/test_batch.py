@@ -0,0 +1,40 @@
+import random
+
+import pytest
+
+import workloads
+from simulator import MIPSPipelineSimulator
+from batch import BatchSimulator
+from memory_models import RandomLatency
+
+K = 12
+PROGRAMS = [None] + [workloads.build(name) for name in ('prefix_sum', 'loop', 'pointer_chase', 'dependency_chain')]
+
+
+@pytest.mark.parametrize('wl', PROGRAMS, ids=lambda wl: wl['name'] if wl else 'default')
+def test_batch_matches_separate_runs(wl):
+    if wl is None:
+        batch = BatchSimulator(seeds=range(K))
+        programs = [(None, None)] * K
+    else:
+        memories = [{a: (v * k) % 7 for a, v in wl['memory'].items()} for k in range(K)]
+        batch = BatchSimulator(wl['instructions'], memories, seeds=range(K))
+        programs = [(wl['instructions'], m) for m in memories]
+    results = batch.simulate()
+    for k, (instructions, memory) in enumerate(programs):
+        sim = MIPSPipelineSimulator(instructions, memory)
+        sim.memory_model = RandomLatency(rng=random.Random(k))
+        sim.keep_log = False
+        assert sim.simulate() == results[k]
+        assert sim.statistics == batch.statistics[k]
+
+
+def test_batch_wraps_like_the_scalar_simulator():
+    # Without wrapping, the last mul overflows the batch's int64 registers.
+    program = ["addi $t0, $zero, 1", "sll $t0, $t0, 31", "addi $t1, $t0, -1", "mul $t2, $t1, $t1",
+               "mul $t3, $t0, $t0", "mul $t3, $t3, $t3", "mul $t2, $t2, $t1", "nop"]
+    results = BatchSimulator(program, [{}] * 2, seeds=range(2)).simulate()
+    sim = MIPSPipelineSimulator(program, {})
+    sim.memory_model = RandomLatency(rng=random.Random(0))
+    sim.keep_log = False
+    assert sim.simulate() == results[0]
@@ -0,0 +1,60 @@
+import random
+
+import pytest
+
+import workloads
+from simulator import MIPSPipelineSimulator
+from checker import Divergence, LockstepChecker, check
+from functional import FunctionalModel
+from ooo import TomasuloSimulator
+
+# Exercises every unit: mul/div (including by zero), jal/jr with a used delay
+# slot, stores reloaded right away and a counted loop.
+CALLS = [
+    "addi $s0, $zero, 7", "addi $s1, $zero, -3", "addi $sp, $zero, 100", "addi $t8, $zero, 0",
+    "loop:",
+    "  mul $t9, $s0, $s1", "  div $s5, $t9, $s0", "  div $s6, $s0, $zero", "  div $s7, $s1, $s0",
+    "  sub $t0, $s5, $s1", "  and $t1, $s0, $t9", "  or $t2, $s0, $s1", "  sll $t3, $s0, 3",
+    "  jal func", "  addi $t8, $t8, 1",
+    "  sw $t9, 0($sp)", "  lw $t4, 0($sp)", "  addi $sp, $sp, 4",
+    "  slti $t5, $t8, 6",
+    "  bne $t5, $zero, loop",
+    "  nop",
+    "  j end", "  nop",
+    "func:",
+    "  add $v0, $t3, $t4",
+    "  jr $ra",
+    "  sub $v1, $v0, $t0",
+    "end:",
+    "  sw $v0, 0($zero)", "nop",
+]
+PROGRAMS = [('calls', {'instructions': CALLS, 'memory': {}})]
+PROGRAMS += [(name, workloads.build(name)) for name in ('prefix_sum', 'loop', 'pointer_chase', 'dot_product')]
+CONFIGS = [
+    (MIPSPipelineSimulator, {}),
+    (MIPSPipelineSimulator, {'pipeline': 'deep', 'issue_width': 2}),
+    (MIPSPipelineSimulator, {'issue_width': 4, 'mshrs': 2, 'store_buffer': 2}),
+    (TomasuloSimulator, {'issue_width': 1}),
+    (TomasuloSimulator, {'issue_width': 2}),
+    (TomasuloSimulator, {'issue_width': 4, 'rob_size': 8}),
+]
+
+
+@pytest.mark.parametrize('name, wl', PROGRAMS)
+@pytest.mark.parametrize('simulator, options', CONFIGS)
+def test_pipelines_match_the_functional_model(name, wl, simulator, options):
+    expected = FunctionalModel(wl['instructions'], wl['memory']).run()
+    random.seed(2)
+    sim = simulator(wl['instructions'], wl['memory'], **options)
+    sim.keep_log = False
+    assert check(sim) > 0
+    assert sim.registers == expected['registers']
+    assert sim.memory == expected['memory']
+
+
+def test_checker_reports_a_divergence():
+    checker = LockstepChecker(["addi $t0, $zero, 1", "nop"], {})
+    with pytest.raises(Divergence) as e:
+        checker.retire(1, 0, 8, 2)
+    assert e.value.report['field'] == '$t0'
+    assert (e.value.report['expected'], e.value.report['actual']) == (1, 2)
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+import workloads
+from simulator import MIPSPipelineSimulator
+from ooo import TomasuloSimulator
+from pipeline_config import PIPELINES, unit
+
+PROGRAMS = [(name, workloads.build(name)) for name in ('prefix_sum', 'loop', 'pointer_chase', 'dependency_chain')]
+PROGRAMS.append(('dot_product', workloads.dot_product(16, 4)))
+OPTIONS = [{}, {'mshrs': 2}, {'store_buffer': 2}, {'units': {'mul': unit('Multiplier', 4, 4, 1)}}]
+
+
+def run(simulator, wl, **options):
+    random.seed(1)
+    sim = simulator(wl['instructions'], wl['memory'], **options)
+    sim.keep_log = False
+    sim.simulate()
+    return sim.cpi_stack.totals(), sim.statistics
+
+
+@pytest.mark.parametrize('name, wl', PROGRAMS)
+@pytest.mark.parametrize('pipeline', PIPELINES)
+@pytest.mark.parametrize('width', [1, 2, 4])
+@pytest.mark.parametrize('options', OPTIONS)
+def test_cpi_stack_matches_statistics(name, wl, pipeline, width, options):
+    totals, stats = run(MIPSPipelineSimulator, wl, pipeline=pipeline, issue_width=width, **options)
+    assert sum(totals.values()) == stats['Total Cycles']
+    assert totals['memory'] == stats['Memory Stalls']
+    assert totals['branch'] == stats['Dynamic NOPs'] + stats['Branch Wait Cycles']
+    if width == 1:
+        assert totals['data'] == stats['Load-Use Stalls'] + stats['Forwarding Stalls'] + stats['Scoreboard Stalls']
+        assert totals['structural'] == stats['Stage Stalls'] + stats['Structural Stalls']
+
+
+@pytest.mark.parametrize('name, wl', PROGRAMS)
+@pytest.mark.parametrize('width', [1, 2, 4])
+def test_ooo_cpi_stack_covers_every_cycle(name, wl, width):
+    totals, stats = run(TomasuloSimulator, wl, issue_width=width)
+    assert sum(totals.values()) == stats['Total Cycles']
+    assert totals['memory'] <= stats['Memory Stalls']
+
+
+def test_table_columns_line_up():
+    random.seed(0)
+    sim = MIPSPipelineSimulator(issue_width=2, units={'mul': unit('Multiplier', 4, 4, 1)})
+    sim.simulate()
+    header, rule, *rows = sim.cpi_stack.format_table(sim.filtered_instructions).splitlines()
+    widths = [len(col) for col in header.split("|")]
+    assert 'Structural' in header and rows
+    for line in [rule] + rows:
+        assert [len(col) for col in line.split("|")] == widths
+    names = [col.strip() for col in header.split("|")[1:-1]]
+    beq = next(r for r in sim.cpi_stack.table(sim.filtered_instructions) if r['instruction'].startswith('beq'))
+    row = next(line for line in rows if 'beq' in line)
+    values = dict(zip(names, (col.strip() for col in row.split("|")[1:-1])))
+    assert int(values['Branch']) == beq['branch'] and int(values['Structural']) == beq['structural']
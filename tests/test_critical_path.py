@@ -0,0 +1,38 @@
+import random
+
+import pytest
+
+import workloads
+from critical_path import CriticalPath, analyze
+from ooo import TomasuloSimulator
+from simulator import MIPSPipelineSimulator
+
+CONFIGS = [
+    (MIPSPipelineSimulator, {}),
+    (MIPSPipelineSimulator, {'issue_width': 4}),
+    (MIPSPipelineSimulator, {'pipeline': 'deep', 'issue_width': 4}),
+    (TomasuloSimulator, {'issue_width': 4}),
+]
+
+
+@pytest.mark.parametrize('name', ['prefix_sum', 'pointer_chase', 'dependency_chain', 'dot_product'])
+@pytest.mark.parametrize('simulator, options', CONFIGS)
+def test_hazards_partition_the_lost_cycles(name, simulator, options):
+    wl = workloads.build(name)
+    random.seed(0)
+    r = analyze(simulator(wl['instructions'], wl['memory'], **options))
+    assert 0 < r['Critical Path'] <= r['Total Cycles']
+    assert r['Lost Cycles'] == r['Total Cycles'] - r['Critical Path']
+    assert all(n >= 0 for n in r['Hazard Cycles'].values())
+    assert sum(r['Hazard Cycles'].values()) == r['Lost Cycles']
+    assert sum(r['Hazard Shares'].values()) <= 100
+    assert sum(r['Hazard Shares'].values()) == pytest.approx(r['Lost Cycles'] / r['Total Cycles'] * 100)
+
+
+def test_dependency_chain_path():
+    # Each link of a chain waits for the one before; independent chains overlap.
+    cp = CriticalPath(["addi $t0, $t0, 1"] * 5 + ["addi $t1, $t1, 1"] * 3 + ["nop"], {})
+    sim = MIPSPipelineSimulator(cp.model.instruction_memory, {})
+    sim.trace_sinks.append(cp)
+    sim.simulate()
+    assert cp.length == 5 and cp.instructions == 9
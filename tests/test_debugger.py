@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+from simulator import MIPSPipelineSimulator
+from debugger import Debugger
+from ooo import TomasuloSimulator
+
+# The second store writes the value already in memory, the addi rewrites $t1.
+PROGRAM = [
+    "addi $t1, $zero, 7",
+    "sw   $t1, 8($zero)",
+    "addi $t1, $zero, 7",
+    "sw   $t1, 8($zero)",
+    "nop",
+]
+
+
+def stops(sim, *specs):
+    dbg = Debugger(sim)
+    for spec in specs:
+        dbg.add(spec)
+    found = []
+    while (state := dbg.run()) is not None:
+        found += state['stops']
+    return found
+
+
+@pytest.mark.parametrize('make', [lambda: MIPSPipelineSimulator(PROGRAM, {}),
+                                  lambda: TomasuloSimulator(PROGRAM, {}, issue_width=2)])
+def test_watchpoints_fire_on_every_write(make):
+    random.seed(0)
+    assert stops(make(), '$t1', 'mem[8]') == ["$t1 written 0 -> 7", "mem[8] written None -> 7",
+                                              "$t1 written 7 -> 7", "mem[8] written 7 -> 7"]
+
+
+def test_stall_condition_can_fire():
+    random.seed(0)
+    assert "MEM stall > 1" in stops(MIPSPipelineSimulator(), 'stall>1')
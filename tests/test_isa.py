@@ -0,0 +1,43 @@
+import pytest
+
+from simulator import MIPSPipelineSimulator
+from isa import decode, register_number
+
+
+@pytest.mark.parametrize('instr', ["", "foo $t0, $t1, $t2", "add $t0, $t1", "add $t0, $t1, $t2, $t3", "lw $t0"])
+def test_decode_rejects_unknown_instructions(instr):
+    with pytest.raises(ValueError, match="Unknown instruction"):
+        decode(instr)
+
+
+@pytest.mark.parametrize('name', ["$bad", "t0", "$32", ""])
+def test_register_number_rejects_unknown_registers(name):
+    with pytest.raises(ValueError, match="Unknown register"):
+        register_number(name)
+
+
+def test_simulator_reports_a_bad_program():
+    with pytest.raises(ValueError, match="Unknown register: \\$bad"):
+        MIPSPipelineSimulator(["add $t0, $t1, $bad", "nop"], {}).simulate()
+
+
+OVERFLOW = ["addi $t0, $zero, 1", "sll $t0, $t0, 31", "addi $t1, $t0, -1", "add $t2, $t1, $t1",
+            "mul $t3, $t1, $t1", "sub $t4, $t0, $t1", "addi $t5, $zero, -1", "div $t6, $t0, $t5",
+            "mul $t7, $t3, $t3", "nop"]
+
+
+def test_results_wrap_to_32_bits():
+    from functional import FunctionalModel
+    expected = [-2 ** 31, 2 ** 31 - 1, -2, 1, 1, -1, -2 ** 31, 1]
+    sim = MIPSPipelineSimulator(OVERFLOW, {})
+    sim.simulate()
+    model = FunctionalModel(OVERFLOW, {})
+    model.run()
+    for registers in (sim.registers, model.registers):
+        assert [registers[register_number(f"$t{i}")] for i in range(8)] == expected
+
+
+@pytest.mark.parametrize('amount', [-1, 32])
+def test_decode_rejects_out_of_range_shifts(amount):
+    with pytest.raises(ValueError, match="Shift amount out of range"):
+        decode(f"sll $t0, $t1, {amount}")
@@ -0,0 +1,84 @@
+import random
+
+import workloads
+from functional import FunctionalModel
+from simulator import MIPSPipelineSimulator
+from memory_models import DRAMMemoryModel, PrefetchMemoryModel, RandomLatency, StridePrefetcher
+
+
+class Recording(RandomLatency):
+    def __init__(self):
+        super().__init__()
+        self.accesses = []
+
+    def latency(self, op, address, cycle, pc=None):
+        self.accesses.append((op, address))
+        return super().latency(op, address, cycle, pc)
+
+
+def run(name, prefetch):
+    wl = workloads.build(name)
+    sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'])
+    base = Recording()
+    sim.memory_model = PrefetchMemoryModel(base, StridePrefetcher(2)) if prefetch else base
+    random.seed(0)
+    sim.simulate()
+    return sim.statistics, base.accesses
+
+
+def test_prefetches_leave_the_base_model_alone():
+    for name in ('prefix_sum', 'strided_access'):
+        off, off_accesses = run(name, False)
+        on, on_accesses = run(name, True)
+        assert on['Useful Prefetches'] > 0
+        assert on_accesses == off_accesses
+        assert on['Memory Stalls'] < off['Memory Stalls']
+
+
+def test_useless_prefetcher_changes_nothing():
+    off, _ = run('pointer_chase', False)
+    on, _ = run('pointer_chase', True)
+    assert on['Useful Prefetches'] == 0
+    assert on['Total Cycles'] == off['Total Cycles']
+    assert on['Memory Stalls'] == off['Memory Stalls']
+
+
+def test_dram_row_hits_misses_and_conflicts():
+    dram = DRAMMemoryModel(refresh_interval=0)
+    other_row = dram.row_size * dram.banks
+    assert dram.map(0)[:2] == dram.map(other_row)[:2] and dram.map(0)[2] != dram.map(other_row)[2]
+    assert dram.latency('lw', 0, 0) == dram.t_rcd + dram.t_cas + dram.burst
+    assert dram.latency('lw', 4, 20) == dram.t_cas + dram.burst
+    assert dram.latency('lw', other_row, 40) == dram.t_rp + dram.t_rcd + dram.t_cas + dram.burst
+    stats = dram.statistics()
+    assert (stats['Row Hits'], stats['Row Misses'], stats['Row Conflicts']) == (1, 1, 1)
+
+    closed = DRAMMemoryModel(refresh_interval=0, policy='closed')
+    closed.latency('lw', 0, 0)
+    assert closed.latency('lw', 4, 20) == closed.t_rcd + closed.t_cas + closed.burst
+
+
+def test_dram_refresh():
+    dram = DRAMMemoryModel(refresh_interval=100, refresh_time=8)
+    miss = dram.t_rcd + dram.t_cas + dram.burst
+    # No refresh is under way when the run starts.
+    assert dram.latency('lw', 0, 0) == miss
+    assert dram.statistics()['Refresh Wait Cycles'] == 0
+    # An access during a refresh waits for it, and finds its row closed.
+    assert dram.latency('lw', 4, 103) == 5 + miss
+    assert dram.statistics()['Refresh Wait Cycles'] == 5
+    assert dram.latency('lw', 8, 150) == dram.t_cas + dram.burst
+
+
+def test_prefetches_fill_through_a_dram_backend():
+    wl = workloads.build('strided_access')
+    stores = sum(1 for r in FunctionalModel(wl['instructions'], wl['memory']).stream() if r['instr']['unit'] == 'store')
+    sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'])
+    dram = DRAMMemoryModel()
+    sim.memory_model = PrefetchMemoryModel(dram, StridePrefetcher(2))
+    random.seed(0)
+    sim.simulate()
+    stats = sim.statistics
+    assert stats['Useful Prefetches'] > 0
+    # Every prefetch, demand miss and store reaches the DRAM once; hits do not.
+    assert stats['DRAM Accesses'] == stats['Prefetches Issued'] + stats['Demand Misses'] + stores
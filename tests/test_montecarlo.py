@@ -0,0 +1,39 @@
+import math
+import random
+
+import workloads
+from simulator import MIPSPipelineSimulator
+from memory_models import RandomLatency
+from montecarlo import interval, monte_carlo
+
+
+def scalar_cycles(wl, seeds):
+    cycles = []
+    for s in seeds:
+        sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'])
+        sim.memory_model = RandomLatency(rng=random.Random(s))
+        sim.keep_log = False
+        sim.simulate()
+        cycles.append(sim.statistics['Total Cycles'])
+    return cycles
+
+
+def test_mean_is_the_mean_of_the_seeded_runs():
+    wl = workloads.build('pointer_chase')
+    report = monte_carlo(wl['instructions'], wl['memory'], rel_error=1, batch=16, min_samples=16, workers=1)
+    first, last = report['Seeds']
+    cycles = scalar_cycles(wl, range(first, last + 1))
+    assert report['Samples'] == len(cycles) == 16
+    assert report['Total Cycles'] == sum(cycles) / len(cycles)
+
+
+def test_interval_agrees_with_independent_seeds():
+    wl = workloads.build('pointer_chase')
+    report = monte_carlo(wl['instructions'], wl['memory'], rel_error=0.002, confidence=0.99, batch=64, workers=1)
+    assert report['Converged']
+    reference, half = interval(scalar_cycles(wl, range(10000, 10400)), 0.99)
+    assert abs(report['Total Cycles'] - reference) <= math.hypot(report['Total Cycles CI'], half)
+
+
+def test_interval_of_a_single_sample_is_unbounded():
+    assert interval([5]) == (5.0, float('inf'))
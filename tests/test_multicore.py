@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+import workloads
+from multicore import MulticoreSimulator, scaling
+from simulator import MIPSPipelineSimulator
+
+
+def prefix_sums(n):
+    return {i * 4: i * (i + 1) // 2 for i in range(n)}
+
+
+@pytest.mark.parametrize('coherence', [None, 'MESI'])
+@pytest.mark.parametrize('cores', [1, 2, 3, 4])
+@pytest.mark.parametrize('n', [1, 5, 6, 7, 8, 13, 21])
+def test_parallel_prefix_sum_correct(n, cores, coherence):
+    wl = workloads.parallel_prefix_sum(n, cores)
+    random.seed(0)
+    final = MulticoreSimulator(wl['programs'], wl['memory'], coherence=coherence).simulate()
+    assert {a: final['memory'][a] for a in range(0, n * 4, 4)} == prefix_sums(n)
+
+
+def test_parallel_prefix_sum_speedup():
+    rows = scaling(64, (1, 2, 4))
+    assert all(row['correct'] for row in rows)
+    assert 1 < rows[1]['speedup'] < rows[2]['speedup']
+
+
+def test_total_cycles_is_the_slowest_core():
+    wl = workloads.parallel_prefix_sum(16, 3)
+    random.seed(0)
+    mc = MulticoreSimulator(wl['programs'], wl['memory'])
+    mc.simulate()
+    per_core = [s['Total Cycles'] for s in mc.statistics['Per Core']]
+    assert mc.statistics['Total Cycles'] == max(per_core)
+
+
+def test_one_core_matches_a_lone_simulator():
+    wl = workloads.build('prefix_sum')
+    random.seed(0)
+    mc = MulticoreSimulator([wl['instructions']], wl['memory'])
+    mc.simulate()
+    random.seed(0)
+    sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'])
+    sim.simulate()
+    assert mc.statistics['Total Cycles'] == sim.statistics['Total Cycles']
+    assert mc.statistics['Aggregate IPC'] == sim.statistics['IPC']
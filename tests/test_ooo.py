@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+from simulator import MIPSPipelineSimulator
+from checker import check
+from ooo import TomasuloSimulator
+
+# A taken branch with another taken branch in its delay slot: the inner
+# branch's own delay slot is the first instruction at the outer target.
+NESTED_BRANCH = [
+    "addi $t0, $zero, 1",
+    "beq $t0, $t0, A",
+    "bne $t0, $zero, B",
+    "addi $t1, $zero, 5",
+    "A:",
+    "addi $t2, $zero, 7",
+    "addi $t3, $zero, 9",
+    "B:",
+    "addi $t4, $zero, 11",
+    "nop",
+]
+
+# Same, with a not-taken branch and a jr in the delay slots.
+NESTED_JUMP = [
+    "addi $t0, $zero, 6",
+    "beq $t0, $zero, A",
+    "jr $t0",
+    "addi $t1, $zero, 5",
+    "A:",
+    "addi $t2, $zero, 7",
+    "addi $t3, $zero, 9",
+    "addi $t4, $zero, 11",
+    "nop",
+]
+
+
+@pytest.mark.parametrize('program', [NESTED_BRANCH, NESTED_JUMP])
+@pytest.mark.parametrize('width', [1, 2, 4])
+def test_branch_in_delay_slot(program, width):
+    random.seed(0)
+    ooo = TomasuloSimulator(program, {}, issue_width=width)
+    check(ooo)
+    random.seed(0)
+    reference = MIPSPipelineSimulator(program, {})
+    reference.simulate()
+    assert ooo.registers == reference.registers
@@ -0,0 +1,34 @@
+import random
+
+import pytest
+
+from pipeline_config import PipelineConfig, stage
+from simulator import MIPSPipelineSimulator
+
+CLASSIC = [stage('IF', 'fetch'), stage('ID', 'decode'), stage('EX', 'execute'), stage('MEM', 'memory'),
+           stage('WB', 'writeback')]
+LONG_TAIL = CLASSIC[:3] + [stage('MEM1', 'memory'), stage('MEM2', 'memory'), stage('WB1', 'writeback'),
+                           stage('WB2', 'writeback')]
+
+
+def test_branch_penalty_follows_the_resolving_stage():
+    assert PipelineConfig().branch_penalty == 4
+    assert PipelineConfig('deep').branch_penalty == PipelineConfig('deep').execute + 2 == 6
+    assert PipelineConfig(LONG_TAIL).branch_penalty == 4
+    assert PipelineConfig(CLASSIC, branch_penalty=1).branch_penalty == 1
+
+
+@pytest.mark.parametrize('pipeline', [CLASSIC, LONG_TAIL, 'deep'])
+def test_every_branch_pays_the_penalty_in_nops(pipeline):
+    random.seed(0)
+    sim = MIPSPipelineSimulator(pipeline=pipeline)
+    sim.simulate()
+    stats = sim.statistics
+    assert stats['Dynamic NOPs'] == stats['Branch Instructions'] * sim.pipeline.branch_penalty
+
+
+def test_stage_roles_are_checked():
+    with pytest.raises(ValueError):
+        PipelineConfig(CLASSIC[::-1])
+    with pytest.raises(ValueError):
+        PipelineConfig('nonesuch')
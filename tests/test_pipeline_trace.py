@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+import workloads
+from simulator import MIPSPipelineSimulator
+from pipeline_trace import OPCODES, PipelineTrace, opcode_id
+
+
+class DictLog:
+    # The log as it used to be kept: one {stage: display string} per cycle.
+    def __init__(self, stages):
+        self.stages = stages
+        self.rows = []
+        self.cells = []
+
+    def record(self, cycle, cells):
+        row = {'Cycle': cycle}
+        for stage, cell in zip(self.stages, cells):
+            if cell is None:
+                row[stage] = "--"
+            elif cell[2]:
+                row[stage] = f"{OPCODES[cell[0]]} ({cell[2]})"
+            else:
+                row[stage] = OPCODES[cell[0]]
+        self.rows.append(row)
+        self.cells.append((cycle, list(cells)))
+
+    def finish(self, cycle):
+        pass
+
+
+@pytest.mark.parametrize('options', [{}, {'issue_width': 2}, {'pipeline': 'deep'}], ids=['classic', 'dual', 'deep'])
+def test_columns_match_the_dict_log(options):
+    random.seed(1)
+    wl = workloads.build('prefix_sum')
+    sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'], **options)
+    log = DictLog(sim.pipeline_log.stages)
+    sim.trace_sinks.append(log)
+    sim.simulate()
+    trace = sim.pipeline_log
+    assert len(trace) == len(log.rows) == sim.statistics['Total Cycles']
+    assert list(trace) == [[row['Cycle']] + [row[s] for s in trace.stages] for row in log.rows]
+    assert list(trace.records()) == log.cells
+
+
+def test_columns_widen_past_their_limits():
+    trace = PipelineTrace()
+    add = opcode_id('add')
+    cells = [None, (add, 40000, 300, 1), None, (add, 3, 0, 400), None]
+    trace.record(1, cells)
+    trace.record(2, [None] * 5)
+    # Indices and ages widen; the stall count saturates at 255.
+    cells[1] = (add, 40000, 255, 1)
+    assert list(trace.records()) == [(1, cells), (2, [None] * 5)]
+    assert trace[0] == [1, "--", "add (255)", "--", "add", "--"]
@@ -0,0 +1,72 @@
+import random
+
+import pytest
+
+from simulator import MIPSPipelineSimulator
+from functional import FunctionalModel
+from ooo import TomasuloSimulator
+from reuse_distance import ReuseProfiler
+
+
+# Every load reads the word the store before it wrote.
+RELOAD = [
+    "addi $t1, $zero, 0",
+    "addi $t0, $zero, 5",
+    "loop:",
+    "  sw   $t0, 0($t1)",
+    "  lw   $t2, 0($t1)",
+    "  addi $t1, $t1, 4",
+    "  slti $t3, $t1, 32",
+    "  bne  $t3, $zero, loop",
+    "  add  $t0, $t0, $t2",
+    "nop",
+]
+
+
+def stack_distances(addresses, line_size):
+    # Reference LRU stack: distance is the depth of the line, None if new.
+    stack = []
+    for address in addresses:
+        line = address // line_size
+        if line in stack:
+            depth = stack[::-1].index(line)
+            stack.remove(line)
+            yield depth
+        else:
+            yield None
+        stack.append(line)
+
+
+@pytest.mark.parametrize('simulator, options', [
+    (MIPSPipelineSimulator, {}),
+    (MIPSPipelineSimulator, {'store_buffer': 2}),
+    (TomasuloSimulator, {'issue_width': 2}),
+])
+def test_every_address_is_profiled(simulator, options):
+    addresses = [r['address'] for r in FunctionalModel(RELOAD, {}).stream() if r['address'] is not None]
+    sim = simulator(RELOAD, {}, **options)
+    profiler = ReuseProfiler()
+    sim.access_sinks.append(profiler)
+    random.seed(0)
+    sim.simulate()
+    if options:
+        assert sim.statistics['Store Forwards'] > 0
+    assert profiler.accesses == len(addresses)
+    assert profiler.cold == len(set(addresses))
+
+
+def test_distances_match_an_lru_stack_across_compactions():
+    rng = random.Random(1)
+    addresses = [4 * rng.randrange(300) for _ in range(5000)]
+    profiler = ReuseProfiler(line_size=8)
+    for address in addresses:
+        profiler.access(address)
+    histogram = {}
+    for d in stack_distances(addresses, 8):
+        if d is not None:
+            histogram[d] = histogram.get(d, 0) + 1
+    assert profiler.histogram == histogram
+    assert len(profiler.tree) <= 2 * max(1024, len(profiler.last))
+
+    misses = {size: sum(1 for d in stack_distances(addresses, 8) if d is None or d >= size) for size in (1, 7, 64, 500)}
+    assert profiler.miss_ratio_curve(misses) == [(size, n / len(addresses)) for size, n in misses.items()]
@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from simulator import MIPSPipelineSimulator
+from timeseries import WindowedMetrics
+
+
+def window_totals(metrics, metric):
+    # Adds up whole windows ending at the last cycle, going back one window
+    # at a time, so every cycle is counted exactly once.
+    series, total = metrics.series[metric], 0.0
+    for row in range(len(metrics) - 1, -1, -metrics.window):
+        total += series[row] * min(metrics.window, row + 1)
+    return total
+
+
+def run(window=16, **options):
+    random.seed(2)
+    sim = MIPSPipelineSimulator(**options)
+    sim.window_metrics = WindowedMetrics(window, lanes=options.get('issue_width', 1))
+    sim.simulate()
+    return sim.statistics, sim.window_metrics
+
+
+@pytest.mark.parametrize('options', [{}, {'issue_width': 2}, {'pipeline': 'deep'}], ids=['classic', 'dual', 'deep'])
+def test_window_ipc_adds_up_to_the_overall_ipc(options):
+    stats, metrics = run(**options)
+    cycles = stats['Total Cycles']
+    assert len(metrics) == cycles
+    # Window IPC leaves out the NOP bubbles that the overall IPC counts.
+    retired = stats['Instructions Executed'] - stats['Dynamic NOPs']
+    assert window_totals(metrics, 'ipc') / cycles == pytest.approx(retired / cycles)
+
+
+def test_window_ipc_and_nops_make_up_the_overall_ipc():
+    stats, metrics = run()
+    total = window_totals(metrics, 'ipc') + window_totals(metrics, 'nop')
+    assert total / stats['Total Cycles'] == pytest.approx(stats['IPC'])
+
+
+def test_a_window_covering_the_run_ends_at_the_overall_rate():
+    stats, metrics = run(window=10000)
+    retired = stats['Instructions Executed'] - stats['Dynamic NOPs']
+    assert metrics.at(len(metrics) - 1)['ipc'] == pytest.approx(retired / stats['Total Cycles'])
+    assert metrics.at(len(metrics) - 1)['nop'] == pytest.approx(stats['Dynamic NOPs'] / stats['Total Cycles'])
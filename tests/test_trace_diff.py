@@ -0,0 +1,52 @@
+from simulator import MIPSPipelineSimulator
+from trace_diff import diff_traces, format_report
+
+PROGRAM = [
+    "addi $t0, $zero, 4",
+    "lw   $t1, 0($t0)",
+    "add  $t2, $t1, $t1",
+    "lw   $t3, 4($t0)",
+    "sw   $t2, 8($t0)",
+    "nop",
+]
+
+
+class SlowAccess:
+    # Every access takes 2 cycles, except the `slow`-th, which takes 3.
+    def __init__(self, slow=None):
+        self.slow = slow
+        self.count = 0
+
+    def latency(self, op, address, cycle, pc=None):
+        self.count += 1
+        return 3 if self.count == self.slow else 2
+
+    def statistics(self):
+        return {}
+
+
+def trace(slow=None):
+    sim = MIPSPipelineSimulator(PROGRAM, {4: 5, 8: 6})
+    sim.memory_model = SlowAccess(slow)
+    sim.simulate()
+    return sim.pipeline_log
+
+
+def test_identical_runs_do_not_diverge():
+    result = diff_traces(trace(), trace())
+    assert result['first_divergent_cycle'] is None
+    assert "Traces are identical." in format_report(result, PROGRAM)
+
+
+def test_one_extra_stall_is_charged_to_its_load():
+    a, b = trace(), trace(slow=2)
+    result = diff_traces(a, b)
+    ca, cb = result['cycles']
+    assert cb - ca == 1
+    assert result['instructions'][0] == result['instructions'][1]
+    assert result['mem_stall'][1] - result['mem_stall'][0] == 1
+    assert result['first_control_divergence'] is None
+    assert result['first_timing_divergence']['index'] == 3
+    assert result['per_instruction'][3]['mem_stall_delta'] == 1
+    assert all(e['mem_stall_delta'] == 0 for i, e in result['per_instruction'].items() if i != 3)
+    assert result['first_divergent_cycle'] is not None
@@ -0,0 +1,87 @@
+import io
+import random
+
+import pytest
+
+import workloads
+from simulator import MIPSPipelineSimulator
+from memory_models import RandomLatency
+from trace_export import BinaryTraceReader, LifetimeTracker, O3_EVENTS, export, replay
+
+
+class Lifetimes(LifetimeTracker):
+    def __init__(self, stages):
+        super().__init__(stages)
+        self.retired = []
+
+    def on_retire(self, cycle, life):
+        self.retired.append(life)
+
+
+def run(fmt):
+    wl = workloads.build('prefix_sum')
+    sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'])
+    sim.memory_model = RandomLatency(rng=random.Random(3))
+    out = io.BytesIO() if fmt == 'binary' else io.StringIO()
+    export(sim, out, fmt, keep_log=True)
+    lives = Lifetimes(sim.pipeline_log.stages)
+    replay(sim.pipeline_log.records(), lives)
+    return sim, out, lives.retired
+
+
+def parse_konata(text):
+    # seq -> {'stages': [[name, enter, exit], ...], 'retire': cycle}
+    cycle, lives = 0, {}
+    for line in text.splitlines()[1:]:
+        tag, *fields = line.split("\t")
+        if tag == 'C=':
+            cycle = int(fields[0])
+        elif tag == 'C':
+            cycle += int(fields[0])
+        elif tag == 'I':
+            lives[int(fields[0])] = {'stages': []}
+        elif tag == 'S':
+            lives[int(fields[0])]['stages'].append([fields[2], cycle, None])
+        elif tag == 'E':
+            lives[int(fields[0])]['stages'][-1][2] = cycle
+        elif tag == 'R':
+            lives[int(fields[0])]['retire'] = cycle
+    return lives
+
+
+def test_binary_trace_round_trips():
+    sim, out, _ = run('binary')
+    reader = BinaryTraceReader(out)
+    assert reader.stages == sim.pipeline_log.stages
+    assert reader.program == sim.filtered_instructions
+    assert list(reader) == list(sim.pipeline_log.records())
+
+
+def test_konata_trace_round_trips():
+    sim, out, retired = run('konata')
+    lives = parse_konata(out.getvalue())
+    assert len(lives) == len(retired)
+    names = sim.pipeline_log.stages
+    for life in retired:
+        parsed = lives[life['seq']]
+        assert parsed['retire'] == life['retire']
+        assert parsed['stages'] == [[names[k], enter, exit] for k, enter, exit in life['stages']]
+
+
+def test_o3_trace_round_trips():
+    sim, out, retired = run('o3')
+    lines = out.getvalue().splitlines()
+    assert len(lines) == len(O3_EVENTS) * len(retired)
+    for n, life in enumerate(retired):
+        block = [line.split(":") for line in lines[n * len(O3_EVENTS):(n + 1) * len(O3_EVENTS)]]
+        assert [fields[1] for fields in block] == [event for event, _ in O3_EVENTS]
+        assert int(block[0][5]) == life['seq']
+        assert int(block[0][3], 16) == max(life['index'], 0) * 4
+        enter = {sim.pipeline_log.stages[k]: start for k, start, _ in life['stages']}
+        for fields, (_, stage) in zip(block, O3_EVENTS):
+            assert int(fields[2]) == enter.get(stage, 0) * 1000
+
+
+def test_export_rejects_unknown_formats():
+    with pytest.raises(ValueError, match="Unknown trace format"):
+        export(MIPSPipelineSimulator(), io.StringIO(), 'vcd')
@@ -0,0 +1,67 @@
+from array import array
+
+from pipeline_trace import OPCODES
+
+# Rolling-window pipeline metrics, kept as a trace sink. Each cycle adds one
+# sample and drops the one that fell out of the window, so the update is O(1)
+# no matter how long the run is. One value per metric per cycle is kept:
+#   ipc   - instructions reaching WB for the first time (bubbles excluded);
+#           with several WB slots per cycle this can exceed 1
+#   stall - cycles in which a lw/sw was holding a stage; other holds (a
+#           busy functional unit, a slow stage) are not counted
+#   nop   - cycles in which WB retired a NOP injected behind a branch
+METRICS = ('ipc', 'stall', 'nop')
+METRIC_LABELS = {'ipc': 'IPC', 'stall': 'Stall Fraction', 'nop': 'NOP Fraction'}
+
+
+class WindowedMetrics:
+    def __init__(self, window=16, lanes=1):
+        self.window = window
+        self.lanes = lanes
+        self.clear()
+
+    def clear(self):
+        self.cycles = array('I')
+        self.series = {m: array('f') for m in METRICS}
+        self._ring = [(0, 0, 0)] * self.window
+        self._pos = 0
+        self._filled = 0
+        self._sums = [0, 0, 0]
+        self._last_wb = ()
+
+    def record(self, cycle, cells):
+        retired = nop = 0
+        seqs = set()
+        for wb in cells[-self.lanes:]:
+            if wb is None:
+                continue
+            seqs.add(wb[3])
+            if wb[3] not in self._last_wb:
+                if wb[1] >= 0:
+                    retired += 1
+                else:
+                    nop = 1
+        self._last_wb = seqs
+        stall = 1 if any(c is not None and c[2] and OPCODES[c[0]] in ('lw', 'sw') for c in cells) else 0
+
+        old = self._ring[self._pos]
+        self._ring[self._pos] = (retired, stall, nop)
+        self._pos = (self._pos + 1) % self.window
+        self._filled = min(self._filled + 1, self.window)
+        sums = self._sums
+        sums[0] += retired - old[0]
+        sums[1] += stall - old[1]
+        sums[2] += nop - old[2]
+
+        self.cycles.append(cycle)
+        for metric, total in zip(METRICS, sums):
+            self.series[metric].append(total / self._filled)
+
+    def finish(self, cycle):
+        pass
+
+    def __len__(self):
+        return len(self.cycles)
+
+    def at(self, row):
+        return {m: self.series[m][row] for m in METRICS}
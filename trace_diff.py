@@ -0,0 +1,193 @@
+import sys
+from collections import deque
+
+from pipeline_trace import PipelineTrace, format_cell
+from trace_export import BinaryTraceReader, LifetimeTracker
+
+# Streaming comparison of two pipeline traces. Records are compared cycle by
+# cycle until they first differ. Retired instructions are then paired in
+# program order (the k-th retired instruction of one run against the k-th of
+# the other), so a single extra stall early on does not make every later
+# cycle look different. Only the retirements one run is ahead of the other by
+# are buffered.
+
+
+def _source(trace):
+    if isinstance(trace, PipelineTrace):
+        return trace.stages, trace.records()
+    if isinstance(trace, str):
+        trace = BinaryTraceReader(trace)
+    if isinstance(trace, BinaryTraceReader):
+        return trace.stages, iter(trace)
+    stages, records = trace
+    return tuple(stages), iter(records)
+
+
+def _cell_key(cell):
+    # Sequence numbers are left out: they shift as soon as one run fetches a
+    # different number of bubbles, which the occupancy already shows.
+    return None if cell is None else cell[:3]
+
+
+class _Retirements(LifetimeTracker):
+    def __init__(self, stages):
+        super().__init__(stages)
+        self.queue = deque()
+        self.bubbles = 0
+        self.mem_stall = 0
+
+    def on_retire(self, cycle, life):
+        if life['index'] < 0:
+            self.bubbles += 1
+            return
+        life['latency'] = life['retire'] - life['stages'][0][1]
+        # Cycles spent beyond one per stage that were not the instruction's
+        # own memory wait were spent frozen behind someone else's.
+        extra = life['latency'] - len(life['stages'])
+        life['blocked'] = max(extra - life['mem_stall'], 0)
+        self.mem_stall += life['mem_stall']
+        self.queue.append(life)
+
+
+class _Stream:
+    def __init__(self, trace):
+        self.stages, self.records = _source(trace)
+        self.tracker = _Retirements(self.stages)
+        self.cycles = 0
+        self.retired = 0
+        self.done = False
+
+    def step(self):
+        if self.done:
+            return None
+        try:
+            cycle, cells = next(self.records)
+        except StopIteration:
+            self.tracker.finish(self.cycles)
+            self.done = True
+            return None
+        self.cycles = cycle
+        self.tracker.record(cycle, cells)
+        return cycle, cells
+
+
+def _row(record):
+    if record is None:
+        return None
+    return [record[0]] + [format_cell(c[0], c[2]) if c else "--" for c in record[1]]
+
+
+def diff_traces(a, b):
+    sa, sb = _Stream(a), _Stream(b)
+    if sa.stages != sb.stages:
+        raise ValueError(f"Traces have different stages: {sa.stages} vs {sb.stages}")
+    result = {
+        'first_divergent_cycle': None,
+        'divergent_rows': None,
+        'first_timing_divergence': None,
+        'first_control_divergence': None,
+        'per_instruction': {},
+    }
+
+    # Phase 1: lockstep by cycle until the occupancy first differs.
+    while True:
+        ra, rb = sa.step(), sb.step()
+        if ra is None and rb is None:
+            break
+        if ra is None or rb is None or ra[0] != rb[0] or list(map(_cell_key, ra[1])) != list(map(_cell_key, rb[1])):
+            result['first_divergent_cycle'] = (ra or rb)[0]
+            result['divergent_rows'] = (_row(ra), _row(rb))
+            break
+        _pair(sa, sb, result)
+
+    # Phase 2: drive whichever run has fewer retirements waiting to be paired.
+    while not (sa.done and sb.done):
+        qa, qb = sa.tracker.queue, sb.tracker.queue
+        if not sa.done and (sb.done or len(qa) <= len(qb)):
+            sa.step()
+        else:
+            sb.step()
+        _pair(sa, sb, result)
+
+    for stream in (sa, sb):
+        stream.retired += len(stream.tracker.queue)
+    result.update({
+        'cycles': (sa.cycles, sb.cycles),
+        'instructions': (sa.retired, sb.retired),
+        'bubbles': (sa.tracker.bubbles, sb.tracker.bubbles),
+        'mem_stall': (sa.tracker.mem_stall, sb.tracker.mem_stall),
+    })
+    return result
+
+
+def _pair(sa, sb, result):
+    qa, qb = sa.tracker.queue, sb.tracker.queue
+    while qa and qb:
+        la, lb = qa.popleft(), qb.popleft()
+        sa.retired += 1
+        sb.retired += 1
+        if result['first_control_divergence'] is not None:
+            continue
+        if la['index'] != lb['index']:
+            result['first_control_divergence'] = {
+                'position': sa.retired - 1, 'index': (la['index'], lb['index']),
+                'retire': (la['retire'], lb['retire']),
+            }
+            continue
+        if result['first_timing_divergence'] is None and la['retire'] != lb['retire']:
+            result['first_timing_divergence'] = {
+                'position': sa.retired - 1, 'index': la['index'],
+                'seq': (la['seq'], lb['seq']), 'retire': (la['retire'], lb['retire']),
+            }
+        entry = result['per_instruction'].setdefault(la['index'], {
+            'count': 0, 'latency_delta': 0, 'max_delta': 0, 'mem_stall_delta': 0, 'blocked_delta': 0,
+        })
+        delta = lb['latency'] - la['latency']
+        entry['count'] += 1
+        entry['latency_delta'] += delta
+        if abs(delta) > abs(entry['max_delta']):
+            entry['max_delta'] = delta
+        entry['mem_stall_delta'] += lb['mem_stall'] - la['mem_stall']
+        entry['blocked_delta'] += lb['blocked'] - la['blocked']
+
+
+def format_report(result, program=None):
+    lines = []
+    ca, cb = result['cycles']
+    lines.append(f"Cycles: {ca} -> {cb} ({cb - ca:+d})")
+    ia, ib = result['instructions']
+    lines.append(f"Retired instructions: {ia} -> {ib} ({ib - ia:+d})")
+    ba, bb = result['bubbles']
+    lines.append(f"Branch NOP bubbles: {ba} -> {bb} ({bb - ba:+d})")
+    ma, mb = result['mem_stall']
+    lines.append(f"Memory wait cycles: {ma} -> {mb} ({mb - ma:+d})")
+    if result['first_divergent_cycle'] is None:
+        lines.append("Traces are identical.")
+        return "\n".join(lines)
+    lines.append(f"First divergent cycle: {result['first_divergent_cycle']}")
+    for tag, row in zip("AB", result['divergent_rows']):
+        lines.append(f"  {tag}: {' | '.join(str(v) for v in row) if row else '(trace ended)'}")
+    timing = result['first_timing_divergence']
+    if timing:
+        lines.append(f"First instruction retiring at a different cycle: #{timing['position']} "
+                     f"(index {timing['index']}), cycle {timing['retire'][0]} -> {timing['retire'][1]}")
+    control = result['first_control_divergence']
+    if control:
+        lines.append(f"Control flow diverges at retired instruction #{control['position']}: "
+                     f"index {control['index'][0]} vs {control['index'][1]}")
+    lines.append("")
+    lines.append(f"| {'Index':>5} | {'Instruction':24} | {'Count':>6} | {'Latency Δ':>9} | {'Max Δ':>6} | {'Mem Δ':>6} | {'Blocked Δ':>9} |")
+    for index in sorted(result['per_instruction']):
+        e = result['per_instruction'][index]
+        if not (e['latency_delta'] or e['max_delta'] or e['mem_stall_delta'] or e['blocked_delta']):
+            continue
+        text = program[index] if program and index < len(program) else ""
+        lines.append(f"| {index:5d} | {text:24} | {e['count']:6d} | {e['latency_delta']:+9d} | {e['max_delta']:+6d} "
+                     f"| {e['mem_stall_delta']:+6d} | {e['blocked_delta']:+9d} |")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    # python trace_diff.py <a.trace> <b.trace>   (binary traces from trace_export)
+    reader = BinaryTraceReader(sys.argv[1])
+    print(format_report(diff_traces(reader, sys.argv[2]), reader.program))
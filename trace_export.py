@@ -0,0 +1,295 @@
+import gzip
+import json
+import struct
+import sys
+
+from pipeline_trace import STAGES, OPCODES, opcode_id, base_stage, base_stages
+
+# All exporters are trace sinks: the simulator calls record(cycle, cells) once
+# per cycle and finish(cycle) at the end, so nothing beyond the instructions
+# currently in flight is ever held in memory.
+
+
+class LifetimeTracker:
+    """Follows every dynamic instruction (by fetch sequence number) through
+    the stages and reports when it enters and leaves each one.
+
+    An instruction that is frozen behind a stall is not shown in the trace
+    for those cycles; it stays in its last stage until it shows up in the
+    next one, so stall cycles are charged to the stage it was stuck in.
+    Superscalar slots ("EX.1") count as the stage they belong to.
+    """
+
+    def __init__(self, stages=STAGES):
+        self.stages = tuple(stages)
+        self.names = base_stages(self.stages)
+        self._stage = [self.names.index(base_stage(name)) for name in self.stages]
+        self.live = {}
+
+    def record(self, cycle, cells):
+        last = len(self.names) - 1
+        present = set()
+        for k, cell in enumerate(cells):
+            if cell is None:
+                continue
+            k = self._stage[k]
+            op, index, left, seq = cell
+            present.add(seq)
+            life = self.live.get(seq)
+            if life is None:
+                life = self.live[seq] = {'seq': seq, 'op': op, 'index': index, 'stages': [], 'mem_stall': 0}
+                self.on_begin(cycle, life)
+            if not life['stages'] or life['stages'][-1][0] != k:
+                if life['stages']:
+                    life['stages'][-1][2] = cycle
+                    self.on_exit(cycle, life, life['stages'][-1][0])
+                life['stages'].append([k, cycle, None])
+                self.on_enter(cycle, life, k)
+            if left:
+                life['mem_stall'] += 1
+        done = [seq for seq, life in self.live.items() if life['stages'][-1][0] == last and seq not in present]
+        for seq in sorted(done):
+            self._retire(cycle, self.live.pop(seq))
+
+    def finish(self, cycle):
+        for seq in sorted(self.live):
+            self._retire(cycle + 1, self.live[seq])
+        self.live.clear()
+
+    def _retire(self, cycle, life):
+        life['stages'][-1][2] = cycle
+        self.on_exit(cycle, life, life['stages'][-1][0])
+        life['retire'] = cycle
+        self.on_retire(cycle, life)
+
+    def on_begin(self, cycle, life):
+        pass
+
+    def on_enter(self, cycle, life, stage):
+        pass
+
+    def on_exit(self, cycle, life, stage):
+        pass
+
+    def on_retire(self, cycle, life):
+        pass
+
+
+def _open_text(target):
+    if hasattr(target, 'write'):
+        return target, False
+    return open(target, 'w'), True
+
+
+def _label(life, program):
+    if life['index'] < 0:
+        return "nop (bubble)"
+    if program is not None:
+        return f"{life['index']}: {program[life['index']]}"
+    return f"{life['index']}: {OPCODES[life['op']]}"
+
+
+class KonataWriter(LifetimeTracker):
+    """Writes the Kanata 0004 log format read by the Konata viewer."""
+
+    def __init__(self, target, program=None, stages=STAGES):
+        super().__init__(stages)
+        self.out, self._owned = _open_text(target)
+        self.program = program
+        self.cycle = None
+        self.retired = 0
+
+    def _advance(self, cycle):
+        if self.cycle is None:
+            self.out.write(f"Kanata\t0004\nC=\t{cycle}\n")
+        elif cycle > self.cycle:
+            self.out.write(f"C\t{cycle - self.cycle}\n")
+        self.cycle = cycle
+
+    def record(self, cycle, cells):
+        self._advance(cycle)
+        super().record(cycle, cells)
+
+    def finish(self, cycle):
+        if self.live:
+            self._advance(cycle + 1)
+        super().finish(cycle)
+        if self._owned:
+            self.out.close()
+
+    def on_begin(self, cycle, life):
+        self.out.write(f"I\t{life['seq']}\t{life['seq']}\t0\n")
+        self.out.write(f"L\t{life['seq']}\t0\t{_label(life, self.program)}\n")
+
+    def on_enter(self, cycle, life, stage):
+        self.out.write(f"S\t{life['seq']}\t0\t{self.names[stage]}\n")
+
+    def on_exit(self, cycle, life, stage):
+        self.out.write(f"E\t{life['seq']}\t0\t{self.names[stage]}\n")
+
+    def on_retire(self, cycle, life):
+        self.out.write(f"R\t{life['seq']}\t{self.retired}\t0\n")
+        self.retired += 1
+
+
+# gem5 O3 event names, keyed by the pipeline stage that stands in for them.
+O3_EVENTS = (('fetch', 'IF'), ('decode', 'ID'), ('rename', 'ID'), ('dispatch', 'EX'),
+             ('issue', 'EX'), ('complete', 'MEM'), ('retire', 'WB'))
+
+
+class O3PipeViewWriter(LifetimeTracker):
+    """Writes gem5 O3PipeView records (one block per retired instruction),
+    which Konata and gem5's o3-pipeview.py both read."""
+
+    def __init__(self, target, program=None, stages=STAGES, ticks_per_cycle=1000):
+        super().__init__(stages)
+        self.out, self._owned = _open_text(target)
+        self.program = program
+        self.ticks = ticks_per_cycle
+
+    def finish(self, cycle):
+        super().finish(cycle)
+        if self._owned:
+            self.out.close()
+
+    def _enter_tick(self, life, prefix):
+        for k, enter, _ in life['stages']:
+            if self.names[k].startswith(prefix):
+                return enter * self.ticks
+        return 0
+
+    def on_retire(self, cycle, life):
+        pc = max(life['index'], 0) * 4
+        ticks = [self._enter_tick(life, prefix) for _, prefix in O3_EVENTS]
+        store = 0
+        if OPCODES[life['op']] == 'sw':
+            store = life['stages'][-1][1] * self.ticks
+        self.out.write(f"O3PipeView:fetch:{ticks[0]}:0x{pc:08x}:0:{life['seq']}:{_label(life, self.program)}\n")
+        for (event, _), tick in zip(O3_EVENTS[1:-1], ticks[1:-1]):
+            self.out.write(f"O3PipeView:{event}:{tick}\n")
+        self.out.write(f"O3PipeView:retire:{ticks[-1]}:store:{store}\n")
+
+
+# Binary trace: a gzip stream holding a magic string, a length-prefixed JSON
+# header (stage names, program text) and then tagged records. 'O' defines an
+# opcode name the first time its id is used, 'C' is one cycle with an
+# (opcode, index, stall left, seq) entry per stage; opcode 0 is an empty stage.
+BINARY_MAGIC = b'MIPSTRC1'
+_CELL = struct.Struct('<BiBI')
+_CYCLE = struct.Struct('<I')
+
+
+class BinaryTraceWriter:
+    def __init__(self, target, program=None, stages=STAGES, compresslevel=6):
+        self.stages = tuple(stages)
+        self.out = gzip.open(target, 'wb', compresslevel=compresslevel) if not hasattr(target, 'write') \
+            else gzip.GzipFile(fileobj=target, mode='wb', compresslevel=compresslevel)
+        header = json.dumps({'stages': list(self.stages), 'program': list(program or [])}).encode()
+        self.out.write(BINARY_MAGIC + _CYCLE.pack(len(header)) + header)
+        self.defined = set()
+        self._empty = _CELL.pack(0, -1, 0, 0)
+
+    def record(self, cycle, cells):
+        parts = [b'C', _CYCLE.pack(cycle)]
+        for cell in cells:
+            if cell is None:
+                parts.append(self._empty)
+                continue
+            op = cell[0]
+            if op not in self.defined:
+                name = OPCODES[op].encode()
+                self.out.write(b'O' + bytes((op, len(name))) + name)
+                self.defined.add(op)
+            parts.append(_CELL.pack(op, cell[1], min(cell[2], 255), cell[3]))
+        self.out.write(b''.join(parts))
+
+    def finish(self, cycle):
+        self.out.close()
+
+
+class BinaryTraceReader:
+    """Streams (cycle, cells) records back out of a binary trace file."""
+
+    def __init__(self, source):
+        self.source = source
+        with self._open() as f:
+            self.stages, self.program, _ = self._read_header(f)
+
+    def _open(self):
+        if hasattr(self.source, 'read'):
+            self.source.seek(0)
+            return gzip.GzipFile(fileobj=self.source, mode='rb')
+        return gzip.open(self.source, 'rb')
+
+    def _read_header(self, f):
+        if f.read(len(BINARY_MAGIC)) != BINARY_MAGIC:
+            raise ValueError("Not a pipeline trace file")
+        size, = _CYCLE.unpack(f.read(_CYCLE.size))
+        header = json.loads(f.read(size))
+        return tuple(header['stages']), header['program'], header
+
+    def __iter__(self):
+        with self._open() as f:
+            self._read_header(f)
+            width = _CYCLE.size + _CELL.size * len(self.stages)
+            ops = {0: 0}
+            while True:
+                tag = f.read(1)
+                if not tag:
+                    return
+                if tag == b'O':
+                    op, size = f.read(2)
+                    ops[op] = opcode_id(f.read(size).decode())
+                    continue
+                if tag != b'C':
+                    raise ValueError(f"Corrupt trace record: {tag!r}")
+                data = f.read(width)
+                cycle, = _CYCLE.unpack_from(data)
+                cells = []
+                for k in range(len(self.stages)):
+                    op, index, left, seq = _CELL.unpack_from(data, _CYCLE.size + k * _CELL.size)
+                    cells.append((ops[op], index, left, seq) if op else None)
+                yield cycle, cells
+
+
+def replay(records, *sinks):
+    # Feeds recorded (cycle, cells) pairs, e.g. from PipelineTrace.records() or
+    # a BinaryTraceReader, into sinks as if the simulator were running.
+    cycle = 0
+    for cycle, cells in records:
+        for sink in sinks:
+            sink.record(cycle, cells)
+    for sink in sinks:
+        sink.finish(cycle)
+
+
+WRITERS = {
+    'konata': KonataWriter,
+    'o3': O3PipeViewWriter,
+    'binary': BinaryTraceWriter,
+}
+
+
+def export(sim, target, fmt='konata', keep_log=False):
+    # Runs the simulator with the exporter attached. The in-memory
+    # pipeline_log is switched off by default so long runs stay flat in memory.
+    if fmt not in WRITERS:
+        raise ValueError(f"Unknown trace format: {fmt}")
+    writer = WRITERS[fmt](target, program=sim.filtered_instructions, stages=sim.pipeline_log.stages)
+    sim.trace_sinks.append(writer)
+    sim.keep_log = keep_log
+    try:
+        return sim.simulate()
+    finally:
+        sim.trace_sinks.remove(writer)
+
+
+if __name__ == "__main__":
+    # python trace_export.py <konata|o3|binary> <output> [prefix-sum length]
+    from simulator import MIPSPipelineSimulator
+    import workloads
+    fmt, target = sys.argv[1], sys.argv[2]
+    wl = workloads.prefix_sum(int(sys.argv[3])) if len(sys.argv) > 3 else workloads.prefix_sum()
+    sim = MIPSPipelineSimulator(wl['instructions'], wl['memory'])
+    export(sim, target, fmt)
+    print(f"Wrote {sim.statistics['Total Cycles']} cycles to {target}")
@@ -0,0 +1,345 @@
+import random
+import time
+
+# Every generator returns a dict with the program text (labels included, in the
+# same form as MIPSPipelineSimulator.instruction_memory), the initial memory
+# image and the parameters it was built from.
+
+
+def _workload(name, instructions, memory, **params):
+    return {'name': name, 'instructions': instructions, 'memory': memory, 'params': params}
+
+
+def array_image(n, base=0, stride=4, values=None):
+    if values is None:
+        values = range(n)
+    return {base + i * stride: v for i, v in zip(range(n), values)}
+
+
+def prefix_sum(n=10, base=0, stride=4):
+    end = base + n * stride
+    instructions = [
+        f"lw   $t2, {base}($zero)",
+        f"addi $t1, $zero, {base + stride}",
+        "loop:",
+        f"  slti $t0, $t1, {end}",
+        "  beq  $t0, $zero, end",
+        "  lw   $t3, 0($t1)",
+        "  add  $t2, $t2, $t3",
+        "  sw   $t2, 0($t1)",
+        f"  addi $t1, $t1, {stride}",
+        "  j    loop",
+        "end:",
+        f"  sw   $t2, {end}($zero)",
+        "  nop"
+    ]
+    return _workload('prefix_sum', instructions, array_image(n, base, stride), n=n, base=base, stride=stride)
+
+
+def loop_kernel(trips=0, t0=50, t1=20, t2=30, memory_words=10):
+    # The loop exits once $t0+$t1+$t2 reaches the limit; each trip adds 3.
+    limit = t0 + t1 + t2 + 3 * trips
+    instructions = [
+        f"addi $t0, $zero, {t0}",
+        f"addi $t1, $zero, {t1}",
+        f"addi $t2, $zero, {t2}",
+        "loop:",
+        "add  $t3, $t0, $t1",
+        "add  $t3, $t3, $t2",
+        f"slti $t4, $t3, {limit}",
+        "beq  $t4, $zero, end",
+        "addi $t0, $t0, 1",
+        "addi $t1, $t1, 1",
+        "addi $t2, $t2, 1",
+        "j    loop",
+        "end:",
+        "nop"
+    ]
+    return _workload('loop', instructions, array_image(memory_words), trips=trips, t0=t0, t1=t1, t2=t2)
+
+
+def pointer_chase(n=16, hops=None, base=0, stride=4, seed=0):
+    # Nodes are laid out at base + k*stride and linked in a random cyclic order,
+    # each node holding the address of the next one.
+    hops = n if hops is None else hops
+    order = list(range(n))
+    random.Random(seed).shuffle(order)
+    memory = {}
+    for k, node in enumerate(order):
+        memory[base + node * stride] = base + order[(k + 1) % n] * stride
+    result = base + n * stride
+    instructions = [
+        f"addi $t1, $zero, {base + order[0] * stride}",
+        "addi $t2, $zero, 0",
+        "loop:",
+        f"  slti $t0, $t2, {hops}",
+        "  beq  $t0, $zero, end",
+        "  addi $t2, $t2, 1",
+        "  lw   $t1, 0($t1)",
+        "  j    loop",
+        "end:",
+        f"  sw   $t1, {result}($zero)",
+        "  nop"
+    ]
+    return _workload('pointer_chase', instructions, memory, n=n, hops=hops, base=base, stride=stride, seed=seed)
+
+
+def strided_access(n=16, stride=4, trips=1, base=0):
+    # Sums n words spaced stride bytes apart, trips times over.
+    end = base + n * stride
+    instructions = [
+        "addi $t2, $zero, 0",
+        "addi $t4, $zero, 0",
+        "outer:",
+        f"  slti $t0, $t4, {trips}",
+        "  beq  $t0, $zero, end",
+        "  addi $t4, $t4, 1",
+        f"  addi $t1, $zero, {base}",
+        "loop:",
+        f"  slti $t0, $t1, {end}",
+        "  beq  $t0, $zero, outer",
+        "  nop",
+        "  lw   $t3, 0($t1)",
+        f"  addi $t1, $t1, {stride}",
+        "  add  $t2, $t2, $t3",
+        "  j    loop",
+        "  nop",
+        "end:",
+        f"  sw   $t2, {end}($zero)",
+        "  nop"
+    ]
+    return _workload('strided_access', instructions, array_image(n, base, stride), n=n, stride=stride, trips=trips, base=base)
+
+
+DOT_REGISTERS = [('$t3', '$t4', '$t5'), ('$t6', '$t7', '$t8'), ('$s0', '$s1', '$s2'), ('$s3', '$s4', '$s5')]
+
+
+def dot_product(n=16, unroll=1, base=0):
+    # Sums a[i]*b[i] over two n-word arrays, a at base and b right after it.
+    # Each trip handles `unroll` elements: all loads, then the independent
+    # muls, then the adds into the running sum.
+    if not 1 <= unroll <= len(DOT_REGISTERS) or n % unroll:
+        raise ValueError(f"unroll must be between 1 and {len(DOT_REGISTERS)} and divide n")
+    b = base + n * 4
+    regs = DOT_REGISTERS[:unroll]
+    body = [f"  lw   {x}, {4 * k}($t1)" for k, (x, y, p) in enumerate(regs)]
+    body += [f"  lw   {y}, {b - base + 4 * k}($t1)" for k, (x, y, p) in enumerate(regs)]
+    body += [f"  mul  {p}, {x}, {y}" for x, y, p in regs]
+    body += [f"  add  $t2, $t2, {p}" for x, y, p in regs]
+    instructions = [
+        "addi $t2, $zero, 0",
+        f"addi $t1, $zero, {base}",
+        "loop:",
+        f"  slti $t0, $t1, {b}",
+        "  beq  $t0, $zero, end",
+        "  nop",
+    ] + body + [
+        f"  addi $t1, $t1, {4 * unroll}",
+        "  j    loop",
+        "  nop",
+        "end:",
+        f"  sw   $t2, {b + n * 4}($zero)",
+        "  nop"
+    ]
+    memory = {**array_image(n, base), **array_image(n, b, values=range(n, 0, -1))}
+    return _workload('dot_product', instructions, memory, n=n, unroll=unroll, base=base)
+
+
+CHAIN_REGISTERS = ['$t2', '$t3', '$t5', '$t6', '$t7', '$s0', '$s1', '$s2', '$s3', '$s4']
+
+
+def dependency_chain(length=8, trips=4, chains=1):
+    # `chains` independent accumulators, each advanced `length` times per trip.
+    # chains=1 is a pure RAW chain; more chains expose independent work.
+    if not 1 <= chains <= len(CHAIN_REGISTERS):
+        raise ValueError(f"chains must be between 1 and {len(CHAIN_REGISTERS)}")
+    regs = CHAIN_REGISTERS[:chains]
+    body = [f"  addi {regs[k % chains]}, {regs[k % chains]}, 1" for k in range(length * chains)]
+    instructions = [
+        "addi $t1, $zero, 0",
+        "loop:",
+        f"  slti $t0, $t1, {trips}",
+        "  beq  $t0, $zero, end",
+        "  addi $t1, $t1, 1",
+    ] + body + [
+        "  j    loop",
+        "end:",
+        "  nop"
+    ]
+    return _workload('dependency_chain', instructions, {}, length=length, trips=trips, chains=chains)
+
+
+def parallel_prefix_sum(n=16, cores=2, base=0):
+    # Splits an n-element prefix sum across cores. Every core but the last sums
+    # its own chunk (four elements per loop trip, no stores) and publishes the
+    # total and a ready flag; then each core spins on the flags of the cores
+    # before it to add up its offset and scans its chunk in place from there.
+    # The chunk totals are cheap next to the scan, so the scans run in
+    # parallel. Returns one program per core over a single shared memory image.
+    # Loads are never consumed by the very next instruction, and delay slots
+    # hold nops, so the spin loops stay correct under any interleaving.
+    totals = base + n * 4
+    flags = totals + cores * 4
+    programs = []
+    for k in range(cores):
+        lo = base + (n * k // cores) * 4
+        hi = base + (n * (k + 1) // cores) * 4
+        prog = []
+        if k < cores - 1:
+            unrolled = lo + (hi - lo) // 16 * 16
+            prog += [
+                "addi $t2, $zero, 0",
+                f"addi $t1, $zero, {lo}",
+                "sum:",
+                f"  slti $t0, $t1, {unrolled}",
+                "  beq  $t0, $zero, summed",
+                "  nop",
+                "  lw   $t3, 0($t1)",
+                "  lw   $t4, 4($t1)",
+                "  lw   $t5, 8($t1)",
+                "  lw   $t6, 12($t1)",
+                "  add  $t2, $t2, $t3",
+                "  add  $t2, $t2, $t4",
+                "  add  $t2, $t2, $t5",
+                "  addi $t1, $t1, 16",
+                "  add  $t2, $t2, $t6",
+                "  j    sum",
+                "  nop",
+                "summed:",
+            ]
+            rest = ['$t3', '$t4', '$t5'][:(hi - unrolled) // 4]
+            prog += [f"  lw   {r}, {unrolled + i * 4}($zero)" for i, r in enumerate(rest)]
+            prog += ["  nop"] if len(rest) == 1 else []
+            prog += [f"  add  $t2, $t2, {r}" for r in rest]
+            prog += [
+                f"  sw   $t2, {totals + k * 4}($zero)",
+                "  addi $t4, $zero, 1",
+                f"  sw   $t4, {flags + k * 4}($zero)",
+            ]
+        prog.append("addi $s0, $zero, 0")
+        for j in range(k):
+            prog += [
+                f"wait{j}:",
+                f"  lw   $t5, {flags + j * 4}($zero)",
+                "  nop",
+                f"  beq  $t5, $zero, wait{j}",
+                "  nop",
+                f"  lw   $t6, {totals + j * 4}($zero)",
+                "  nop",
+                "  add  $s0, $s0, $t6",
+            ]
+        prog += [
+            "add  $t2, $s0, $zero",
+            f"addi $t1, $zero, {lo}",
+            "scan:",
+            f"  slti $t0, $t1, {hi}",
+            "  beq  $t0, $zero, done",
+            "  nop",
+            "  lw   $t3, 0($t1)",
+            "  addi $t1, $t1, 4",
+            "  add  $t2, $t2, $t3",
+            "  sw   $t2, -4($t1)",
+            "  j    scan",
+            "  nop",
+            "done:",
+            "  nop",
+        ]
+        programs.append(prog)
+    return {'name': 'parallel_prefix_sum', 'programs': programs, 'memory': array_image(n, base),
+            'params': {'n': n, 'cores': cores, 'base': base}}
+
+
+def partitioned_prefix_sum(n=16, cores=2, layout='interleaved', base=0):
+    # Each core computes the running sum of its own partition of the array in
+    # place, with no communication between cores. 'blocked' gives each core a
+    # contiguous chunk; 'interleaved' gives core k elements k, k+cores, ...,
+    # so neighbouring words (and cache lines) belong to different cores.
+    if layout not in ('blocked', 'interleaved'):
+        raise ValueError(f"Unknown layout: {layout}")
+    programs = []
+    expected = {}
+    for k in range(cores):
+        if layout == 'blocked':
+            elements = range(n * k // cores, n * (k + 1) // cores)
+        else:
+            elements = range(k, n, cores)
+        step = 4 if layout == 'blocked' else cores * 4
+        total = 0
+        for i in elements:
+            total += i
+            expected[base + i * 4] = total
+        if not elements:
+            programs.append(["nop"])
+            continue
+        programs.append([
+            "addi $t2, $zero, 0",
+            f"addi $t1, $zero, {base + elements[0] * 4}",
+            "scan:",
+            f"  slti $t0, $t1, {base + elements[-1] * 4 + 4}",
+            "  beq  $t0, $zero, done",
+            "  nop",
+            "  lw   $t3, 0($t1)",
+            f"  addi $t1, $t1, {step}",
+            "  add  $t2, $t2, $t3",
+            f"  sw   $t2, {-step}($t1)",
+            "  j    scan",
+            "  nop",
+            "done:",
+            "  nop"
+        ])
+    return {'name': 'partitioned_prefix_sum', 'programs': programs, 'memory': array_image(n, base),
+            'expected': expected, 'params': {'n': n, 'cores': cores, 'layout': layout, 'base': base}}
+
+
+WORKLOADS = {
+    'prefix_sum': prefix_sum,
+    'loop': loop_kernel,
+    'pointer_chase': pointer_chase,
+    'strided_access': strided_access,
+    'dependency_chain': dependency_chain,
+    'dot_product': dot_product,
+}
+
+
+def build(name, **params):
+    if name not in WORKLOADS:
+        raise ValueError(f"Unknown workload: {name}")
+    return WORKLOADS[name](**params)
+
+
+def sweep(name, param, values, simulator=None, **params):
+    # Runs one workload across a range of one parameter and reports both the
+    # simulated pipeline behaviour and the host throughput of the simulator.
+    if simulator is None:
+        from simulator import MIPSPipelineSimulator as simulator
+    rows = []
+    for value in values:
+        wl = build(name, **{**params, param: value})
+        sim = simulator(wl['instructions'], wl['memory'])
+        start = time.perf_counter()
+        sim.simulate()
+        elapsed = time.perf_counter() - start
+        stats = sim.statistics
+        rows.append({
+            param: value,
+            'Total Cycles': stats['Total Cycles'],
+            'IPC': stats['IPC'],
+            'Memory Stalls': stats['Memory Stalls'],
+            'Host Seconds': elapsed,
+            'Cycles/sec': stats['Total Cycles'] / elapsed if elapsed > 0 else 0,
+        })
+    return rows
+
+
+if __name__ == "__main__":
+    for name, param, values in (
+        ('prefix_sum', 'n', (10, 100, 1000, 10000)),
+        ('pointer_chase', 'n', (16, 256, 4096)),
+        ('strided_access', 'stride', (4, 16, 64)),
+        ('dependency_chain', 'chains', (1, 2, 4)),
+    ):
+        print(f"\n{name}:")
+        print(f"| {param:>8} | {'Cycles':>10} | {'IPC':>6} | {'Stalls':>8} | {'Host s':>8} | {'Cycles/s':>10} |")
+        for row in sweep(name, param, values):
+            print(f"| {row[param]:8d} | {row['Total Cycles']:10d} | {row['IPC']:6.2f} | {row['Memory Stalls']:8d} "
+                  f"| {row['Host Seconds']:8.3f} | {row['Cycles/sec']:10.0f} |")